@@ -1,27 +1,116 @@
+"""
+Run a Playwright script against a URL and print the result as JSON.
+
+    python playwright_executor.py http://localhost:3000 --script "await page.click('button')"
+
+With --daemon, browsers stay warm between jobs. Each line read from a Unix
+socket (created 0600, at --socket or a per-user default), a localhost port
+(--port) or stdin (--stdin) is a JSON job such as
+{"id": 1, "url": "...", "script": "...", "token": "...", "capture_logs": true},
+and each job's result is written back as one JSON line in the single-run
+format, plus its id. Socket and port jobs must carry the token from
+PLAYWRIGHT_DAEMON_TOKEN or, without it, the one generated into --token-file.
+The first line that is not a JSON object, or has the wrong token, ends the
+connection.
+
+Jobs run arbitrary Python, so prefer the socket: a TCP port on 127.0.0.1 is
+reachable by every local user and by any web page open in a local browser,
+which can POST to it. The close-on-garbage rule stops such requests before
+their body is read, and the token stops anything that gets further.
+
+With --manifest, a file of such jobs (JSON lines or a JSON array, "-" for
+stdin) runs in one pool, --concurrency at a time. Each result is printed as a
+JSON line as soon as it finishes, with its id (the job's index by default) and
+duration_ms, and an aggregate timing summary is printed to stderr at the end.
+
+Screenshots are archived under automation_output/ without storing frames
+identical to one kept by an earlier run; the result then lists the earlier
+file. --dedup-distance also merges near-identical frames (see FrameStore).
+"""
 import asyncio
 from playwright.async_api import async_playwright
 import argparse
+import contextlib
 from datetime import datetime
+import math
 import os
 import json
 from pathlib import Path
+import hashlib
+import hmac
+import secrets
+import signal
+import sys
 import tempfile
+import time
 import base64
+import uuid
+
+from screenshots import FrameStore, capture, image_files
+
+AUTOMATION_OUTPUT_DIR = 'automation_output'
+
+# Daemon defaults: a socket only this user can connect to, and the token its jobs must carry
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"playwright_executor-{os.getuid()}.sock")
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".playwright_executor_token")
+
+# Archived screenshots, deduplicated across runs
+frame_store = FrameStore(AUTOMATION_OUTPUT_DIR)
+
+# Compiled script code by script hash, reused by every job in this process
+COMPILED_SCRIPTS_MAX = 256
+_compiled_scripts = {}
+
 
-async def execute_playwright_script(url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False):
+def decode_script(script: str) -> str:
+    if script.startswith('base64:'):
+        return base64.b64decode(script[7:]).decode('utf-8')
+    return script
+
+
+def wrap_script(script: str) -> str:
+    """The source of a ``run_test(page, output_dir)`` coroutine whose body is ``script``."""
+    indented_script = "".join("    " + line + "\n" if line.strip() else "\n" for line in script.split('\n'))
+    return f"""async def run_test(page, output_dir):
+{indented_script}"""
+
+
+def compile_script(script: str):
+    """
+    The ``run_test`` function for a decoded script. The code is compiled once
+    per distinct script, but every call gets a fresh module namespace, so runs
+    never share globals.
+    """
+    key = hashlib.sha256(script.encode('utf-8')).hexdigest()
+    code = _compiled_scripts.get(key)
+    if code is None:
+        code = compile(wrap_script(script), f"<script {key[:12]}>", "exec")
+        if len(_compiled_scripts) >= COMPILED_SCRIPTS_MAX:
+            _compiled_scripts.pop(next(iter(_compiled_scripts)))
+        _compiled_scripts[key] = code
+    namespace = {"__name__": "dynamic_script"}
+    exec(code, namespace)
+    return namespace["run_test"]
+
+
+async def execute_playwright_script(url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False,
+                                    browser=None, dump_script: bool = False):
     """
     Executes a Playwright script and captures outputs.
+
+    Launches a fresh Chromium unless ``browser`` is given; then the script runs
+    in its own BrowserContext in that browser, which is left running. The
+    generated test_script.py is written to the run directory only with
+    ``dump_script``.
     """
     # Create output directory
-    
-    automation_output_dir = 'automation_output'
-
     os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(automation_output_dir, exist_ok=True)
+    os.makedirs(AUTOMATION_OUTPUT_DIR, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_dir = Path(automation_output_dir) / timestamp
-    run_dir.mkdir(exist_ok=True)
+    # Unique even for jobs started in the same second
+    run_dir = Path(AUTOMATION_OUTPUT_DIR) / f"{timestamp}_{uuid.uuid4().hex[:8]}"
+    run_dir.mkdir()
 
     screenshot_dir = Path(output_dir)
     screenshot_dir.mkdir(exist_ok=True)
@@ -37,9 +126,13 @@ async def execute_playwright_script(url: str, script: str, output_dir: str = ".s
     }
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
+        async with contextlib.AsyncExitStack() as stack:
+            if browser is None:
+                p = await stack.enter_async_context(async_playwright())
+                browser = await p.chromium.launch(headless=True)
+                stack.push_async_callback(browser.close)
             context = await browser.new_context()
+            stack.push_async_callback(context.close)
             page = await context.new_page()
             
             # Store console logs if requested
@@ -51,96 +144,38 @@ async def execute_playwright_script(url: str, script: str, output_dir: str = ".s
                 # Navigate to URL first
                 await page.goto(url, wait_until="networkidle", timeout=30000)
                 
-                # Decode script if base64 encoded
-                if script.startswith('base64:'):
-                    script = base64.b64decode(script[7:]).decode('utf-8')
-                
-                # Add proper indentation to the script
-                indented_script = ""
-                for line in script.split('\n'):
-                    if line.strip():
-                        indented_script += "    " + line + "\n"
-                    else:
-                        indented_script += "\n"
-                
-                # Create test script with proper indentation
-                test_script = f"""async def run_test(page, output_dir):
-{indented_script}"""
+                setup_started = time.perf_counter()
+                script = decode_script(script)
+                if dump_script:
+                    with open(run_dir / "test_script.py", "w") as f:
+                        f.write(wrap_script(script))
+                run_test = compile_script(script)
+                result["data"]["script_setup_ms"] = round((time.perf_counter() - setup_started) * 1000, 3)
 
-                # Write the test script to a file for debugging
-                test_script_path = run_dir / "test_script.py"
-                with open(test_script_path, "w") as f:
-                    f.write(test_script)
-
-                # Save script to temp file for execution
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                    f.write(test_script)
-                    script_path = f.name
-
-                # Import and execute the script
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("dynamic_script", script_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
                 # Run the test
-                output = await module.run_test(page, str(run_dir))
+                output = await run_test(page, str(run_dir))
                 if output is not None:
                     result["data"]["output"] = output
                 
-                # Take a screenshot if none were taken
-                screenshot_files = list(run_dir.glob('*.{png,jpg,jpeg}'))
+                # Take a screenshot if none were taken, also saved to the .screenshots folder
+                screenshot_files = image_files(run_dir)
                 if not screenshot_files:
-                    final_screenshot = run_dir / f"final_{timestamp}.png"
-                    await page.screenshot(
-                        path=str(final_screenshot),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                    result["data"]["screenshots"].append(str(final_screenshot))
-
-                    # Save additional screenshot to .screenshot folder
-                    await page.screenshot(
-                        path=str(screenshot_dir / "screenshot.jpeg"),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
+                    result["data"]["screenshots"].append(await capture(
+                        page, [screenshot_dir / "screenshot.jpeg"], run_dir / f"final_{timestamp}.png", frame_store))
                 else:
                     result["data"]["screenshots"].extend(str(f) for f in screenshot_files)
 
                 # Save console logs if captured
                 if capture_logs and console_logs:
                     log_path = run_dir / f"console_{timestamp}.log"
-                    with open(log_path, "w", encoding="utf-8") as f:
-                        f.write("\n".join(console_logs))
+                    await asyncio.to_thread(log_path.write_text, "\n".join(console_logs), encoding="utf-8")
                     result["data"]["console_logs"].append(str(log_path))
 
             except Exception as e:
                 result["status"] = "error"
                 result["data"]["error"] = f"Script error: {str(e)}"
-                error_screenshot = run_dir / f"error_{timestamp}.png"
-                await page.screenshot(
-                        path=str(error_screenshot),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                result["data"]["screenshots"].append(str(error_screenshot))
-
-                # Save additional screenshot to .screenshot folder
-                await page.screenshot(
-                        path=str(screenshot_dir / "screenshot.jpeg"),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-            
-            finally:
-                if os.path.exists(script_path):
-                    os.unlink(script_path)
-                await browser.close()
+                result["data"]["screenshots"].append(await capture(
+                    page, [screenshot_dir / "screenshot.jpeg"], run_dir / f"error_{timestamp}.png", frame_store))
 
     except Exception as e:
         result["status"] = "error"
@@ -148,21 +183,355 @@ async def execute_playwright_script(url: str, script: str, output_dir: str = ".s
 
     return result
 
+class BrowserPool:
+    """
+    Warm Chromium instances kept alive between jobs.
+
+    Each job borrows a browser and runs in a fresh BrowserContext, so jobs stay
+    isolated without paying for a browser launch; a browser hosts up to
+    ``contexts_per_browser`` jobs at once. A browser that crashed (disconnected)
+    is replaced, and one that has served ``recycle_after`` jobs is retired once
+    its running jobs finish and relaunched in the background, so memory does not creep.
+    """
+
+    def __init__(self, size: int = 1, recycle_after: int = 50, contexts_per_browser: int = 1):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.contexts_per_browser = contexts_per_browser
+        self.stats = {"jobs": 0, "launches": 0, "crashes": 0, "recycled": 0}
+        self._playwright = None
+        self._idle = asyncio.Queue()
+        self._slots = []
+        self._recycling = set()
+
+    async def start(self):
+        self._playwright = await async_playwright().start()
+        for _ in range(self.size):
+            slot = {"browser": await self._launch(), "jobs": 0, "active": 0, "parked": 0,
+                    "retiring": False, "recycling": False, "crashed": False, "lock": asyncio.Lock()}
+            self._slots.append(slot)
+            for _ in range(self.contexts_per_browser):
+                self._idle.put_nowait(slot)
+
+    async def stop(self):
+        for task in self._recycling:
+            task.cancel()
+        for slot in self._slots:
+            if slot["browser"] is not None:
+                with contextlib.suppress(Exception):
+                    await slot["browser"].close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    async def _launch(self):
+        self.stats["launches"] += 1
+        return await self._playwright.chromium.launch(headless=True)
+
+    @contextlib.asynccontextmanager
+    async def browser(self):
+        """Borrow a live browser for one job."""
+        slot = await self._lease()
+        slot["active"] += 1
+        try:
+            yield slot["browser"]
+        finally:
+            slot["active"] -= 1
+            slot["jobs"] += 1
+            self.stats["jobs"] += 1
+            if not slot["browser"].is_connected():
+                slot["crashed"] = True
+            if slot["crashed"] or slot["jobs"] >= self.recycle_after:
+                slot["retiring"] = True
+            if slot["retiring"]:
+                self._park(slot)
+            else:
+                self._idle.put_nowait(slot)
+
+    async def _lease(self) -> dict:
+        while True:
+            slot = await self._idle.get()
+            if slot["retiring"]:
+                self._park(slot)
+                continue
+            try:
+                async with slot["lock"]:
+                    if slot["browser"] is None or not slot["browser"].is_connected():
+                        if slot["browser"] is not None:
+                            self.stats["crashes"] += 1
+                        slot["browser"], slot["jobs"] = await self._launch(), 0
+            except BaseException:
+                slot["browser"] = None
+                self._idle.put_nowait(slot)
+                raise
+            return slot
+
+    def _park(self, slot: dict):
+        # Leases of a retiring browser wait here until it has been relaunched
+        slot["parked"] += 1
+        if slot["active"] == 0 and not slot["recycling"]:
+            slot["recycling"] = True
+            task = asyncio.create_task(self._recycle(slot))
+            self._recycling.add(task)
+            task.add_done_callback(self._recycling.discard)
+
+    async def _recycle(self, slot: dict):
+        self.stats["crashes" if slot["crashed"] else "recycled"] += 1
+        with contextlib.suppress(Exception):
+            await slot["browser"].close()
+        try:
+            slot["browser"] = await self._launch()
+        except Exception:
+            # Launched again on next use
+            slot["browser"] = None
+        slot.update(jobs=0, retiring=False, crashed=False, recycling=False)
+        parked, slot["parked"] = slot["parked"], 0
+        for _ in range(parked):
+            self._idle.put_nowait(slot)
+
+
+def error_result(message: str) -> dict:
+    return {"status": "error", "data": {"screenshots": [], "console_logs": [], "error": message, "output": None}}
+
+
+async def run_job(pool: BrowserPool, job, output_dir: str = ".screenshots", capture_logs: bool = False,
+                  dump_script: bool = False) -> dict:
+    """Run one job: a JSON object with url and script, plus optional output, capture_logs, dump_script and id."""
+    if isinstance(job, dict) and job.get("command") == "stats":
+        return {"id": job.get("id"), "status": "success", "data": {"pool": dict(pool.stats), "frames": dict(frame_store.stats)}}
+    if not isinstance(job, dict):
+        return error_result("Invalid job: expected an object with url and script")
+    if "url" not in job or "script" not in job:
+        result = error_result("Invalid job: expected an object with url and script")
+    else:
+        try:
+            async with pool.browser() as browser:
+                result = await execute_playwright_script(job["url"], job["script"], job.get("output", output_dir),
+                                                         bool(job.get("capture_logs", capture_logs)), browser=browser,
+                                                         dump_script=bool(job.get("dump_script", dump_script)))
+        except Exception as e:
+            result = error_result(f"Setup error: {str(e)}")
+    if "id" in job:
+        result["id"] = job["id"]
+    return result
+
+
+async def answer_lines(pool: BrowserPool, read_line, write_line, token: str = None):
+    """
+    Run every job read until EOF concurrently, writing each result as soon as it is ready.
+
+    A line that is not a JSON object, or (with ``token`` set) a job without the
+    matching ``"token"`` field, is answered with an error and ends the session:
+    nothing after it is read, so a request in another protocol such as an HTTP
+    POST from a web page never gets to its body.
+    """
+    jobs = set()
+
+    while True:
+        line = await read_line()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError:
+            job = None
+        if not isinstance(job, dict):
+            write_line(json.dumps(error_result("Invalid job: expected a JSON object, closing")))
+            break
+        sent = str(job.pop("token", ""))
+        if token is not None and not hmac.compare_digest(sent.encode(), token.encode()):
+            write_line(json.dumps(error_result("Invalid token, closing")))
+            break
+
+        async def answer(job):
+            write_line(json.dumps(await run_job(pool, job)))
+
+        task = asyncio.create_task(answer(job))
+        jobs.add(task)
+        task.add_done_callback(jobs.discard)
+    if jobs:
+        await asyncio.gather(*jobs)
+
+
+def read_manifest(path: str) -> list:
+    """Jobs from a JSON array or JSON lines file, or stdin for ``-``."""
+    text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+
+async def run_batch(jobs: list, concurrency: int, pool_size: int, recycle_after: int, output_dir: str = ".screenshots",
+                    capture_logs: bool = False, dump_script: bool = False, write_line=print) -> dict:
+    """
+    Run ``jobs`` with up to ``concurrency`` at once, sharing ``pool_size`` warm
+    browsers, and return an aggregate timing summary.
+    """
+    pool = BrowserPool(pool_size, recycle_after, contexts_per_browser=math.ceil(concurrency / pool_size))
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async def run(index, job):
+        if isinstance(job, dict):
+            job = {"id": index, **job}
+        async with semaphore:
+            started = time.perf_counter()
+            result = await run_job(pool, job, output_dir, capture_logs, dump_script)
+            duration = time.perf_counter() - started
+        result.setdefault("id", index)
+        result["duration_ms"] = round(duration * 1000, 1)
+        durations.append(result["duration_ms"])
+        write_line(json.dumps(result))
+        return result["status"] == "success"
+
+    started = time.perf_counter()
+    await pool.start()
+    try:
+        outcomes = await asyncio.gather(*(run(index, job) for index, job in enumerate(jobs)))
+    finally:
+        await pool.stop()
+    wall = time.perf_counter() - started
+    return {
+        "jobs": len(jobs),
+        "succeeded": sum(outcomes),
+        "failed": len(jobs) - sum(outcomes),
+        "wall_s": round(wall, 3),
+        "jobs_per_s": round(len(jobs) / wall, 2) if wall else 0.0,
+        "job_ms": {"p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95),
+                   "max": max(durations, default=0.0)},
+        "pool": dict(pool.stats),
+        "frames": dict(frame_store.stats),
+    }
+
+
+def write_token_file(path) -> str:
+    """Generate a daemon token and write it to ``path``, readable by the owner only."""
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)  # the file may predate this run with looser permissions
+    with os.fdopen(fd, "w") as f:
+        f.write(token + "\n")
+    return token
+
+
+async def serve_daemon(pool_size: int, recycle_after: int, socket_path: str = None, port: int = None,
+                       token: str = None):
+    """
+    Keep a browser pool warm and run scripts sent as JSON lines, one result line per job.
+
+    Jobs are read from a Unix socket (``socket_path``, created 0600), a localhost
+    TCP ``port``, or stdin when neither is given, and run concurrently up to the
+    pool size. Socket and port connections must send ``token`` with every job.
+    """
+    pool = BrowserPool(pool_size, recycle_after)
+    await pool.start()
+    try:
+        if socket_path is None and port is None:
+            loop = asyncio.get_running_loop()
+
+            def write_line(text):
+                sys.stdout.write(text + "\n")
+                sys.stdout.flush()
+
+            await answer_lines(pool, lambda: loop.run_in_executor(None, sys.stdin.readline), write_line)
+            return
+        if token is None:
+            raise ValueError("a token is required to listen on a socket or port")
+
+        async def client_connected(reader, writer):
+            def write_line(text):
+                writer.write(text.encode("utf-8") + b"\n")
+
+            try:
+                await answer_lines(pool, reader.readline, write_line, token)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        if socket_path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(socket_path)
+            umask = os.umask(0o177)  # no window in which the socket exists with looser permissions
+            try:
+                server = await asyncio.start_unix_server(client_connected, path=socket_path)
+            finally:
+                os.umask(umask)
+            os.chmod(socket_path, 0o600)
+        else:
+            server = await asyncio.start_server(client_connected, host="127.0.0.1", port=port)
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+    finally:
+        await pool.stop()
+
 def main():
     parser = argparse.ArgumentParser(description="Execute Playwright automation script")
-    parser.add_argument("url", help="URL to automate")
-    parser.add_argument("--script", required=True, help="Playwright script to execute (plain text or base64 encoded with 'base64:' prefix)")
+    parser.add_argument("url", nargs="?", help="URL to automate")
+    parser.add_argument("--script", help="Playwright script to execute (plain text or base64 encoded with 'base64:' prefix)")
     parser.add_argument("--output", "-o", default=".screenshots",
                         help="Output directory for screenshots and logs")
     parser.add_argument("--capture-logs", action="store_true", help="Capture console logs")
+    parser.add_argument("--dedup-distance", type=int,
+                        help="Also reuse archived frames within this many perceptual-hash bits (needs Pillow)")
+    parser.add_argument("--dump-script", action="store_true",
+                        help="Write the generated test_script.py to the run directory for debugging")
+    parser.add_argument("--daemon", action="store_true",
+                        help=f"Keep browsers warm and run JSON line jobs from a Unix socket ({DEFAULT_SOCKET} "
+                             "unless --socket is given), --port or --stdin")
+    parser.add_argument("--socket", help="Unix socket path to listen on in daemon mode (created 0600)")
+    parser.add_argument("--port", type=int,
+                        help="Localhost TCP port to listen on in daemon mode instead of a socket. RISKY: any local "
+                             "process, and any web page open in a browser on this machine, can connect; the token "
+                             "is all that stops them from running Python here")
+    parser.add_argument("--stdin", action="store_true", help="Read daemon jobs from stdin instead (no token needed)")
+    parser.add_argument("--token-file", default=DEFAULT_TOKEN_FILE,
+                        help="Where the daemon writes the token jobs must carry, unless PLAYWRIGHT_DAEMON_TOKEN "
+                             "sets it (default %(default)s, created 0600)")
+    parser.add_argument("--manifest", help="Run the JSON jobs in this file ('-' for stdin) as one batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs run at once in --manifest mode")
+    parser.add_argument("--pool-size", type=int, default=1, help="Browsers kept warm in daemon and --manifest mode")
+    parser.add_argument("--recycle-after", type=int, default=50, help="Jobs per browser before it is relaunched")
     
     args = parser.parse_args()
+    frame_store.max_distance = args.dedup_distance
+    
+    if args.daemon:
+        if args.stdin:
+            asyncio.run(serve_daemon(args.pool_size, args.recycle_after))
+            return
+        token = os.environ.get("PLAYWRIGHT_DAEMON_TOKEN") or write_token_file(args.token_file)
+        socket_path = None if args.port is not None else args.socket or DEFAULT_SOCKET
+        print(f"Listening on {socket_path or f'127.0.0.1:{args.port}'}", file=sys.stderr)
+        asyncio.run(serve_daemon(args.pool_size, args.recycle_after, socket_path, args.port, token))
+        return
+    if args.manifest:
+        try:
+            jobs = read_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read manifest: {str(e)}")
+        summary = asyncio.run(run_batch(jobs, max(1, args.concurrency), max(1, args.pool_size), args.recycle_after,
+                                        args.output, args.capture_logs, args.dump_script,
+                                        write_line=lambda line: print(line, flush=True)))
+        print(json.dumps(summary), file=sys.stderr)
+        return
+    if not args.url or not args.script:
+        parser.error("url and --script are required unless --daemon or --manifest is given")
     
     result = asyncio.run(execute_playwright_script(
         args.url,
         args.script,
         args.output,
-        args.capture_logs
+        args.capture_logs,
+        dump_script=args.dump_script
     ))
     
     print(json.dumps(result))
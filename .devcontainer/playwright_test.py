@@ -1,18 +1,80 @@
 import asyncio
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import argparse
 from datetime import datetime
+import json
 import os
-
-
-async def capture_page(url: str, output_dir: str = "screenshots", capture_logs: bool = False):
+from pathlib import Path
+import re
+import time
+
+from screenshots import capture
+
+# YouTube embeds, player scripts and thumbnails (i.ytimg.com) dominate page weight and keep networkidle from settling
+HEAVY_RESOURCES = re.compile(r"^https?://([^/]+\.)?(youtube\.com|youtube-nocookie\.com|ytimg\.com|googlevideo\.com)/")
+
+# Installed before any page script runs, so buffered entries from the whole load are observed
+VITALS_SCRIPT = """
+(() => {
+  const vitals = window.__captureVitals = {lcp: null, cls: 0, tbt: 0, longTasks: 0};
+  const observe = (type, onEntry) => {
+    try {
+      new PerformanceObserver((list) => list.getEntries().forEach(onEntry)).observe({type, buffered: true});
+    } catch (e) {}
+  };
+  observe('largest-contentful-paint', (e) => { vitals.lcp = e.renderTime || e.startTime; });
+  observe('layout-shift', (e) => { if (!e.hadRecentInput) vitals.cls += e.value; });
+  observe('longtask', (e) => { vitals.tbt += Math.max(0, e.duration - 50); vitals.longTasks += 1; });
+})();
+"""
+
+COLLECT_METRICS = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  const vitals = window.__captureVitals || {};
+  const round = (value) => value == null ? null : Math.round(value * 10) / 10;
+  return {
+    navigation: nav ? {
+      ttfb_ms: round(nav.responseStart),
+      dom_content_loaded_ms: round(nav.domContentLoadedEventEnd),
+      load_ms: round(nav.loadEventEnd),
+      transfer_bytes: nav.transferSize,
+    } : null,
+    vitals: {
+      fcp_ms: round(fcp && fcp.startTime),
+      lcp_ms: round(vitals.lcp),
+      cls: vitals.cls == null ? null : Math.round(vitals.cls * 10000) / 10000,
+      tbt_ms: round(vitals.tbt),
+      long_tasks: vitals.longTasks,
+    },
+  };
+}
+"""
+
+
+async def capture_page(url: str, output_dir: str = "screenshots", capture_logs: bool = False,
+                       wait_for: str = None, ready_signal: str = None, settle_ms: int = None,
+                       block_heavy: bool = False, block: list = (), report: bool = False,
+                       timeout_ms: int = 30000):
     """
     Captures a full-page screenshot and console logs from the specified URL.
 
     Args:
         url (str): The URL to capture
         output_dir (str): Directory to save screenshots and logs
-        :param capture_logs:
+        capture_logs (bool): Also save the console logs
+        wait_for (str): CSS selector that must be visible before capturing
+        ready_signal (str): Global the app sets truthy once rendered, e.g. ``__APP_READY__``
+        settle_ms (int): Extra wait before capturing; 2000 unless a readiness condition is given
+        block_heavy (bool): Abort YouTube embed, player and thumbnail requests
+        block (list): Additional URL globs to abort
+        report (bool): Save navigation timing and Web Vitals to a JSON report
+
+    Without ``wait_for`` or ``ready_signal`` the page is considered ready at
+    networkidle. Web Vitals are lab approximations: CLS sums every shift without
+    recent input, and TBT counts long tasks up to the capture.
+    Returns the report as a dict.
     """
 
     # Create output directory if it doesn't exist
@@ -21,12 +83,28 @@ async def capture_page(url: str, output_dir: str = "screenshots", capture_logs:
     # Generate timestamp for unique filenames
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+    readiness = wait_for or ready_signal
+    if settle_ms is None:
+        settle_ms = 0 if readiness else 2000
+    result = {"url": url, "timestamp": timestamp, "ready": None, "blocked_requests": 0, "timings_ms": {}}
+
     async with async_playwright() as p:
         # Launch the browser
         browser = await p.chromium.launch(headless=True)
 
         # Create a new context and page
         context = await browser.new_context()
+        await context.add_init_script(VITALS_SCRIPT)
+
+        async def abort(route):
+            result["blocked_requests"] += 1
+            await route.abort("blockedbyclient")
+
+        if block_heavy:
+            await context.route(HEAVY_RESOURCES, abort)
+        for pattern in block:
+            await context.route(pattern, abort)
+
         page = await context.new_page()
 
         # Store console logs
@@ -37,29 +115,52 @@ async def capture_page(url: str, output_dir: str = "screenshots", capture_logs:
             page.on("console", lambda msg: console_logs.append(f"{msg.type}: {msg.text}"))
 
         try:
-            # Navigate to the URL
-            await page.goto(url, wait_until="networkidle")
+            started = time.perf_counter()
+
+            def lap(name):
+                nonlocal started
+                now = time.perf_counter()
+                result["timings_ms"][name] = round((now - started) * 1000, 1)
+                started = now
+
+            # Navigate to the URL; an explicit readiness condition makes waiting for the network unnecessary
+            await page.goto(url, wait_until="domcontentloaded" if readiness else "networkidle", timeout=timeout_ms)
+            lap("navigation")
+
+            try:
+                if wait_for:
+                    await page.wait_for_selector(wait_for, state="visible", timeout=timeout_ms)
+                if ready_signal:
+                    await page.wait_for_function(f"() => Boolean(window[{json.dumps(ready_signal)}])",
+                                                 timeout=timeout_ms)
+                result["ready"] = True
+            except PlaywrightTimeoutError:
+                # Capture what rendered anyway; the report shows the page never became ready
+                result["ready"] = False
+                print(f"Page not ready after {timeout_ms} ms, capturing anyway")
+            lap("ready")
 
             # Wait for any animations or dynamic content to settle
-            await page.wait_for_timeout(2000)
+            if settle_ms:
+                await page.wait_for_timeout(settle_ms)
+                lap("settle")
 
             # Take full page screenshot
             screenshot_path = os.path.join(output_dir, f"screenshot.jpeg")
-            await page.screenshot(
-                path=screenshot_path,
-                full_page=True,
-                type="jpeg",
-                quality = 50  # Add this line - adjust value between 0-100
-            )
-            # print(f"Screenshot saved to: {screenshot_path}")
+            await capture(page, [screenshot_path])
+            lap("screenshot")
+
+            if report:
+                result.update(await page.evaluate(COLLECT_METRICS))
+                report_path = Path(output_dir) / f"report_{timestamp}.json"
+                await asyncio.to_thread(report_path.write_text, json.dumps(result, indent=2), encoding="utf-8")
+                print(f"Report saved to: {report_path}")
 
             if capture_logs:
                 # Save console logs
                 log_path = os.path.join(output_dir, f"console_logs_{timestamp}.txt")
-                with open(log_path, "w", encoding="utf-8") as f:
-                    f.write(f"Console logs for {url}\n")
-                    f.write("=" * 50 + "\n")
-                    f.write("\n".join(console_logs))
+                text = f"Console logs for {url}\n" + "=" * 50 + "\n" + "\n".join(console_logs)
+                await asyncio.to_thread(Path(log_path).write_text, text, encoding="utf-8")
                 # print(f"Console logs saved to: {log_path}")
             print("Screenshot Generated")
         except Exception as e:
@@ -68,6 +169,8 @@ async def capture_page(url: str, output_dir: str = "screenshots", capture_logs:
         finally:
             await browser.close()
 
+    return result
+
 
 def main():
     # Parse command line arguments
@@ -76,10 +179,21 @@ def main():
     parser.add_argument("--console", help="Should Capture to capture")
     parser.add_argument("--output", "-o", default="screenshots",
                         help="Output directory for screenshots and logs")
+    parser.add_argument("--wait-for", help="CSS selector that must be visible before capturing")
+    parser.add_argument("--ready-signal", help="Window global the app sets once ready, e.g. __APP_READY__")
+    parser.add_argument("--settle-ms", type=int,
+                        help="Extra wait before capturing (default 2000, or 0 with a readiness condition)")
+    parser.add_argument("--block-heavy", action="store_true",
+                        help="Block YouTube embeds, player scripts and i.ytimg.com thumbnails")
+    parser.add_argument("--block", action="append", default=[], help="Additional URL glob to block (repeatable)")
+    parser.add_argument("--report", action="store_true",
+                        help="Save navigation timing and Web Vitals (LCP, CLS, TBT) to a JSON report")
+    parser.add_argument("--timeout-ms", type=int, default=30000, help="Navigation and readiness timeout")
     args = parser.parse_args()
 
     # Run the async capture function
-    asyncio.run(capture_page(args.url, args.output, args.console is not None))
+    asyncio.run(capture_page(args.url, args.output, args.console is not None, args.wait_for, args.ready_signal,
+                             args.settle_ms, args.block_heavy, args.block, args.report, args.timeout_ms))
 
 
 if __name__ == "__main__":
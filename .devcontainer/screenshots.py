@@ -0,0 +1,165 @@
+"""
+Screenshot capture shared by playwright_executor.py and playwright_test.py.
+
+Each step renders the page once and the JPEG bytes are written to every
+destination off the event loop. Archived frames go through a FrameStore, which
+does not store a frame again when an identical one is already kept and points
+at the stored copy instead.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Optional
+import uuid
+
+try:
+    from PIL import Image, ImageChops
+except ImportError:  # Perceptual matching is unavailable without Pillow
+    Image = None
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+SCREENSHOT_OPTIONS = {"full_page": True, "type": "jpeg", "quality": 50}
+
+
+def image_files(directory) -> list:
+    """Screenshots in ``directory`` (``Path.glob`` does not expand braces such as ``*.{png,jpg}``)."""
+    return sorted(path for path in Path(directory).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def write_file(path, data: bytes):
+    Path(path).write_bytes(data)
+
+
+def content_hash(image: bytes) -> str:
+    return hashlib.blake2b(image, digest_size=16).hexdigest()
+
+
+def frame_hash(image: bytes, hash_size: int = 16) -> Optional[str]:
+    """
+    A difference hash of ``image``, prefixed with its size and a coarse mean
+    brightness so full pages of other heights, or flat pages of another
+    colour, never match. ``None`` without Pillow.
+    """
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(image)) as img:
+        width, height = img.size
+        pixels = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).tobytes()
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            bits = bits << 1 | (left > pixels[row * (hash_size + 1) + col + 1])
+    brightness = sum(pixels) // len(pixels) // 16
+    return f"dhash:{width}x{height}/{brightness}:{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hash_distance(a: Optional[str], b: Optional[str]) -> Optional[int]:
+    """Bits differing between two difference hashes of comparable frames, ``None`` if not comparable."""
+    if not a or not b:
+        return None
+    _, size_a, bits_a = a.split(":")
+    _, size_b, bits_b = b.split(":")
+    if size_a != size_b or len(bits_a) != len(bits_b):
+        return None
+    return bin(int(bits_a, 16) ^ int(bits_b, 16)).count("1")
+
+
+def same_pixels(a: bytes, b: bytes, tolerance: int = 0) -> bool:
+    """Whether two images have the same size and no channel differs by more than ``tolerance``."""
+    with Image.open(io.BytesIO(a)) as first, Image.open(io.BytesIO(b)) as second:
+        if first.size != second.size:
+            return False
+        difference = ImageChops.difference(first.convert("RGB"), second.convert("RGB"))
+        return max(high for _, high in difference.getextrema()) <= tolerance
+
+
+class FrameStore:
+    """
+    Frames stored under ``root``, indexed in ``root/.frames.json`` so
+    duplicates are detected across runs.
+
+    By default only byte-identical frames are merged. With ``max_distance``
+    set (and Pillow installed), a frame within ``max_distance`` difference-hash
+    bits of a stored one is merged too, but only once a pixel comparison finds
+    no channel differing by more than ``pixel_tolerance``: the hash alone cannot
+    see small changes such as one line of text on a full page.
+    """
+
+    def __init__(self, root, max_distance: Optional[int] = None, pixel_tolerance: int = 16):
+        self.root = Path(root)
+        self.index_path = self.root / ".frames.json"
+        self.max_distance = max_distance
+        self.pixel_tolerance = pixel_tolerance
+        self.stats = {"stored": 0, "deduplicated": 0}
+        self._frames = None
+
+    def _index(self) -> dict:
+        if self._frames is None:
+            try:
+                frames = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                frames = {}
+            self._frames = {
+                digest: entry for digest, entry in frames.items()
+                if isinstance(entry, dict) and Path(entry["path"]).exists()
+            }
+        return self._frames
+
+    def match(self, image: bytes, frames: dict):
+        """The content hash and difference hash of ``image``, and the stored path of a duplicate if any."""
+        digest = content_hash(image)
+        entry = frames.get(digest)
+        if entry is not None and Path(entry["path"]).exists():
+            return digest, entry.get("dhash"), entry["path"]
+        if self.max_distance is None:
+            return digest, None, None
+        dhash = frame_hash(image)
+        for entry in frames.values():
+            distance = hash_distance(dhash, entry.get("dhash"))
+            if distance is None or distance > self.max_distance:
+                continue
+            try:
+                if same_pixels(image, Path(entry["path"]).read_bytes(), self.pixel_tolerance):
+                    return digest, dhash, entry["path"]
+            except OSError:
+                continue
+        return digest, dhash, None
+
+    async def save(self, image: bytes, path) -> str:
+        """Store ``image`` at ``path`` unless it is a duplicate; returns the path holding the frame."""
+        frames = self._index()
+        digest, dhash, existing = await asyncio.to_thread(self.match, image, dict(frames))
+        if existing is not None:
+            self.stats["deduplicated"] += 1
+            return existing
+        await asyncio.to_thread(write_file, path, image)
+        self.stats["stored"] += 1
+        frames[digest] = {"path": str(path), "dhash": dhash}
+        await asyncio.to_thread(self._write_index, json.dumps(frames))
+        return str(path)
+
+    def _write_index(self, text: str):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(f".frames.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+
+async def capture(page, copies=(), archive_path=None, store: FrameStore = None):
+    """
+    Render ``page`` once and write the JPEG to each of ``copies``, and to
+    ``archive_path`` (through ``store`` when given). Returns the path the
+    archived frame is stored at, or ``None`` without ``archive_path``.
+    """
+    image = await page.screenshot(**SCREENSHOT_OPTIONS)
+    writes = [asyncio.to_thread(write_file, path, image) for path in copies]
+    if archive_path is None:
+        await asyncio.gather(*writes)
+        return None
+    archived = store.save(image, archive_path) if store is not None else asyncio.to_thread(write_file, archive_path, image)
+    stored, *_ = await asyncio.gather(archived, *writes)
+    return stored if store is not None else str(archive_path)
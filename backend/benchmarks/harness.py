@@ -0,0 +1,25 @@
+"""Shared helpers for the offline benchmarks."""
+import math
+from typing import List
+
+from ..external_integrations.youtube_stub import serve  # noqa: F401  (re-exported for the benchmarks)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``, 0.0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> dict:
+    """Latency summary in milliseconds."""
+    return {
+        'count': len(samples),
+        'mean_ms': round(1000 * sum(samples) / len(samples), 2) if samples else 0.0,
+        'p50_ms': round(1000 * percentile(samples, 50), 2),
+        'p95_ms': round(1000 * percentile(samples, 95), 2),
+        'p99_ms': round(1000 * percentile(samples, 99), 2),
+    }
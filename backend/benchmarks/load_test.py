@@ -0,0 +1,193 @@
+"""
+Throughput and tail latency of /api/generate-playlist under concurrent load.
+
+Drives the backend, in-process or on localhost, against the YouTube stub and
+in-memory stores so no network, API key or MongoDB is needed:
+
+    python -m backend.benchmarks.load_test --requests 2000 --concurrency 50 --themes 100 --latency 0.2
+
+Themes are drawn round-robin from a pool of ``--themes`` names, so the pool size
+sets how much of the load the playlist cache absorbs. The YouTube client is built
+from the server's own settings (``YOUTUBE_*`` environment variables), so quota,
+rate limit, circuit breaker, retries and hedging shape the results as they would
+in production; ``--no-limits`` drops the quota scheduler and circuit breaker to
+measure the raw pipeline instead. The report is JSON (stdout,
+or ``--output``); with ``--max-p95-ms``, ``--max-p99-ms`` or ``--max-fallback-rate``
+the process exits non-zero when a threshold is exceeded, for gating regressions in CI.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+import httpx
+
+from .. import server
+from ..external_integrations.playlist_cache import PlaylistCache
+from ..external_integrations.quota import QuotaScheduler
+from ..external_integrations.resilience import CircuitBreaker
+from ..external_integrations.singleflight import SingleFlight
+from ..external_integrations.youtube import YouTubeClient
+from ..external_integrations.youtube_stub import running_stub
+from .harness import serve, summarize
+from .memory_store import MemoryCollection, MemorySongCatalog
+
+GENRES = ("grunge", "britpop", "eurodance", "rnb", "hip hop", "ska", "trance", "house", "swing", "funk")
+
+
+def theme_pool(size: int):
+    return [f"{GENRES[i % len(GENRES)]} {i // len(GENRES)}" for i in range(size)]
+
+
+@contextlib.contextmanager
+def isolated_server(stub_url: str, limits: bool = True):
+    """
+    Point the server module at the stub and fresh in-memory stores, restoring it afterwards.
+
+    The client gets the server's own options and a fresh quota scheduler and
+    circuit breaker built from its settings; only the API URL differs. Without
+    ``limits`` it runs with neither.
+    """
+    names = ("YOUTUBE_API_KEY", "youtube_quota", "youtube_breaker", "youtube_client",
+             "playlist_cache", "song_catalog", "playlist_flights")
+    saved = {name: getattr(server, name) for name in names}
+    server.YOUTUBE_API_KEY = "benchmark-key"
+    server.youtube_quota = QuotaScheduler(**server.YOUTUBE_QUOTA_OPTIONS)
+    server.youtube_breaker = CircuitBreaker(**server.YOUTUBE_BREAKER_OPTIONS)
+    server.youtube_client = YouTubeClient(
+        "benchmark-key", api_url=stub_url,
+        quota=server.youtube_quota if limits else None, breaker=server.youtube_breaker if limits else None,
+        **server.YOUTUBE_CLIENT_OPTIONS,
+    )
+    server.playlist_cache = PlaylistCache(MemoryCollection())
+    server.song_catalog = MemorySongCatalog()
+    server.playlist_flights = SingleFlight()
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(server, name, value)
+
+
+@contextlib.asynccontextmanager
+async def api_client(mode: str):
+    if mode == "localhost":
+        async with serve(server.app) as base_url:
+            async with httpx.AsyncClient(base_url=base_url, timeout=30) as api:
+                yield api
+    else:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as api:
+            yield api
+
+
+async def drive(api, themes, requests: int, concurrency: int, count: int):
+    """Send ``requests`` playlist requests from ``concurrency`` workers; returns per-request outcomes."""
+    outcomes = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            try:
+                response = await api.post("/api/generate-playlist", json={"theme": themes[i % len(themes)], "count": count})
+                status = response.status_code
+                fallback = status == 200 and response.json()["message"].startswith("Using sample")
+            except httpx.HTTPError as e:
+                status, fallback = type(e).__name__, False
+            outcomes.append((time.perf_counter() - started, status, fallback))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return outcomes
+
+
+async def run(requests: int = 1000, concurrency: int = 50, themes: int = 100, count: int = 10,
+              latency: float = 0.2, error_rate: float = 0.0, mode: str = "inprocess", limits: bool = True) -> dict:
+    pool = theme_pool(themes)
+    async with running_stub(latency=latency, error_rate=error_rate) as (stub, stub_url):
+        with isolated_server(stub_url, limits):
+            async with api_client(mode) as api:
+                started = time.perf_counter()
+                outcomes = await drive(api, pool, requests, concurrency, count)
+                elapsed = time.perf_counter() - started
+            cache_stats = server.playlist_cache.stats()
+            circuit_stats = server.youtube_breaker.stats()
+            quota_stats = server.youtube_quota.stats()
+            await server.youtube_client.aclose()
+
+    latencies = [seconds for seconds, status, _ in outcomes if status == 200]
+    return {
+        "config": {"requests": requests, "concurrency": concurrency, "themes": themes, "count": count,
+                   "upstream_latency_s": latency, "upstream_error_rate": error_rate, "mode": mode, "limits": limits},
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(outcomes) / elapsed, 2) if elapsed else 0.0,
+        "latency": summarize(latencies),
+        "statuses": {str(status): n for status, n in Counter(status for _, status, _ in outcomes).items()},
+        "error_rate": round(1 - len(latencies) / len(outcomes), 4) if outcomes else 0.0,
+        "fallback_rate": round(sum(fallback for _, _, fallback in outcomes) / len(outcomes), 4) if outcomes else 0.0,
+        "upstream_calls": stub.state.calls,
+        "cache_hit_ratio": cache_stats["hit_ratio"],
+        "circuit": circuit_stats if limits else None,
+        "quota": quota_stats if limits else None,
+    }
+
+
+def check_thresholds(report: dict, max_p95_ms: Optional[float] = None, max_p99_ms: Optional[float] = None,
+                     max_fallback_rate: Optional[float] = None) -> list:
+    """Descriptions of every threshold the report exceeds."""
+    failures = []
+    for name, limit, value in (
+        ("p95_ms", max_p95_ms, report["latency"]["p95_ms"]),
+        ("p99_ms", max_p99_ms, report["latency"]["p99_ms"]),
+        ("fallback_rate", max_fallback_rate, report["fallback_rate"]),
+    ):
+        if limit is not None and value > limit:
+            failures.append(f"{name} {value} exceeds {limit}")
+    if report["error_rate"]:
+        failures.append(f"error_rate {report['error_rate']} is not zero")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /api/generate-playlist against a stub YouTube API")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--themes", type=int, default=100, help="Distinct themes cycled through")
+    parser.add_argument("--count", type=int, default=10, help="Songs per playlist")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub YouTube latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub calls answered with 503")
+    parser.add_argument("--mode", choices=["inprocess", "localhost"], default="inprocess",
+                        help="Call the app through ASGI directly or over a localhost socket")
+    parser.add_argument("--no-limits", dest="limits", action="store_false",
+                        help="Bypass the YouTube quota scheduler and circuit breaker")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-fallback-rate", type=float)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend.server").setLevel(logging.CRITICAL)
+    report = asyncio.run(run(args.requests, args.concurrency, args.themes, args.count,
+                             args.latency, args.error_rate, args.mode, args.limits))
+    failures = check_thresholds(report, args.max_p95_ms, args.max_p99_ms, args.max_fallback_rate)
+    report["failures"] = failures
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
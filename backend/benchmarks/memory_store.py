@@ -0,0 +1,44 @@
+"""In-memory stand-ins for the MongoDB-backed stores, for tests and benchmarks."""
+from ..external_integrations.playlist_cache import normalize_theme
+from ..external_integrations.song_catalog import SONG_FIELDS, SongCatalog, derive_tags
+
+
+class MemoryCollection:
+    """Just enough of a Motor collection for the playlist cache."""
+
+    def __init__(self):
+        self.docs = {}
+        self.indexes = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+    async def find_one(self, query):
+        doc = self.docs.get(query['_id'])
+        return dict(doc) if doc is not None else None
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query['_id']] = dict(doc, _id=query['_id'])
+
+
+class MemorySongCatalog(SongCatalog):
+    """Song catalog whose text search is a tag overlap count over a dict."""
+
+    def __init__(self, songs=()):
+        super().__init__()
+        self.songs = {}
+        for song in songs:
+            self.songs[song['videoId']] = dict(song, tags=song.get('tags') or derive_tags(song))
+
+    async def search(self, theme, limit):
+        self.counters['searches'] += 1
+        terms = set(normalize_theme(theme).split())
+        scored = [(len(terms & set(song['tags'])), song) for song in self.songs.values()]
+        scored = sorted((item for item in scored if item[0] >= self.min_score), key=lambda item: -item[0])
+        return [{field: song[field] for field in SONG_FIELDS} for _, song in scored[:limit]]
+
+    async def harvest(self, songs, theme=None):
+        for song in songs:
+            tags = derive_tags(song, theme)
+            existing = self.songs.get(song['videoId'], {}).get('tags', [])
+            self.songs[song['videoId']] = dict(song, tags=existing + [t for t in tags if t not in existing])
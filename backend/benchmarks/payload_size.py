@@ -0,0 +1,84 @@
+"""
+Bytes transferred and decode time per YouTube search, legacy request shape vs lean.
+
+The legacy shape is what generate_playlist used to send: ``maxResults=50``, the
+whole ``snippet`` and ``response.json()``. The lean shape uses the ``fields``
+projection, ``maxResults`` sized from the playlist count and the fast JSON path:
+
+    python -m backend.benchmarks.payload_size --counts 5 10 15
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from ..external_integrations import fastjson
+from ..external_integrations.youtube import SEARCH_FIELDS, parse_songs
+from ..external_integrations.youtube_stub import running_stub
+
+MARGIN = 5
+
+
+def time_per_call(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+async def fetch(client, url, max_results, fields):
+    params = {'part': 'snippet', 'q': '90s music rock', 'type': 'video', 'maxResults': max_results}
+    if fields:
+        params['fields'] = fields
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return response.content
+
+
+def measure(content, decode, count, repeat):
+    data = decode(content)
+    playlist = parse_songs(data)[:count]
+    return {
+        'bytes': len(content),
+        'decode_us': round(1e6 * time_per_call(lambda: decode(content), repeat), 2),
+        'parse_us': round(1e6 * time_per_call(lambda: parse_songs(decode(content))[:count], repeat), 2),
+        'encode_us': None,
+        'songs': len(playlist),
+    }
+
+
+async def run(counts, repeat):
+    results = []
+    async with running_stub() as (_, url):
+        async with httpx.AsyncClient() as client:
+            for count in counts:
+                legacy = measure(await fetch(client, url, 50, None), json.loads, count, repeat)
+                lean = measure(await fetch(client, url, count + MARGIN, SEARCH_FIELDS), fastjson.loads, count, repeat)
+                body = {'playlist': parse_songs(fastjson.loads(await fetch(client, url, count, SEARCH_FIELDS)))}
+                legacy['encode_us'] = round(1e6 * time_per_call(lambda: json.dumps(body).encode(), repeat), 2)
+                lean['encode_us'] = round(1e6 * time_per_call(lambda: fastjson.dumps(body), repeat), 2)
+                results.append({
+                    'count': count,
+                    'legacy': legacy,
+                    'lean': lean,
+                    'bytes_ratio': round(lean['bytes'] / legacy['bytes'], 4),
+                    'parse_speedup': round(legacy['parse_us'] / lean['parse_us'], 2),
+                })
+    return {'orjson': fastjson.HAS_ORJSON, 'repeat': repeat, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure YouTube search payload size and decode cost")
+    parser.add_argument("--counts", type=int, nargs="+", default=[5, 10, 15])
+    parser.add_argument("--repeat", type=int, default=200, help="Decode iterations per measurement")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    print(json.dumps(asyncio.run(run(args.counts, args.repeat)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
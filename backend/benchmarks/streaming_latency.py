@@ -0,0 +1,90 @@
+"""
+Time-to-first-song for the buffered and streaming playlist endpoints.
+
+Boots the backend on localhost against the YouTube stub and an in-memory
+catalog seeded with a few local matches per theme, then compares how long a
+client waits for the first song on each endpoint:
+
+    python -m backend.benchmarks.streaming_latency --iterations 20 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from .. import server
+from ..external_integrations.playlist_cache import PlaylistCache
+from ..external_integrations.youtube import YouTubeClient
+from ..external_integrations.youtube_stub import running_stub
+from .harness import serve, summarize
+from .memory_store import MemorySongCatalog
+
+
+def seed_songs(themes, per_theme):
+    for theme in themes:
+        for i in range(per_theme):
+            video_id = f"{theme}-{i:02d}"
+            yield {"title": f"Local {theme} {i}", "artist": "Catalog", "videoId": video_id,
+                   "thumbnail": f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg", "tags": [theme]}
+
+
+async def time_buffered(api, theme, count):
+    started = time.perf_counter()
+    response = await api.post("/api/generate-playlist", json={"theme": theme, "count": count})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def time_streaming(api, theme, count):
+    started = time.perf_counter()
+    first_song = None
+    async with api.stream("POST", "/api/generate-playlist/stream", json={"theme": theme, "count": count}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_song is None and '"song"' in line:
+                first_song = time.perf_counter() - started
+    return first_song, time.perf_counter() - started
+
+
+async def run(iterations, latency, local_songs, count):
+    themes = [f"{kind}{i}" for kind in ("buffered", "streamed") for i in range(iterations)]
+    server.YOUTUBE_API_KEY = "benchmark-key"
+    server.playlist_cache = PlaylistCache()
+    server.song_catalog = MemorySongCatalog(seed_songs(themes, local_songs))
+
+    buffered, first_song, streamed_total = [], [], []
+    async with running_stub(latency=latency) as (_, stub_url), serve(server.app) as base_url:
+        server.youtube_client = YouTubeClient("benchmark-key", api_url=stub_url)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as api:
+            for i in range(iterations):
+                buffered.append(await time_buffered(api, f"buffered{i}", count))
+                first, total = await time_streaming(api, f"streamed{i}", count)
+                first_song.append(first)
+                streamed_total.append(total)
+        await server.youtube_client.aclose()
+
+    return {
+        "config": {"iterations": iterations, "upstream_latency_s": latency, "local_songs": local_songs, "count": count},
+        "buffered_time_to_first_song": summarize(buffered),
+        "streaming_time_to_first_song": summarize(first_song),
+        "streaming_total": summarize(streamed_total),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time-to-first-song for buffered and streaming playlists")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub YouTube latency in seconds")
+    parser.add_argument("--local-songs", type=int, default=3, help="Catalog matches seeded per theme")
+    parser.add_argument("--count", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    print(json.dumps(asyncio.run(run(args.iterations, args.latency, args.local_songs, args.count)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+from types import MappingProxyType
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from .song_catalog import SONG_FIELDS, derive_tags, tokenize
+
+RELEVANT_OFFSET = 1e6
+
+
+class FallbackCatalog:
+    """
+    Immutable, array-backed catalog for the sample fallback playlists.
+
+    Songs are tokenized once at load time into an inverted index stored as flat
+    NumPy arrays (postings sorted by token, with per-token offsets and IDF-style
+    weights). A theme is scored against every song with a single ``bincount``
+    over the postings of its tokens. Playlists take relevant songs first, drawn by
+    seeded sampling without replacement weighted by score (Gumbel top-k), then
+    fill up with a seeded shuffle of the rest, so no request copies or mutates the
+    catalog however large it grows.
+    """
+
+    def __init__(self, songs: Iterable[dict]):
+        songs = list(songs)
+        self.songs = tuple(MappingProxyType({field: song[field] for field in SONG_FIELDS}) for song in songs)
+
+        vocabulary = {}
+        doc_ids, token_ids = [], []
+        for index, song in enumerate(songs):
+            for token in derive_tags(song, ' '.join(song.get('tags', ()))):
+                doc_ids.append(index)
+                token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        self.vocabulary = MappingProxyType(vocabulary)
+
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        token_ids = np.asarray(token_ids, dtype=np.int32)
+        order = np.argsort(token_ids, kind='stable')
+        self._postings = doc_ids[order]
+        self._offsets = np.searchsorted(token_ids[order], np.arange(len(vocabulary) + 1)).astype(np.int32)
+
+        n = max(len(self.songs), 1)
+        document_frequency = np.diff(self._offsets)
+        self._idf = (np.log((n + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+        lengths = np.bincount(doc_ids, minlength=len(self.songs)).astype(np.float32)
+        self._length_norm = 1 / np.sqrt(np.maximum(lengths, 1))
+
+        for array in (self._postings, self._offsets, self._idf, self._length_norm):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> 'FallbackCatalog':
+        with open(path, encoding='utf-8') as f:
+            return cls([json.loads(line) for line in f if line.strip()], **kwargs)
+
+    def __len__(self):
+        return len(self.songs)
+
+    def scores(self, theme: str) -> np.ndarray:
+        """Relevance of every song to ``theme`` (zero for songs sharing no token)."""
+        token_ids = [self.vocabulary[token] for token in tokenize(theme) if token in self.vocabulary]
+        if not token_ids:
+            return np.zeros(len(self.songs), dtype=np.float32)
+        postings = np.concatenate([self._postings[self._offsets[t]:self._offsets[t + 1]] for t in token_ids])
+        weights = np.repeat(self._idf[token_ids], np.diff(self._offsets)[token_ids])
+        return np.bincount(postings, weights=weights, minlength=len(self.songs)).astype(np.float32) * self._length_norm
+
+    def select(self, theme: str, count: int, seed: Optional[int] = None, exclude: Iterable[str] = ()) -> List[dict]:
+        """Draw ``count`` distinct songs, favouring ones relevant to ``theme``; deterministic for a given seed."""
+        exclude = set(exclude)
+        draw = min(count + len(exclude), len(self.songs))
+        if draw <= 0:
+            return []
+        rng = np.random.default_rng(seed)
+        scores = self.scores(theme)
+        relevant = scores > 0
+        # Gumbel top-k samples relevant songs without replacement in proportion to their score;
+        # the offset ranks every relevant song ahead of the randomly ordered rest
+        keys = rng.gumbel(size=len(self.songs))
+        keys[relevant] += np.log(scores[relevant]) + RELEVANT_OFFSET
+        top = np.argpartition(-keys, draw - 1)[:draw]
+        top = top[np.argsort(-keys[top])]
+        playlist = []
+        for index in top:
+            song = self.songs[index]
+            if song['videoId'] not in exclude:
+                playlist.append(dict(song))
+                if len(playlist) == count:
+                    break
+        return playlist
@@ -0,0 +1,77 @@
+"""
+Conditional and compressed responses for cacheable GET endpoints.
+
+Bodies get a strong ETag derived from their bytes (and content coding), clients
+revalidating with ``If-None-Match`` get an empty ``304``, and bodies are
+compressed with brotli when installed and accepted, gzip otherwise.
+Compression is done per response rather than by middleware so streaming
+endpoints are never buffered.
+"""
+import gzip
+import hashlib
+from typing import Mapping, Optional
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without brotli
+    brotli = None
+
+MIN_COMPRESS_SIZE = 512
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The preferred supported content coding allowed by an ``Accept-Encoding`` header, if any."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    candidates = [coding for coding in ENCODINGS if weights.get(coding, weights.get('*', 0.0)) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda coding: weights.get(coding, weights.get('*', 0.0)))
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def make_etag(body: bytes, encoding: Optional[str] = None) -> str:
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as ``If-None-Match`` requires."""
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def cacheable_response(request_headers: Mapping[str, str], body: bytes, cache_control: str,
+                       media_type: str = 'application/json') -> Response:
+    """A compressed, ETagged response for ``body``, or a ``304`` if the client already has it."""
+    encoding = negotiate_encoding(request_headers.get('accept-encoding', '')) if len(body) >= MIN_COMPRESS_SIZE else None
+    etag = make_etag(body, encoding)
+    headers = {'ETag': etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if etag_matches(request_headers.get('if-none-match', ''), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return Response(body, media_type=media_type, headers=headers)
@@ -0,0 +1,164 @@
+"""
+Prometheus metrics and lightweight timing spans for the backend.
+
+Everything here is cheap enough to leave on in production: a histogram
+observation is a lock and a few additions, and per-request span collection
+(reported back as a ``Server-Timing`` header) only happens when enabled.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_LATENCY = Histogram(
+    'youtube_upstream_duration_seconds', 'YouTube search call latency',
+    ['outcome'], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    'youtube_upstream_errors_total', 'Failed YouTube search calls by exception class', ['error_class'],
+)
+PLAYLIST_RESULTS = Counter(
+    'playlist_results_total', 'Playlists served by source (cache, catalog, youtube, sample)', ['source'],
+)
+PLAYLIST_FALLBACKS = Counter(
+    'playlist_fallback_total', 'Playlists answered with sample songs, by reason', ['reason'],
+)
+PHASE_LATENCY = Histogram(
+    'playlist_phase_duration_seconds', 'Time spent in generate_playlist phases',
+    ['phase'], buckets=FAST_BUCKETS + (2.5, 5.0, 10.0),
+)
+PREWARMED_REQUESTS = Counter(
+    'playlist_prewarmed_requests_total', 'Playlist requests by whether their theme was pre-warmed', ['warm'],
+)
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds', 'How late the event loop runs a scheduled wakeup', buckets=FAST_BUCKETS,
+)
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar('timings', default=None)
+
+
+@contextlib.contextmanager
+def span(phase: str):
+    """Time a block into the phase histogram and, when tracing, the current request's timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_LATENCY.labels(phase).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + elapsed
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    return ', '.join(f"{phase};dur={1000 * elapsed:.2f}" for phase, elapsed in timings.items())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template.
+
+    With ``trace_timings`` on, spans recorded while handling a request are
+    returned to the client in a ``Server-Timing`` response header.
+    """
+
+    def __init__(self, app, trace_timings: bool = False):
+        self.app = app
+        self.trace_timings = trace_timings
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        timings = {} if self.trace_timings else None
+        token = _timings.set(timings)
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if timings:
+                    message['headers'] = list(message.get('headers', [])) + [
+                        (b'server-timing', server_timing(timings).encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _timings.reset(token)
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            REQUEST_LATENCY.labels(scope['method'], route, str(status)).observe(time.perf_counter() - started)
+
+
+class StatsCollector:
+    """Expose a ``stats()`` dict as gauges, read at scrape time."""
+
+    def __init__(self, prefix: str, stats: Callable[[], dict]):
+        self.prefix = prefix
+        self.stats = stats
+
+    def collect(self):
+        for key, value in _flatten(self.stats()).items():
+            gauge = GaugeMetricFamily(f"{self.prefix}_{key}", f"{self.prefix} {key.replace('_', ' ')}")
+            gauge.add_metric([], value)
+            yield gauge
+
+
+def _flatten(stats: dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}_"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def register_stats(prefix: str, stats: Callable[[], dict], registry=REGISTRY):
+    collector = StatsCollector(prefix, stats)
+    registry.register(collector)
+    return collector
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Run forever, recording how much later than ``interval`` each sleep wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - started - interval, 0.0))
+
+
+def render_latest(registry=None):
+    """
+    Exposition text for ``registry``. Under a multi-worker server with
+    ``PROMETHEUS_MULTIPROC_DIR`` set, counters and histograms are summed across
+    workers instead; the per-worker stats gauges are left out.
+    """
+    if registry is None:
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
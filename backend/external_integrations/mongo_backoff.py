@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Optional
+
+
+class MongoHealth:
+    """
+    Availability of one MongoDB deployment, shared by every store using it so
+    that a single failure backs all of them off for ``retry_after`` seconds.
+
+    ``op_timeout`` bounds operations awaited on the request path; the client's
+    server selection timeout is far too long to wait for there.
+    """
+
+    def __init__(self, retry_after: float = 30, op_timeout: Optional[float] = None):
+        self.retry_after = retry_after
+        self.op_timeout = op_timeout
+        self.down_until = 0.0
+        self.failures = 0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def failed(self):
+        self.failures += 1
+        self.down_until = time.monotonic() + self.retry_after
+
+
+class MongoBackoff:
+    """
+    Fail-soft use of an optional MongoDB ``collection``.
+
+    After an error, :meth:`_mongo_available` reports the collection as down
+    until ``mongo_health`` allows a retry, so callers fall back to in-process
+    state instead of failing requests. Classes using it set ``collection``,
+    ``mongo_health`` and a ``counters`` dict with a ``mongo_errors`` entry, and
+    describe their fallback in ``mongo_error_message``.
+    """
+
+    mongo_error_message = "MongoDB error"
+
+    def _mongo_available(self) -> bool:
+        return self.collection is not None and self.mongo_health.available()
+
+    async def _mongo_op(self, operation: Awaitable):
+        """Await ``operation`` within the shared operation timeout; a timeout raises like any other error."""
+        return await asyncio.wait_for(operation, self.mongo_health.op_timeout)
+
+    def _mongo_failed(self, e: Exception):
+        self.counters['mongo_errors'] += 1
+        self.mongo_health.failed()
+        logging.getLogger(type(self).__module__).warning(f"{self.mongo_error_message}: {str(e) or type(e).__name__}")
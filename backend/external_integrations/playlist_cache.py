@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .mongo_backoff import MongoBackoff, MongoHealth
+
+logger = logging.getLogger(__name__)
+
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def normalize_theme(theme: str) -> str:
+    """Fold case, punctuation and whitespace so equivalent themes share one cache key."""
+    text = unicodedata.normalize('NFKC', theme).casefold()
+    text = ''.join(' ' if unicodedata.category(ch)[0] in 'PS' else ch for ch in text)
+    return ' '.join(text.split())
+
+
+class LRUCache:
+    """Bounded in-process mapping that evicts the least recently used key."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        return self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PlaylistCache(MongoBackoff):
+    """
+    Two-level playlist cache: an in-process LRU in front of a MongoDB collection,
+    with an optional shared Redis tier (:class:`SharedState`) in between so that
+    workers see each other's entries.
+
+    Entries are fresh for ``ttl`` seconds and may then be served stale for another
+    ``stale_ttl`` seconds while a single background refresh runs. MongoDB drops
+    entries once the stale window has passed through a TTL index on ``expire_at``.
+    MongoDB errors and timeouts never fail a request: the cache degrades to memory
+    only until ``mongo_health`` allows the collection to be retried.
+    """
+
+    mongo_error_message = "Playlist cache MongoDB error, using memory only"
+
+    def __init__(self, collection=None, max_entries: int = 1024, ttl: float = 3600,
+                 stale_ttl: float = 86400, mongo_health: Optional[MongoHealth] = None, shared=None):
+        self.collection = collection
+        self.shared = shared
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.mongo_health = mongo_health or MongoHealth()
+        self._local = LRUCache(max_entries)
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            'memory_hits': 0,
+            'shared_hits': 0,
+            'mongo_hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'mongo_errors': 0,
+        }
+
+    async def ensure_indexes(self):
+        if self.collection is None:
+            return
+        await self.collection.create_index('expire_at', expireAfterSeconds=0)
+
+    async def get(self, key: str, count: int = 0) -> Tuple[Optional[List[dict]], str]:
+        """Return ``(playlist, state)`` for a playlist of at least ``count`` songs."""
+        entry, level, state = await self._lookup(key, count)
+        self.counters['misses' if state == MISS else 'stale_hits' if state == STALE else level] += 1
+        return (entry['playlist'] if entry is not None else None), state
+
+    async def peek(self, key: str, count: int = 0) -> str:
+        """The state :meth:`get` would report, without counting a lookup; for background jobs."""
+        _, _, state = await self._lookup(key, count)
+        return state
+
+    async def _lookup(self, key: str, count: int) -> Tuple[Optional[dict], str, str]:
+        now = time.time()
+        entry = self._local.get(key)
+        level = 'memory_hits'
+        if entry is None or entry['expires_at'] <= now:
+            entry, level = await self._load(key)
+            if entry is not None:
+                self._local.put(key, entry)
+        if entry is None or entry['expires_at'] <= now or entry['requested'] < count:
+            return None, level, MISS
+        if entry['fresh_until'] <= now:
+            return entry, level, STALE
+        return entry, level, FRESH
+
+    async def set(self, key: str, playlist: List[dict], count: Optional[int] = None):
+        now = time.time()
+        entry = {
+            'playlist': playlist,
+            'requested': len(playlist) if count is None else count,
+            'fresh_until': now + self.ttl,
+            'expires_at': now + self.ttl + self.stale_ttl,
+        }
+        self._local.put(key, entry)
+        if self.shared is not None:
+            await self.shared.set_entry(key, entry)
+        await self._store(key, entry)
+
+    async def prefetch(self, keys: List[str]):
+        """Pull shared entries for keys missing locally in one round trip, ahead of :meth:`get` calls."""
+        if self.shared is None:
+            return
+        now = time.time()
+        missing = [key for key in dict.fromkeys(keys) if (self._local.get(key) or {}).get('expires_at', 0) <= now]
+        for key, entry in zip(missing, await self.shared.get_entries(missing)):
+            if entry is not None:
+                self._local.put(key, entry)
+
+    def refresh(self, key: str, load: Callable[[], Awaitable[object]]):
+        """
+        Start a background refresh for ``key`` unless one is already running.
+
+        ``load`` fetches the new playlist and stores it with :meth:`set`.
+        """
+        if key in self._refreshing:
+            return self._refreshing[key]
+
+        async def run():
+            try:
+                await load()
+                self.counters['refreshes'] += 1
+            except Exception as e:
+                self.counters['refresh_errors'] += 1
+                logger.warning(f"Playlist cache refresh failed for {key!r}: {str(e)}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = asyncio.create_task(run())
+        self._refreshing[key] = task
+        return task
+
+    def stats(self) -> dict:
+        lookups = sum(self.counters[k] for k in ('memory_hits', 'shared_hits', 'mongo_hits', 'stale_hits', 'misses'))
+        hits = lookups - self.counters['misses']
+        return {
+            **self.counters,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._local),
+            'memory_max_entries': self._local.max_entries,
+            'refreshing': len(self._refreshing),
+        }
+
+    async def _load(self, key: str) -> Tuple[Optional[dict], str]:
+        if self.shared is not None:
+            entry, = await self.shared.get_entries([key])
+            if entry is not None:
+                return entry, 'shared_hits'
+        return await self._load_mongo(key), 'mongo_hits'
+
+    async def _load_mongo(self, key: str) -> Optional[dict]:
+        if not self._mongo_available():
+            return None
+        try:
+            doc = await self._mongo_op(self.collection.find_one({'_id': key}))
+        except Exception as e:
+            self._mongo_failed(e)
+            return None
+        if doc is None:
+            return None
+        return {k: doc[k] for k in ('playlist', 'requested', 'fresh_until', 'expires_at')}
+
+    async def _store(self, key: str, entry: dict):
+        if not self._mongo_available():
+            return
+        doc = dict(entry, expire_at=datetime.now(timezone.utc) + timedelta(seconds=entry['expires_at'] - time.time()))
+        try:
+            await self._mongo_op(self.collection.replace_one({'_id': key}, doc, upsert=True))
+        except Exception as e:
+            self._mongo_failed(e)
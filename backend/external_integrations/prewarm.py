@@ -0,0 +1,181 @@
+"""
+Theme popularity tracking and background pre-warming of popular playlists.
+
+Requests are tallied in memory and flushed to MongoDB in batches, so the hot
+path only increments a counter. A scheduler periodically takes the most
+requested themes across all workers and builds playlists for the ones that are
+not already fresh, spending at most a fixed number of upstream builds per run.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import DESCENDING, UpdateOne
+
+from .metrics import PREWARMED_REQUESTS
+from .mongo_backoff import MongoBackoff, MongoHealth
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of a warm callback
+ALREADY_WARM = 'already_warm'
+WARMED = 'warmed'
+FAILED = 'failed'
+
+
+class ThemeStats(MongoBackoff):
+    """
+    Request counts per theme, kept in a MongoDB collection shared by all workers.
+
+    Themes not requested for ``window`` seconds expire through a TTL index on
+    ``last_seen``. While MongoDB is unavailable, :meth:`top` answers from this
+    worker's own counts (at most ``max_tracked`` themes).
+    """
+
+    mongo_error_message = "Theme stats MongoDB error, using this worker's counts"
+
+    def __init__(self, collection=None, window: float = 7 * 86400, max_tracked: int = 10000,
+                 mongo_health: Optional[MongoHealth] = None):
+        self.collection = collection
+        self.window = window
+        self.max_tracked = max_tracked
+        self.mongo_health = mongo_health or MongoHealth()
+        self._pending: Counter = Counter()
+        self._totals: Counter = Counter()
+        self.counters = {'recorded': 0, 'flushes': 0, 'mongo_errors': 0}
+
+    async def ensure_indexes(self):
+        if self.collection is None:
+            return
+        await self.collection.create_index([('count', DESCENDING)])
+        await self.collection.create_index('last_seen', expireAfterSeconds=int(self.window))
+
+    def record(self, theme: str):
+        self.counters['recorded'] += 1
+        self._pending[theme] += 1
+        self._totals[theme] += 1
+        if len(self._totals) > self.max_tracked:
+            self._totals = Counter(dict(self._totals.most_common(self.max_tracked // 2)))
+
+    async def flush(self):
+        """Write the counts recorded since the last flush in one bulk upsert."""
+        if not self._pending or not self._mongo_available():
+            return
+        pending, self._pending = self._pending, Counter()
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne({'_id': theme}, {'$inc': {'count': n}, '$set': {'last_seen': now}}, upsert=True)
+            for theme, n in pending.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            self._pending.update(pending)
+            self._mongo_failed(e)
+            return
+        self.counters['flushes'] += 1
+
+    async def run_flush(self, interval: float = 10.0):
+        """Run forever, flushing every ``interval`` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def top(self, n: int) -> List[str]:
+        """The ``n`` most requested themes, most popular first."""
+        await self.flush()
+        if self._mongo_available():
+            since = datetime.now(timezone.utc) - timedelta(seconds=self.window)
+            try:
+                cursor = self.collection.find({'last_seen': {'$gte': since}}, {'_id': 1})
+                docs = await cursor.sort('count', DESCENDING).limit(n).to_list(length=n)
+                return [doc['_id'] for doc in docs]
+            except Exception as e:
+                self._mongo_failed(e)
+        return [theme for theme, _ in self._totals.most_common(n)]
+
+    def stats(self) -> dict:
+        return {**self.counters, 'tracked': len(self._totals), 'pending': len(self._pending)}
+
+
+class Prewarmer:
+    """
+    Keep the ``top_n`` most requested themes warm.
+
+    Every ``interval`` seconds (and once at startup, after up to ``jitter``
+    seconds so workers do not start in lockstep), ``warm(theme)`` is called for
+    each popular theme in order. It reports :data:`ALREADY_WARM` when the theme
+    is still fresh, :data:`WARMED` after building it, or :data:`FAILED`. A run
+    stops after ``budget`` builds, or at the first failure since the upstream is
+    then throttled or unhealthy. Themes count as pre-warmed for ``ttl`` seconds
+    after a run found them warm; :meth:`record_served` tallies how many requests
+    they absorb.
+    """
+
+    def __init__(self, theme_stats: ThemeStats, warm: Callable[[str], Awaitable[str]], top_n: int = 20,
+                 budget: int = 10, interval: float = 900, ttl: float = 3600, jitter: float = 5.0):
+        self.theme_stats = theme_stats
+        self.warm = warm
+        self.top_n = top_n
+        self.budget = budget
+        self.interval = interval
+        self.ttl = ttl
+        self.jitter = jitter
+        self._warm_until: Dict[str, float] = {}
+        self.counters = {'runs': 0, 'builds': 0, 'failures': 0, 'served': 0, 'served_warm': 0}
+
+    def is_warm(self, theme: str) -> bool:
+        return self._warm_until.get(theme, 0.0) > time.monotonic()
+
+    def record_served(self, theme: str):
+        warm = self.is_warm(theme)
+        self.counters['served'] += 1
+        self.counters['served_warm'] += warm
+        PREWARMED_REQUESTS.labels(str(warm).lower()).inc()
+
+    async def run_once(self) -> int:
+        """Warm the current top themes; returns how many were built upstream."""
+        self.counters['runs'] += 1
+        now = time.monotonic()
+        self._warm_until = {theme: until for theme, until in self._warm_until.items() if until > now}
+        builds = 0
+        for theme in await self.theme_stats.top(self.top_n):
+            if builds >= self.budget:
+                break
+            try:
+                outcome = await self.warm(theme)
+            except Exception as e:
+                logger.warning(f"Pre-warming {theme!r} failed: {str(e)}")
+                outcome = FAILED
+            if outcome == FAILED:
+                self.counters['failures'] += 1
+                break
+            if outcome == WARMED:
+                builds += 1
+            self._warm_until[theme] = time.monotonic() + self.ttl
+        self.counters['builds'] += builds
+        if builds:
+            logger.info(f"Pre-warmed {builds} popular themes")
+        return builds
+
+    async def run(self, initial_delay: Optional[float] = None):
+        """Run forever: once shortly after startup, then every ``interval`` seconds."""
+        await asyncio.sleep(random.uniform(0, self.jitter) if initial_delay is None else initial_delay)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Pre-warming run failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        served = self.counters['served']
+        return {
+            **self.counters,
+            'warm_themes': sum(until > time.monotonic() for until in self._warm_until.values()),
+            'warm_coverage': round(self.counters['served_warm'] / served, 4) if served else 0.0,
+        }
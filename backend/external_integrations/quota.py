@@ -0,0 +1,157 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Every search.list call costs 100 units of the daily YouTube Data API quota
+SEARCH_COST = 100
+
+HIGH = 'high'
+NORMAL = 'normal'
+LOW = 'low'
+PRIORITIES = (HIGH, NORMAL, LOW)
+
+try:
+    from zoneinfo import ZoneInfo
+    # The YouTube quota resets at midnight Pacific time
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    QUOTA_TIMEZONE = timezone.utc
+
+
+class QuotaExhausted(Exception):
+    """Raised instead of calling upstream when the quota scheduler denies a call."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+
+class QuotaScheduler:
+    """
+    Quota ledger and rate limiter in front of the YouTube search endpoint.
+
+    Each call spends ``cost`` units of ``daily_budget`` and one token from a
+    per-second bucket. Lower priorities stop spending earlier so the budget never
+    runs dry for interactive requests: ``normal`` calls keep ``reserve`` of the
+    budget untouched, ``low`` (background refresh) calls keep twice that, and only
+    ``high`` calls may spend the last units. Denied calls raise
+    :class:`QuotaExhausted` so callers fall back to cache, catalog or sample data.
+
+    Several workers can share one budget: spend not yet reported is handed out by
+    :meth:`take_unsynced` and the shared total adopted with :meth:`merge_shared`.
+    The rate limit stays per worker.
+    """
+
+    def __init__(self, daily_budget: int = 10000, rate: float = 5.0, burst: Optional[float] = None,
+                 reserve: float = 0.1, cost: int = SEARCH_COST,
+                 clock: Callable[[], float] = time.time, monotonic: Callable[[], float] = time.monotonic):
+        self.daily_budget = daily_budget
+        self.cost = cost
+        self.clock = clock
+        self.bucket = TokenBucket(rate, burst, clock=monotonic)
+        self.floors = {
+            HIGH: 0,
+            NORMAL: daily_budget * reserve,
+            LOW: daily_budget * min(2 * reserve, 1.0),
+        }
+        self.spent = 0
+        self._unsynced = 0
+        self.throttled = {'rate': 0, 'budget': 0}
+        self.calls = {priority: 0 for priority in PRIORITIES}
+        self._day_started, self._resets_at = self._current_window()
+
+    @property
+    def remaining(self) -> int:
+        self._roll_over()
+        return max(self.daily_budget - self.spent, 0)
+
+    def acquire(self, priority: str = NORMAL):
+        """Spend quota for one call or raise :class:`QuotaExhausted`."""
+        if self.remaining - self.cost < self.floors[priority]:
+            self.throttled['budget'] += 1
+            raise QuotaExhausted('budget', f"YouTube quota budget reserved ({self.remaining} units left)")
+        if not self.bucket.try_acquire():
+            self.throttled['rate'] += 1
+            raise QuotaExhausted('rate', "YouTube request rate limited")
+        self.spent += self.cost
+        self._unsynced += self.cost
+        self.calls[priority] += 1
+
+    def window(self) -> Tuple[str, float]:
+        """The current quota day as a date string, and when it resets."""
+        self._roll_over()
+        return datetime.fromtimestamp(self._day_started, QUOTA_TIMEZONE).date().isoformat(), self._resets_at
+
+    def take_unsynced(self) -> int:
+        """Units spent by this worker since the last call, for adding to a shared ledger."""
+        self._roll_over()
+        units, self._unsynced = self._unsynced, 0
+        return units
+
+    def return_unsynced(self, units: int):
+        self._unsynced += units
+
+    def merge_shared(self, window: str, total: int):
+        """Adopt ``total`` units spent across all workers in ``window`` (which includes what was taken)."""
+        if window == self.window()[0]:
+            self.spent = max(self.spent, total + self._unsynced)
+
+    def projected_exhaustion(self) -> Optional[datetime]:
+        """When the budget runs out at the average burn rate since the last reset, if before the next reset."""
+        self._roll_over()
+        elapsed = self.clock() - self._day_started
+        if self.spent <= 0 or elapsed <= 0:
+            return None
+        seconds_left = (self.daily_budget - self.spent) / (self.spent / elapsed)
+        exhaustion = self.clock() + seconds_left
+        if exhaustion >= self._resets_at:
+            return None
+        return datetime.fromtimestamp(exhaustion, timezone.utc)
+
+    def stats(self) -> dict:
+        exhaustion = self.projected_exhaustion()
+        return {
+            'daily_budget': self.daily_budget,
+            'spent': self.spent,
+            'remaining': self.remaining,
+            'calls': dict(self.calls),
+            'throttled': dict(self.throttled),
+            'resets_at': datetime.fromtimestamp(self._resets_at, timezone.utc).isoformat(),
+            'projected_exhaustion': exhaustion.isoformat() if exhaustion else None,
+        }
+
+    def _current_window(self):
+        now = datetime.fromtimestamp(self.clock(), QUOTA_TIMEZONE)
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Aware datetime arithmetic is wall-clock, so this is the next local midnight even across DST
+        return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+    def _roll_over(self):
+        if self.clock() >= self._resets_at:
+            logger.info(f"YouTube quota window reset after spending {self.spent} units")
+            self.spent = 0
+            self._unsynced = 0
+            self._day_started, self._resets_at = self._current_window()
@@ -0,0 +1,172 @@
+"""
+Failure handling for upstream calls: a circuit breaker, hedged requests and
+per-request deadlines.
+
+A deadline is set once per incoming request with :func:`deadline` and read by
+every upstream call made on its behalf (through a context variable), so
+retries and hedges can never stretch a request beyond its budget.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('deadline', default=None)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before the upstream call finished."""
+
+
+@contextlib.contextmanager
+def deadline(seconds: Optional[float], inherit: bool = True):
+    """
+    Bound everything awaited inside the block to ``seconds``; nested deadlines
+    only ever shorten it, unless ``inherit`` is false and the block starts a
+    budget of its own (for work shared by several requests).
+    """
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get() if inherit else None
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline, or ``None`` without one."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable``, cancelling it with :class:`DeadlineExceeded` when the current deadline passes."""
+    remaining = time_left()
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded") from None
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: Optional[float], hedges: int = 1) -> T:
+    """
+    Await ``call()``, starting up to ``hedges`` duplicate attempts each time
+    ``delay`` seconds pass without an answer. The first success wins and the
+    other attempts are cancelled; the last error is raised if all of them fail.
+    """
+    pending = {asyncio.ensure_future(call())}
+    launched = 1
+    error: Optional[BaseException] = None
+    try:
+        while True:
+            can_hedge = delay is not None and launched <= hedges
+            done, pending = await asyncio.wait(pending, timeout=delay if can_hedge else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if not done:
+                pending.add(asyncio.ensure_future(call()))
+                launched += 1
+            elif not pending:
+                raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast with :class:`CircuitOpen` for ``recovery_time`` seconds. It then
+    turns half-open: ``half_open_calls`` probes go through, closing the circuit
+    if one succeeds and reopening it if one fails.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0, half_open_calls: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.counters = {'opened': 0, 'rejected': 0, 'failures': 0, 'successes': 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.recovery_time:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def before_call(self) -> bool:
+        """Admit one call or raise :class:`CircuitOpen`; returns whether the call is a half-open probe."""
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_calls):
+            self.counters['rejected'] += 1
+            raise CircuitOpen("YouTube circuit breaker is open")
+        if state == HALF_OPEN:
+            self._probes += 1
+            return True
+        return False
+
+    def release(self, probe: bool):
+        """End an admitted call that says nothing about the upstream (throttled locally or cancelled)."""
+        if probe and self._state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self):
+        self.counters['successes'] += 1
+        if self._state != CLOSED:
+            logger.info("YouTube circuit breaker closed")
+        self._state = CLOSED
+        self._failures = 0
+
+    def record_failure(self):
+        self.counters['failures'] += 1
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.counters['opened'] += 1
+                logger.warning(f"YouTube circuit breaker opened after {self._failures} failures")
+            self._state = OPEN
+            self._opened_at = self.clock()
+
+    def stats(self) -> dict:
+        state = self.state
+        return {
+            'state': state,
+            'open': int(state == OPEN),
+            'consecutive_failures': self._failures,
+            **self.counters,
+        }
@@ -0,0 +1,129 @@
+"""
+Optional Redis tier shared by every worker and pod.
+
+With ``REDIS_URL`` set, playlist cache entries and YouTube quota spending go
+through Redis, so hit rates and quota accounting do not drift per worker.
+Redis is never required: errors degrade to the in-process state, and Redis is
+retried after ``retry_after`` seconds.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from . import fastjson
+from .quota import QuotaScheduler
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - exercised only without redis
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class SharedState:
+    """
+    Playlist entries and quota counters kept in Redis under ``prefix``.
+
+    Round trips are batched: :meth:`get_entries` reads any number of playlists
+    with one ``MGET``, and :meth:`add_quota` increments the day's counter and sets
+    its expiry in a single pipeline.
+    """
+
+    def __init__(self, redis, prefix: str = 'mixtape', retry_after: float = 30):
+        self.redis = redis
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self.counters = {'reads': 0, 'hits': 0, 'writes': 0, 'quota_syncs': 0, 'errors': 0}
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> Optional['SharedState']:
+        if aioredis is None:
+            logger.warning("REDIS_URL is set but the redis package is not installed, using in-process state only")
+            return None
+        return cls(aioredis.from_url(url, socket_timeout=1, socket_connect_timeout=1), **kwargs)
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    async def ping(self) -> bool:
+        try:
+            return bool(await self.redis.ping())
+        except Exception as e:
+            self._failed(e)
+            return False
+
+    async def get_entries(self, keys: Iterable[str]) -> List[Optional[dict]]:
+        """Cached playlist entries for ``keys``, ``None`` where missing or while Redis is down."""
+        keys = list(keys)
+        if not keys or not self.available():
+            return [None] * len(keys)
+        self.counters['reads'] += len(keys)
+        try:
+            values = await self.redis.mget([self._key('playlist', key) for key in keys])
+        except Exception as e:
+            self._failed(e)
+            return [None] * len(keys)
+        entries = [fastjson.loads(value) if value is not None else None for value in values]
+        self.counters['hits'] += sum(entry is not None for entry in entries)
+        return entries
+
+    async def set_entry(self, key: str, entry: dict):
+        ttl = entry['expires_at'] - time.time()
+        if ttl <= 0 or not self.available():
+            return
+        try:
+            await self.redis.set(self._key('playlist', key), fastjson.dumps(entry), px=int(ttl * 1000))
+        except Exception as e:
+            self._failed(e)
+            return
+        self.counters['writes'] += 1
+
+    async def add_quota(self, window: str, units: int, expires_at: float) -> Optional[int]:
+        """Add ``units`` to the shared spend for ``window`` and return the total across workers."""
+        if not self.available():
+            return None
+        key = self._key('quota', window)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.incrby(key, units)
+                pipe.expireat(key, int(expires_at) + 3600)
+                total, _ = await pipe.execute()
+        except Exception as e:
+            self._failed(e)
+            return None
+        self.counters['quota_syncs'] += 1
+        return int(total)
+
+    async def sync_quota(self, quota: QuotaScheduler) -> bool:
+        """Push this worker's unsynced spend and adopt the shared total; ``False`` if Redis is unavailable."""
+        window, expires_at = quota.window()
+        units = quota.take_unsynced()
+        total = await self.add_quota(window, units, expires_at)
+        if total is None:
+            quota.return_unsynced(units)
+            return False
+        quota.merge_shared(window, total)
+        return True
+
+    async def run_quota_sync(self, quota: QuotaScheduler, interval: float = 5.0):
+        """Run forever, syncing ``quota`` every ``interval`` seconds."""
+        while True:
+            await self.sync_quota(quota)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
+
+    async def aclose(self):
+        await self.redis.aclose()
+
+    def _key(self, kind: str, key: str) -> str:
+        return f"{self.prefix}:{kind}:{key}"
+
+    def _failed(self, e: Exception):
+        self.counters['errors'] += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning(f"Redis error, using in-process state only: {str(e)}")
@@ -0,0 +1,184 @@
+"""
+Persistent local song catalog backed by a MongoDB text index.
+
+Songs returned by YouTube are harvested into the catalog together with tags
+derived from their title, channel and the theme that found them, so repeat
+themes can be answered by an indexed local query instead of a remote search.
+
+Seed or back up the catalog offline with
+
+    python -m backend.external_integrations.song_catalog import songs.jsonl
+    python -m backend.external_integrations.song_catalog export songs.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Optional
+
+from pymongo import TEXT, UpdateOne
+
+from .mongo_backoff import MongoBackoff, MongoHealth
+from .playlist_cache import normalize_theme
+
+logger = logging.getLogger(__name__)
+
+SONG_FIELDS = ('title', 'artist', 'videoId', 'thumbnail')
+
+# Words that show up in most upload titles and say nothing about the song
+TAG_STOPWORDS = frozenset("""
+    a an and the of in on to for with by at from feat ft featuring vs x
+    official video music audio lyrics lyric hd hq remastered remaster version full
+    live mv clip 90s 1990s
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Distinct normalized tokens of ``text``, minus filler words."""
+    tokens = []
+    for token in normalize_theme(text).split():
+        if len(token) > 1 and token not in TAG_STOPWORDS and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def derive_tags(song: dict, theme: Optional[str] = None) -> List[str]:
+    """Tokens from the title, artist and originating theme, minus filler words."""
+    return tokenize(' '.join(filter(None, (song.get('title'), song.get('artist'), theme))))
+
+
+class SongCatalog(MongoBackoff):
+    """
+    Song catalog stored in a MongoDB collection with a weighted text index over
+    title, artist and tags. Like the playlist cache, MongoDB errors degrade to
+    "no local matches" until ``mongo_health`` allows the collection to be retried.
+    """
+
+    mongo_error_message = "Song catalog MongoDB error, skipping local catalog"
+
+    def __init__(self, collection=None, min_score: float = 1.0, mongo_health: Optional[MongoHealth] = None):
+        self.collection = collection
+        self.min_score = min_score
+        self.mongo_health = mongo_health or MongoHealth()
+        self.counters = {'searches': 0, 'matches': 0, 'harvested': 0, 'mongo_errors': 0}
+
+    async def ensure_indexes(self):
+        if self.collection is None:
+            return
+        await self.collection.create_index('videoId', unique=True)
+        await self.collection.create_index(
+            [('tags', TEXT), ('title', TEXT), ('artist', TEXT)],
+            weights={'tags': 3, 'title': 2, 'artist': 1},
+            name='song_text',
+        )
+
+    async def search(self, theme: str, limit: int) -> List[dict]:
+        """Best local matches for ``theme`` scoring at least ``min_score``."""
+        if not theme or not self._mongo_available():
+            return []
+        self.counters['searches'] += 1
+        projection = {'_id': 0, 'score': {'$meta': 'textScore'}, **{field: 1 for field in SONG_FIELDS}}
+        try:
+            cursor = self.collection.find({'$text': {'$search': theme}}, projection)
+            cursor = cursor.sort([('score', {'$meta': 'textScore'})]).limit(limit)
+            docs = await self._mongo_op(cursor.to_list(length=limit))
+        except Exception as e:
+            self._mongo_failed(e)
+            return []
+        songs = [{field: doc[field] for field in SONG_FIELDS} for doc in docs if doc['score'] >= self.min_score]
+        self.counters['matches'] += len(songs)
+        return songs
+
+    async def harvest(self, songs: Iterable[dict], theme: Optional[str] = None):
+        """Upsert songs from an upstream result, merging in newly derived tags."""
+        operations = [self._upsert(song, derive_tags(song, theme)) for song in songs]
+        if not operations or not self._mongo_available():
+            return
+        try:
+            await self._mongo_op(self.collection.bulk_write(operations, ordered=False))
+        except Exception as e:
+            self._mongo_failed(e)
+            return
+        self.counters['harvested'] += len(operations)
+
+    async def import_songs(self, songs: Iterable[dict], batch_size: int = 1000) -> int:
+        """Bulk upsert songs, keeping any tags they already carry."""
+        imported = 0
+        batch = []
+        for song in songs:
+            batch.append(self._upsert(song, song.get('tags') or derive_tags(song)))
+            if len(batch) >= batch_size:
+                imported += await self._write(batch)
+                batch = []
+        if batch:
+            imported += await self._write(batch)
+        return imported
+
+    async def export_songs(self) -> AsyncIterator[dict]:
+        async for doc in self.collection.find({}, {'_id': 0, 'tags': 1, **{field: 1 for field in SONG_FIELDS}}):
+            yield doc
+
+    def stats(self) -> dict:
+        return dict(self.counters)
+
+    @staticmethod
+    def _upsert(song: dict, tags: List[str]) -> UpdateOne:
+        return UpdateOne(
+            {'videoId': song['videoId']},
+            {'$set': {field: song[field] for field in SONG_FIELDS},
+             '$addToSet': {'tags': {'$each': tags}}},
+            upsert=True,
+        )
+
+    async def _write(self, operations: List[UpdateOne]) -> int:
+        await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+
+def _open_catalog() -> SongCatalog:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return SongCatalog(client[os.environ['DB_NAME']]['song_catalog'])
+
+
+async def _import(path: str) -> int:
+    catalog = _open_catalog()
+    await catalog.ensure_indexes()
+    with open(path, encoding='utf-8') as f:
+        return await catalog.import_songs(json.loads(line) for line in f if line.strip())
+
+
+async def _export(path: str) -> int:
+    catalog = _open_catalog()
+    exported = 0
+    # Only close what was opened here; '-' writes to stdout, which stays open
+    with (nullcontext(sys.stdout) if path == '-' else open(path, 'w', encoding='utf-8')) as f:
+        async for doc in catalog.export_songs():
+            f.write(json.dumps(doc, ensure_ascii=False) + '\n')
+            exported += 1
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export the local song catalog as JSON lines")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="JSON lines file, one song per line ('-' exports to stdout)")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = asyncio.run(_import(args.path))
+        print(f"Imported {count} songs", file=sys.stderr)
+    else:
+        count = asyncio.run(_export(args.path))
+        print(f"Exported {count} songs", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
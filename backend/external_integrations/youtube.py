@@ -0,0 +1,189 @@
+import asyncio
+import time
+from typing import List, Optional
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from . import fastjson
+from .metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY, span
+from .quota import NORMAL, QuotaExhausted, QuotaScheduler
+from .resilience import CircuitBreaker, DeadlineExceeded, hedged, time_left, within_deadline
+
+YOUTUBE_API_URL = 'https://www.googleapis.com/youtube/v3/search'
+
+# Partial response: only the fields parse_songs reads, plus the paging cursor
+SEARCH_FIELDS = 'nextPageToken,items(id/videoId,snippet(title,channelTitle,thumbnails/medium/url))'
+MAX_RESULTS_PER_PAGE = 50
+
+
+def is_transient(e: BaseException) -> bool:
+    """Errors worth retrying: network failures and timeouts, 429 and 5xx responses."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+class YouTubeClient:
+    """
+    Async client for the YouTube Data API search endpoint.
+
+    A single instance is shared by the whole process so that every search reuses
+    the same keep-alive connection pool. Each call is bounded by connect and read
+    deadlines, and a semaphore caps how many searches are in flight upstream.
+    When a quota scheduler is attached every search is charged against it first.
+
+    Optionally, transient failures are retried ``retries`` times with jittered
+    backoff, and an attempt with no answer after ``hedge_delay`` seconds is raced
+    against ``hedges`` duplicates. Every attempt spends quota. A circuit breaker
+    makes searches fail fast while the API keeps failing. All of this stays
+    within the deadline of the request being served (see :mod:`.resilience`).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = YOUTUBE_API_URL,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        max_concurrency: int = 10,
+        quota: Optional[QuotaScheduler] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retries: int = 0,
+        hedge_delay: Optional[float] = None,
+        hedges: int = 1,
+    ):
+        self.api_key = api_key
+        self.api_url = api_url
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.quota = quota
+        self.breaker = breaker
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.hedges = hedges
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so the pool binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits)
+        return self._client
+
+    async def search(self, query: str, max_results: int = 50, priority: str = NORMAL,
+                     page_token: Optional[str] = None, fields: Optional[str] = SEARCH_FIELDS) -> dict:
+        params = {
+            'part': 'snippet',
+            'q': query,
+            'type': 'video',
+            'videoEmbeddable': 'true',
+            'maxResults': max_results,
+            'key': self.api_key
+        }
+        if fields:
+            params['fields'] = fields
+        if page_token:
+            params['pageToken'] = page_token
+        remaining = time_left()
+        if remaining is not None and remaining <= 0:
+            # The caller ran out of budget before any request; that says nothing about the API's health
+            raise DeadlineExceeded("Request deadline exceeded")
+        if self.breaker is None:
+            return await within_deadline(self._search_with_retries(params, priority))
+        probe = self.breaker.before_call()  # raises CircuitOpen while the API keeps failing
+        try:
+            data = await within_deadline(self._search_with_retries(params, priority))
+        except QuotaExhausted:
+            # Never reached the API: hand a half-open probe slot back for the next call
+            self.breaker.release(probe)
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release(probe)
+            raise
+        self.breaker.record_success()
+        return data
+
+    async def _search_with_retries(self, params: dict, priority: str) -> dict:
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.retries + 1),
+            wait=wait_random_exponential(multiplier=0.1, max=1.0),
+            retry=retry_if_exception(is_transient),
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                return await hedged(lambda: self._get(params, priority), self.hedge_delay, self.hedges)
+
+    async def _get(self, params: dict, priority: str) -> dict:
+        if self.quota is not None:
+            self.quota.acquire(priority)  # raises QuotaExhausted before any quota is spent upstream
+        started = time.perf_counter()
+        try:
+            with span('upstream'):
+                async with self._semaphore:
+                    response = await self.client.get(self.api_url, params=params)
+                response.raise_for_status()
+        except Exception as e:
+            UPSTREAM_LATENCY.labels('error').observe(time.perf_counter() - started)
+            UPSTREAM_ERRORS.labels(type(e).__name__).inc()
+            raise
+        UPSTREAM_LATENCY.labels('ok').observe(time.perf_counter() - started)
+        with span('decode'):
+            return fastjson.loads(response.content)
+
+    async def search_songs(self, query: str, count: int, priority: str = NORMAL,
+                           margin: int = 5, max_pages: int = 3) -> List[dict]:
+        """
+        Up to ``count`` distinct songs for ``query``.
+
+        Each page asks for what is still missing plus a small ``margin`` for
+        duplicates and unusable items, and further pages are only fetched when
+        filtering left the playlist short.
+        """
+        songs: List[dict] = []
+        seen = set()
+        page_token = None
+        for _ in range(max_pages):
+            max_results = min(count - len(songs) + margin, MAX_RESULTS_PER_PAGE)
+            data = await self.search(query, max_results=max_results, priority=priority, page_token=page_token)
+            with span('parse'):
+                page = parse_songs(data)
+            for song in page:
+                if song['videoId'] not in seen:
+                    seen.add(song['videoId'])
+                    songs.append(song)
+            page_token = data.get('nextPageToken')
+            if len(songs) >= count or not page_token:
+                break
+        return songs[:count]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def parse_songs(data: dict) -> List[dict]:
+    """Convert a search response into the song dicts returned by the API, skipping incomplete items."""
+    songs = []
+    for item in data.get('items', []):
+        try:
+            songs.append({
+                "title": item['snippet']['title'],
+                "artist": item['snippet']['channelTitle'],
+                "videoId": item['id']['videoId'],
+                "thumbnail": item['snippet']['thumbnails']['medium']['url']
+            })
+        except (KeyError, TypeError):
+            continue
+    return songs
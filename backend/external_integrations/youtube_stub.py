@@ -0,0 +1,168 @@
+"""
+Local stand-in for the YouTube Data API search endpoint.
+
+Serves deterministic search results with configurable latency and error rate so
+the backend can be exercised offline. Run it standalone with
+
+    python -m backend.external_integrations.youtube_stub --port 8010 --latency 0.2
+
+and point the backend at it with YOUTUBE_API_URL=http://127.0.0.1:8010/youtube/v3/search.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import random
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+
+SEARCH_PATH = '/youtube/v3/search'
+
+
+def _video_id(query: str, index: int) -> str:
+    return hashlib.sha1(f"{query}:{index}".encode()).hexdigest()[:11]
+
+
+def make_search_item(query: str, index: int) -> dict:
+    video_id = _video_id(query, index)
+    thumbnails = {
+        size: {"url": f"https://i.ytimg.com/vi/{video_id}/{name}.jpg", "width": width, "height": height}
+        for size, name, width, height in (
+            ("default", "default", 120, 90),
+            ("medium", "mqdefault", 320, 180),
+            ("high", "hqdefault", 480, 360),
+        )
+    }
+    return {
+        "kind": "youtube#searchResult",
+        "etag": hashlib.md5(video_id.encode()).hexdigest(),
+        "id": {"kind": "youtube#video", "videoId": video_id},
+        "snippet": {
+            "publishedAt": "1996-01-01T00:00:00Z",
+            "channelId": f"UC{video_id}",
+            "title": f"{query.title()} #{index + 1}",
+            "description": f"Official video for {query} track number {index + 1}.",
+            "thumbnails": thumbnails,
+            "channelTitle": f"Artist {index % 7}",
+            "liveBroadcastContent": "none",
+            "publishTime": "1996-01-01T00:00:00Z"
+        }
+    }
+
+
+def parse_fields(spec: str) -> dict:
+    """Parse a partial-response ``fields`` expression into a nested selection tree."""
+    pos = 0
+
+    def parse_selection(tree: dict):
+        nonlocal pos
+        while pos < len(spec):
+            node = tree
+            while True:
+                end = pos
+                while end < len(spec) and spec[end] not in ',/()':
+                    end += 1
+                name = spec[pos:end].strip()
+                pos = end
+                if pos < len(spec) and spec[pos] == '/':
+                    node = node.setdefault(name, {})
+                    pos += 1
+                    continue
+                break
+            if pos < len(spec) and spec[pos] == '(':
+                pos += 1
+                parse_selection(node.setdefault(name, {}))
+                pos += 1  # closing parenthesis
+            else:
+                node[name] = None
+            if pos < len(spec) and spec[pos] == ',':
+                pos += 1
+            elif pos < len(spec) and spec[pos] == ')':
+                return
+
+    tree: dict = {}
+    parse_selection(tree)
+    return tree
+
+
+def project(value, tree: Optional[dict]):
+    """Keep only the parts of ``value`` selected by a tree from :func:`parse_fields`."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def create_stub_app(latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.latency = latency
+    app.state.error_rate = error_rate
+    rng = random.Random(seed)
+
+    @app.get(SEARCH_PATH)
+    async def search(q: str = '', maxResults: int = Query(5, ge=0, le=50), pageToken: str = '', fields: str = ''):
+        app.state.calls += 1
+        if app.state.latency:
+            await asyncio.sleep(app.state.latency)
+        if app.state.error_rate and rng.random() < app.state.error_rate:
+            raise HTTPException(status_code=503, detail="stub upstream error")
+        offset = int(pageToken[4:]) if pageToken.startswith('page') else 0
+        data = {
+            "kind": "youtube#searchListResponse",
+            "etag": hashlib.md5(f"{q}:{offset}".encode()).hexdigest(),
+            "nextPageToken": f"page{offset + maxResults}",
+            "regionCode": "US",
+            "pageInfo": {"totalResults": 1000000, "resultsPerPage": maxResults},
+            "items": [make_search_item(q, i) for i in range(offset, offset + maxResults)]
+        }
+        return project(data, parse_fields(fields)) if fields else data
+
+    return app
+
+
+@contextlib.asynccontextmanager
+async def serve(app, host: str = '127.0.0.1', port: int = 0):
+    """Serve an ASGI app on localhost for the duration of the block and yield its base URL."""
+    config = uvicorn.Config(app, host=host, port=port, log_level='warning', lifespan='off')
+    server = uvicorn.Server(config)
+    server.install_signal_handlers = lambda: None
+    task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if task.done():
+                task.result()
+            await asyncio.sleep(0.01)
+        bound_port = server.servers[0].sockets[0].getsockname()[1]
+        yield f"http://{host}:{bound_port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+@contextlib.asynccontextmanager
+async def running_stub(latency: float = 0.0, error_rate: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+    """Serve a stub app on localhost for the duration of the block and yield it with its search URL."""
+    app = create_stub_app(latency=latency, error_rate=error_rate, seed=0)
+    async with serve(app, host, port) as base_url:
+        yield app, f"{base_url}{SEARCH_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local YouTube search API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    uvicorn.run(create_stub_app(args.latency, args.error_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Production entry point for the backend, one worker process per core by default:
+
+    python -m backend.serve --workers 4
+
+Each worker imports ``backend.server`` on its own and runs the app lifespan, so
+every worker opens its own MongoDB and YouTube pools and warms its own caches;
+nothing is created before the workers start. ``WEB_CONCURRENCY``, ``HOST`` and
+``PORT`` set the defaults. Settings come from the environment, with
+``backend/.env`` (or ``--env-file``) loaded here first so every worker sees
+them when it imports the app. Point ``PROMETHEUS_MULTIPROC_DIR`` at a writable
+directory to have ``/metrics`` sum counters and histograms across workers.
+
+This module deliberately does not import the app, so the supervising process
+stays small and workers never inherit its state.
+"""
+import argparse
+import os
+from pathlib import Path
+
+import uvicorn
+
+ENV_FILE = Path(__file__).parent / '.env'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Mixtape Generator API")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="Seconds to drain requests on shutdown")
+    parser.add_argument("--env-file", default=str(ENV_FILE) if ENV_FILE.exists() else None,
+                        help="Environment file loaded before the workers start (default backend/.env if present)")
+    args = parser.parse_args()
+
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        # Samples left by a previous run would be added to this one
+        Path(multiproc_dir).mkdir(parents=True, exist_ok=True)
+        for stale in Path(multiproc_dir).glob('*.db'):
+            stale.unlink()
+
+    uvicorn.run(
+        'backend.server:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        env_file=args.env_file,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,90 @@
-from fastapi import FastAPI, HTTPException, Body, Query
-from dotenv import load_dotenv
+from fastapi import APIRouter, FastAPI, HTTPException, Body, Query, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import uvicorn
+import asyncio
+import contextlib
 import os
+import random
+import zlib
 import logging
 from pathlib import Path
-import requests
-from typing import List, Optional
-from pydantic import BaseModel
-import random
+from typing import AsyncIterator, List, Optional
+from pydantic import BaseModel, Field
+
+from .external_integrations import fastjson
+from .external_integrations.fallback_catalog import FallbackCatalog
+from .external_integrations.http_cache import cacheable_response
+from .external_integrations.metrics import (
+    PLAYLIST_FALLBACKS, PLAYLIST_RESULTS, MetricsMiddleware, monitor_event_loop_lag, register_stats, render_latest, span,
+)
+from .external_integrations.mongo_backoff import MongoHealth
+from .external_integrations.playlist_cache import FRESH, STALE, PlaylistCache, normalize_theme
+from .external_integrations.prewarm import ALREADY_WARM, FAILED, WARMED, Prewarmer, ThemeStats
+from .external_integrations.quota import LOW, NORMAL, SEARCH_COST, QuotaExhausted, QuotaScheduler
+from .external_integrations.resilience import (
+    OPEN, CircuitBreaker, CircuitOpen, DeadlineExceeded, deadline, within_deadline,
+)
+from .external_integrations.shared_state import SharedState
+from .external_integrations.singleflight import SingleFlight
+from .external_integrations.song_catalog import SongCatalog
+from .external_integrations.youtube import YOUTUBE_API_URL as DEFAULT_YOUTUBE_API_URL, YouTubeClient
 
 # /backend 
 ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Settings are read from the environment at import; backend.serve loads ROOT_DIR/.env before workers import this
+# module (with plain uvicorn pass --env-file backend/.env)
 
-app = FastAPI()
+# MongoDB connection, opened by the app lifespan so every worker creates its own pool after fork.
+# Without MONGO_URL the stores run on their in-process tiers only.
+MONGO_URL = os.environ.get('MONGO_URL', '')
+DB_NAME = os.environ.get('DB_NAME', '')
+MONGO_CLIENT_OPTIONS = {
+    'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '2000')),
+    'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', '50')),
+    'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+}
+client: Optional[AsyncIOMotorClient] = None
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+# One health state for every MongoDB-backed store: the first error or timeout moves all of them to their
+# in-process fallbacks for MONGO_RETRY_AFTER seconds. Reads and writes on the request path give up after
+# MONGO_OP_TIMEOUT_MS, long before server selection would.
+mongo_availability = MongoHealth(
+    retry_after=float(os.environ.get('MONGO_RETRY_AFTER', '30')),
+    op_timeout=int(os.environ.get('MONGO_OP_TIMEOUT_MS', '300')) / 1000,
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Optional Redis tier shared by all workers for playlist entries and quota spend, also opened by the lifespan
+REDIS_URL = os.environ.get('REDIS_URL', '')
+REDIS_PREFIX = os.environ.get('REDIS_PREFIX', 'mixtape')
+QUOTA_SYNC_INTERVAL = float(os.environ.get('QUOTA_SYNC_INTERVAL', '5'))
+shared_state: Optional[SharedState] = None
+
+# Seconds /readyz waits for a MongoDB ping
+READINESS_TIMEOUT = float(os.environ.get('READINESS_TIMEOUT', '1'))
+
+class TimedJSONResponse(ORJSONResponse if fastjson.HAS_ORJSON else JSONResponse):
+    # Serialization is the last phase of a playlist request worth timing
+    def render(self, content) -> bytes:
+        with span('serialize'):
+            return super().render(content)
+
+router = APIRouter()
+
 logger = logging.getLogger(__name__)
 
 # Models
 class PlaylistRequest(BaseModel):
     theme: str
-    count: Optional[int] = 10
+    count: Optional[int] = Field(10, ge=1)  # null asks for the default
+
+    def playlist_count(self) -> int:
+        return min(self.count or 10, 15)  # Limit to 15 songs
+
+class BatchPlaylistRequest(BaseModel):
+    requests: List[PlaylistRequest]
 
 class Song(BaseModel):
     title: str
@@ -50,84 +94,498 @@ class Song(BaseModel):
 
 # YouTube API Constants
 YOUTUBE_API_KEY = os.environ.get('YOUTUBE_API_KEY', '')
-YOUTUBE_API_URL = 'https://www.googleapis.com/youtube/v3/search'
+YOUTUBE_API_URL = os.environ.get('YOUTUBE_API_URL', DEFAULT_YOUTUBE_API_URL)
+
+# Daily quota ledger and per-second rate limit for YouTube searches
+YOUTUBE_QUOTA_OPTIONS = {
+    'daily_budget': int(os.environ.get('YOUTUBE_DAILY_QUOTA', '10000')),
+    'rate': float(os.environ.get('YOUTUBE_QUOTA_RATE', '5')),
+    'reserve': float(os.environ.get('YOUTUBE_QUOTA_RESERVE', '0.1')),
+}
+youtube_quota = QuotaScheduler(**YOUTUBE_QUOTA_OPTIONS)
+
+# Fail fast to the fallback playlists while YouTube keeps failing, probing again after the recovery time
+YOUTUBE_BREAKER_OPTIONS = {
+    'failure_threshold': int(os.environ.get('YOUTUBE_BREAKER_THRESHOLD', '5')),
+    'recovery_time': float(os.environ.get('YOUTUBE_BREAKER_RECOVERY', '30')),
+}
+youtube_breaker = CircuitBreaker(**YOUTUBE_BREAKER_OPTIONS)
+
+# Shared upstream client: one keep-alive pool, bounded deadlines and concurrency,
+# retries for transient errors and a hedged second attempt for slow calls (YOUTUBE_HEDGE_DELAY=0 disables it)
+YOUTUBE_CLIENT_OPTIONS = {
+    'connect_timeout': float(os.environ.get('YOUTUBE_CONNECT_TIMEOUT', '3')),
+    'read_timeout': float(os.environ.get('YOUTUBE_READ_TIMEOUT', '5')),
+    'max_connections': int(os.environ.get('YOUTUBE_MAX_CONNECTIONS', '20')),
+    'max_concurrency': int(os.environ.get('YOUTUBE_MAX_CONCURRENCY', '10')),
+    'retries': int(os.environ.get('YOUTUBE_RETRIES', '1')),
+    'hedge_delay': float(os.environ.get('YOUTUBE_HEDGE_DELAY', '1.0')) or None,
+}
+youtube_client = YouTubeClient(
+    YOUTUBE_API_KEY, api_url=YOUTUBE_API_URL, quota=youtube_quota, breaker=youtube_breaker, **YOUTUBE_CLIENT_OPTIONS,
+)
 
-@app.get("/")
+# Cache-Control max-age in seconds for GET /api/playlist responses, and for sample fallbacks
+PLAYLIST_MAX_AGE = int(os.environ.get('PLAYLIST_MAX_AGE', '300'))
+FALLBACK_MAX_AGE = int(os.environ.get('PLAYLIST_FALLBACK_MAX_AGE', '30'))
+
+# Upper bound in seconds on the upstream work done for one request, retries and hedges included
+PLAYLIST_DEADLINE = float(os.environ.get('PLAYLIST_DEADLINE', '4'))
+
+# Playlist cache: in-process LRU in front of a MongoDB TTL collection
+playlist_cache = PlaylistCache(
+    max_entries=int(os.environ.get('PLAYLIST_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('PLAYLIST_CACHE_TTL', '3600')),
+    stale_ttl=float(os.environ.get('PLAYLIST_CACHE_STALE_TTL', '86400')),
+    mongo_health=mongo_availability,
+)
+
+# Local song catalog harvested from past YouTube results
+song_catalog = SongCatalog(
+    min_score=float(os.environ.get('CATALOG_MIN_SCORE', '1.0')),
+    mongo_health=mongo_availability,
+)
+
+# Concurrent identical playlist builds share one catalog query and upstream call
+playlist_flights = SingleFlight()
+
+# Batch endpoint limits: requests per batch and playlists resolved at once
+BATCH_MAX_SIZE = int(os.environ.get('PLAYLIST_BATCH_MAX_SIZE', '50'))
+BATCH_CONCURRENCY = int(os.environ.get('PLAYLIST_BATCH_CONCURRENCY', '8'))
+
+# Theme request counts, flushed to MongoDB in batches, drive the pre-warming of popular themes
+theme_stats = ThemeStats(
+    window=float(os.environ.get('THEME_STATS_WINDOW', str(7 * 86400))),
+    mongo_health=mongo_availability,
+)
+THEME_STATS_FLUSH_INTERVAL = float(os.environ.get('THEME_STATS_FLUSH_INTERVAL', '10'))
+
+# Every PREWARM_INTERVAL seconds build up to PREWARM_BUDGET of the PREWARM_TOP_N most requested themes
+# that are not fresh in the cache (PREWARM_TOP_N=0 disables pre-warming); playlists are warmed at full size
+PREWARM_COUNT = 15
+prewarmer = Prewarmer(
+    theme_stats,
+    lambda theme: warm_theme(theme),
+    top_n=int(os.environ.get('PREWARM_TOP_N', '20')),
+    budget=int(os.environ.get('PREWARM_BUDGET', '10')),
+    interval=float(os.environ.get('PREWARM_INTERVAL', '900')),
+    ttl=playlist_cache.ttl,
+)
+
+# Store counters are read at scrape time; the lambdas follow the globals if they are replaced
+register_stats('playlist_cache', lambda: playlist_cache.stats())
+register_stats('song_catalog', lambda: song_catalog.stats())
+register_stats('youtube_quota', lambda: youtube_quota.stats())
+register_stats('youtube_circuit', lambda: youtube_breaker.stats())
+register_stats('redis', lambda: shared_state.stats() if shared_state is not None else {})
+register_stats('theme_stats', lambda: theme_stats.stats())
+register_stats('prewarm', lambda: prewarmer.stats())
+
+# How often the event loop lag probe wakes up, in seconds
+EVENT_LOOP_LAG_INTERVAL = float(os.environ.get('EVENT_LOOP_LAG_INTERVAL', '0.5'))
+
+@router.get("/")
 async def root():
     return {"message": "Mixtape Generator API"}
 
 # Sample 90s songs to use when no API key is provided - updated with verified embeddable videos
-SAMPLE_90S_SONGS = [
-    {"title": "Smells Like Teen Spirit", "artist": "Nirvana", "videoId": "hTWKbfoikeg", "thumbnail": "https://i.ytimg.com/vi/hTWKbfoikeg/hqdefault.jpg"},
-    {"title": "Waterfalls", "artist": "TLC", "videoId": "8WEtxJ4-sh4", "thumbnail": "https://i.ytimg.com/vi/8WEtxJ4-sh4/hqdefault.jpg"},
-    {"title": "Vogue", "artist": "Madonna", "videoId": "GuJQSAiODqI", "thumbnail": "https://i.ytimg.com/vi/GuJQSAiODqI/hqdefault.jpg"},
-    {"title": "...Baby One More Time", "artist": "Britney Spears", "videoId": "C-u5WLJ9Yk4", "thumbnail": "https://i.ytimg.com/vi/C-u5WLJ9Yk4/hqdefault.jpg"},
-    {"title": "No Scrubs", "artist": "TLC", "videoId": "FrLequ6dUdM", "thumbnail": "https://i.ytimg.com/vi/FrLequ6dUdM/hqdefault.jpg"},
-    {"title": "Wannabe", "artist": "Spice Girls", "videoId": "gJLIiF15wjQ", "thumbnail": "https://i.ytimg.com/vi/gJLIiF15wjQ/hqdefault.jpg"},
-    {"title": "I Want It That Way", "artist": "Backstreet Boys", "videoId": "4fndeDfaWCg", "thumbnail": "https://i.ytimg.com/vi/4fndeDfaWCg/hqdefault.jpg"},
-    {"title": "Gangsta's Paradise", "artist": "Coolio", "videoId": "fPO76Jlnz6c", "thumbnail": "https://i.ytimg.com/vi/fPO76Jlnz6c/hqdefault.jpg"},
-    {"title": "Wonderwall", "artist": "Oasis", "videoId": "bx1Bh8ZvH84", "thumbnail": "https://i.ytimg.com/vi/bx1Bh8ZvH84/hqdefault.jpg"},
-    {"title": "Ms. Jackson", "artist": "OutKast", "videoId": "MYxAiK6VnXw", "thumbnail": "https://i.ytimg.com/vi/MYxAiK6VnXw/hqdefault.jpg"},
-    {"title": "U Can't Touch This", "artist": "MC Hammer", "videoId": "otCpCn0l4Wo", "thumbnail": "https://i.ytimg.com/vi/otCpCn0l4Wo/hqdefault.jpg"},
-    {"title": "Don't Speak", "artist": "No Doubt", "videoId": "TR3Vdo5etCQ", "thumbnail": "https://i.ytimg.com/vi/TR3Vdo5etCQ/hqdefault.jpg"},
-    {"title": "Black Hole Sun", "artist": "Soundgarden", "videoId": "3mbBbFH9fAg", "thumbnail": "https://i.ytimg.com/vi/3mbBbFH9fAg/hqdefault.jpg"},
-    {"title": "Barbie Girl", "artist": "Aqua", "videoId": "ZyhrYis509A", "thumbnail": "https://i.ytimg.com/vi/ZyhrYis509A/hqdefault.jpg"},
-    {"title": "All Star", "artist": "Smash Mouth", "videoId": "L_jWHffIx5E", "thumbnail": "https://i.ytimg.com/vi/L_jWHffIx5E/hqdefault.jpg"},
-    {"title": "Zombie", "artist": "The Cranberries", "videoId": "6Ejga4kJUts", "thumbnail": "https://i.ytimg.com/vi/6Ejga4kJUts/hqdefault.jpg"},
-    {"title": "Bitter Sweet Symphony", "artist": "The Verve", "videoId": "1lyu1KKwC74", "thumbnail": "https://i.ytimg.com/vi/1lyu1KKwC74/hqdefault.jpg"},
-    {"title": "Virtual Insanity", "artist": "Jamiroquai", "videoId": "4JkIs37a2JE", "thumbnail": "https://i.ytimg.com/vi/4JkIs37a2JE/hqdefault.jpg"},
-    {"title": "Sabotage", "artist": "Beastie Boys", "videoId": "z5rRZdiu1UE", "thumbnail": "https://i.ytimg.com/vi/z5rRZdiu1UE/hqdefault.jpg"},
-    {"title": "Californication", "artist": "Red Hot Chili Peppers", "videoId": "YlUKcNNmywk", "thumbnail": "https://i.ytimg.com/vi/YlUKcNNmywk/hqdefault.jpg"}
-]
-
-@app.post("/api/generate-playlist")
+SAMPLE_90S_SONGS = (
+    {"title": "Smells Like Teen Spirit", "artist": "Nirvana", "videoId": "hTWKbfoikeg", "thumbnail": "https://i.ytimg.com/vi/hTWKbfoikeg/hqdefault.jpg", "tags": ["grunge", "rock", "alternative"]},
+    {"title": "Waterfalls", "artist": "TLC", "videoId": "8WEtxJ4-sh4", "thumbnail": "https://i.ytimg.com/vi/8WEtxJ4-sh4/hqdefault.jpg", "tags": ["rnb", "soul", "pop"]},
+    {"title": "Vogue", "artist": "Madonna", "videoId": "GuJQSAiODqI", "thumbnail": "https://i.ytimg.com/vi/GuJQSAiODqI/hqdefault.jpg", "tags": ["pop", "dance", "house"]},
+    {"title": "...Baby One More Time", "artist": "Britney Spears", "videoId": "C-u5WLJ9Yk4", "thumbnail": "https://i.ytimg.com/vi/C-u5WLJ9Yk4/hqdefault.jpg", "tags": ["pop", "teen"]},
+    {"title": "No Scrubs", "artist": "TLC", "videoId": "FrLequ6dUdM", "thumbnail": "https://i.ytimg.com/vi/FrLequ6dUdM/hqdefault.jpg", "tags": ["rnb", "hip", "hop"]},
+    {"title": "Wannabe", "artist": "Spice Girls", "videoId": "gJLIiF15wjQ", "thumbnail": "https://i.ytimg.com/vi/gJLIiF15wjQ/hqdefault.jpg", "tags": ["pop", "girl", "group", "dance"]},
+    {"title": "I Want It That Way", "artist": "Backstreet Boys", "videoId": "4fndeDfaWCg", "thumbnail": "https://i.ytimg.com/vi/4fndeDfaWCg/hqdefault.jpg", "tags": ["pop", "boy", "band", "ballad"]},
+    {"title": "Gangsta's Paradise", "artist": "Coolio", "videoId": "fPO76Jlnz6c", "thumbnail": "https://i.ytimg.com/vi/fPO76Jlnz6c/hqdefault.jpg", "tags": ["hip", "hop", "rap"]},
+    {"title": "Wonderwall", "artist": "Oasis", "videoId": "bx1Bh8ZvH84", "thumbnail": "https://i.ytimg.com/vi/bx1Bh8ZvH84/hqdefault.jpg", "tags": ["britpop", "rock", "alternative"]},
+    {"title": "Ms. Jackson", "artist": "OutKast", "videoId": "MYxAiK6VnXw", "thumbnail": "https://i.ytimg.com/vi/MYxAiK6VnXw/hqdefault.jpg", "tags": ["hip", "hop", "rap"]},
+    {"title": "U Can't Touch This", "artist": "MC Hammer", "videoId": "otCpCn0l4Wo", "thumbnail": "https://i.ytimg.com/vi/otCpCn0l4Wo/hqdefault.jpg", "tags": ["hip", "hop", "rap", "dance", "party"]},
+    {"title": "Don't Speak", "artist": "No Doubt", "videoId": "TR3Vdo5etCQ", "thumbnail": "https://i.ytimg.com/vi/TR3Vdo5etCQ/hqdefault.jpg", "tags": ["rock", "alternative", "ballad", "ska"]},
+    {"title": "Black Hole Sun", "artist": "Soundgarden", "videoId": "3mbBbFH9fAg", "thumbnail": "https://i.ytimg.com/vi/3mbBbFH9fAg/hqdefault.jpg", "tags": ["grunge", "rock", "alternative"]},
+    {"title": "Barbie Girl", "artist": "Aqua", "videoId": "ZyhrYis509A", "thumbnail": "https://i.ytimg.com/vi/ZyhrYis509A/hqdefault.jpg", "tags": ["eurodance", "dance", "pop", "party"]},
+    {"title": "All Star", "artist": "Smash Mouth", "videoId": "L_jWHffIx5E", "thumbnail": "https://i.ytimg.com/vi/L_jWHffIx5E/hqdefault.jpg", "tags": ["rock", "alternative", "pop"]},
+    {"title": "Zombie", "artist": "The Cranberries", "videoId": "6Ejga4kJUts", "thumbnail": "https://i.ytimg.com/vi/6Ejga4kJUts/hqdefault.jpg", "tags": ["rock", "alternative"]},
+    {"title": "Bitter Sweet Symphony", "artist": "The Verve", "videoId": "1lyu1KKwC74", "thumbnail": "https://i.ytimg.com/vi/1lyu1KKwC74/hqdefault.jpg", "tags": ["britpop", "rock", "alternative"]},
+    {"title": "Virtual Insanity", "artist": "Jamiroquai", "videoId": "4JkIs37a2JE", "thumbnail": "https://i.ytimg.com/vi/4JkIs37a2JE/hqdefault.jpg", "tags": ["funk", "acid", "jazz"]},
+    {"title": "Sabotage", "artist": "Beastie Boys", "videoId": "z5rRZdiu1UE", "thumbnail": "https://i.ytimg.com/vi/z5rRZdiu1UE/hqdefault.jpg", "tags": ["rock", "hip", "hop", "punk"]},
+    {"title": "Californication", "artist": "Red Hot Chili Peppers", "videoId": "YlUKcNNmywk", "thumbnail": "https://i.ytimg.com/vi/YlUKcNNmywk/hqdefault.jpg", "tags": ["rock", "alternative", "funk"]}
+)
+
+# Fallback songs are indexed once; FALLBACK_CATALOG_PATH swaps in a larger JSON lines catalog
+FALLBACK_CATALOG = (
+    FallbackCatalog.from_jsonl(os.environ['FALLBACK_CATALOG_PATH']) if os.environ.get('FALLBACK_CATALOG_PATH')
+    else FallbackCatalog(SAMPLE_90S_SONGS)
+)
+
+async def fetch_youtube_playlist(theme: str, count: int, priority: str = NORMAL) -> List[dict]:
+    # Use YouTube API to search for videos
+    return await youtube_client.search_songs(f'90s music {theme}', count, priority=priority)
+
+def sample_playlist(theme: str, count: int, local: List[dict] = (), seed: Optional[int] = None) -> List[dict]:
+    # Local matches first, topped up with sample songs ranked by relevance to the theme
+    samples = FALLBACK_CATALOG.select(theme, count, seed=seed, exclude=[song["videoId"] for song in local])
+    return merge_songs(local, samples, count)
+
+def merge_songs(first: List[dict], second: List[dict], count: int) -> List[dict]:
+    playlist = list(first[:count])
+    seen = {song["videoId"] for song in playlist}
+    for song in second:
+        if len(playlist) >= count:
+            break
+        if song["videoId"] not in seen:
+            seen.add(song["videoId"])
+            playlist.append(song)
+    return playlist
+
+class UpstreamUnavailable(Exception):
+    # Raised by a shared build that could not top the catalog matches up from YouTube (cause None: no API key),
+    # so that every caller waiting on it answers with sample songs picked by its own seed
+    def __init__(self, cause: Optional[Exception], local: List[dict]):
+        super().__init__(str(cause) if cause is not None else "YouTube API key not configured")
+        self.cause = cause
+        self.local = local
+
+async def build_playlist(theme: str, count: int, priority: str = NORMAL, local: Optional[List[dict]] = None) -> dict:
+    # Answer from the local catalog (unless the caller already searched it) and only go to YouTube to top it up
+    if local is None:
+        local = await song_catalog.search(theme, count)
+    if len(local) < count:
+        if not YOUTUBE_API_KEY:
+            # No API key, use sample data
+            raise UpstreamUnavailable(None, local)
+        try:
+            upstream = await fetch_youtube_playlist(theme, count, priority)
+        except Exception as e:
+            logger.error(f"Error in YouTube API: {str(e)}")
+            # Fallback to sample data
+            raise UpstreamUnavailable(e, local) from e
+        await song_catalog.harvest(upstream, theme)
+        local = merge_songs(local, upstream, count)
+        PLAYLIST_RESULTS.labels('youtube').inc()
+    else:
+        PLAYLIST_RESULTS.labels('catalog').inc()
+    await playlist_cache.set(theme, local, count)
+    return {"playlist": local, "message": "Successfully generated playlist"}
+
+def fallback_playlist(theme: str, count: int, e: Exception, local: List[dict] = (), seed: Optional[int] = None) -> dict:
+    PLAYLIST_FALLBACKS.labels(fallback_reason(e)).inc()
+    PLAYLIST_RESULTS.labels('sample').inc()
+    return {"playlist": sample_playlist(theme, count, local, seed), "message": f"Using sample 90s playlist (API error: {str(e)})"}
+
+def fallback_reason(e: Exception) -> str:
+    if isinstance(e, QuotaExhausted):
+        return 'quota'
+    if isinstance(e, CircuitOpen):
+        return 'circuit_open'
+    if isinstance(e, DeadlineExceeded):
+        return 'deadline'
+    return 'api_error'
+
+async def load_playlist(theme: str, count: int, priority: str = NORMAL, seed: Optional[int] = None,
+                        local: Optional[List[dict]] = None) -> dict:
+    # The shared build runs on a budget of its own, not the deadline of whichever caller started it,
+    # and every caller still waits no longer than its own deadline. The seed only picks sample songs,
+    # so callers with different seeds share one build and each applies its seed to a fallback.
+    async def build():
+        with deadline(PLAYLIST_DEADLINE, inherit=False):
+            return await build_playlist(theme, count, priority, local)
+    
+    try:
+        return await within_deadline(playlist_flights.do((theme, count), build))
+    except UpstreamUnavailable as e:
+        if e.cause is None:
+            PLAYLIST_FALLBACKS.labels('no_api_key').inc()
+            PLAYLIST_RESULTS.labels('sample').inc()
+            return {"playlist": sample_playlist(theme, count, e.local, seed), "message": "Using sample 90s playlist (YouTube API key not configured)"}
+        return fallback_playlist(theme, count, e.cause, e.local, seed)
+    except DeadlineExceeded as e:
+        logger.warning(f"Playlist for {theme!r} not ready within the request deadline")
+        return fallback_playlist(theme, count, e, seed=seed)
+
+def record_request(theme: str):
+    theme_stats.record(theme)
+    prewarmer.record_served(theme)
+
+async def warm_theme(theme: str) -> str:
+    # Background build at low quota priority, skipped while any cache tier still has it fresh
+    if await playlist_cache.peek(theme, PREWARM_COUNT) == FRESH:
+        return ALREADY_WARM
+    result = await load_playlist(theme, PREWARM_COUNT, LOW)
+    return WARMED if result["message"] == "Successfully generated playlist" else FAILED
+
+async def cached_playlist(theme: str, count: int) -> Optional[List[dict]]:
+    # First step of every playlist request: count it and answer from any cache tier,
+    # refreshing a stale entry in the background
+    record_request(theme)
+    cached, state = await playlist_cache.get(theme, count)
+    if cached is None:
+        return None
+    if state == STALE:
+        playlist_cache.refresh(theme, lambda: load_playlist(theme, count, LOW))
+    PLAYLIST_RESULTS.labels('cache').inc()
+    return cached[:count]
+
+async def resolve_playlist(theme: str, count: int, seed: Optional[int] = None) -> dict:
+    cached = await cached_playlist(theme, count)
+    if cached is not None:
+        return {"playlist": cached, "message": "Successfully generated playlist"}
+    
+    return await load_playlist(theme, count, seed=seed)
+
+@router.post("/api/generate-playlist")
 async def generate_playlist(request: PlaylistRequest):
-    theme = request.theme.lower()
-    count = min(request.count, 15)  # Limit to 15 songs
+    theme = normalize_theme(request.theme)
+    count = request.playlist_count()
     
-    if not YOUTUBE_API_KEY:
-        # No API key, use sample data
-        random.shuffle(SAMPLE_90S_SONGS)
-        return {"playlist": SAMPLE_90S_SONGS[:count], "message": "Using sample 90s playlist (YouTube API key not configured)"}
+    with deadline(PLAYLIST_DEADLINE):
+        return await resolve_playlist(theme, count)
+
+def theme_seed(theme: str) -> int:
+    # Stable across processes, unlike hash()
+    return zlib.crc32(theme.encode('utf-8'))
+
+@router.get("/api/playlist")
+async def get_playlist(http_request: Request, theme: str = Query(..., min_length=1),
+                       count: int = Query(10, ge=1), seed: Optional[int] = Query(None)):
+    # Same theme, count and seed give the same bytes until the cached playlist changes,
+    # so browsers and CDNs can keep and revalidate the response
+    theme = normalize_theme(theme)
+    count = min(count, 15)  # Limit to 15 songs
     
-    try:
-        # Use YouTube API to search for videos
-        params = {
-            'part': 'snippet',
-            'q': f'90s music {theme}',
-            'type': 'video',
-            'videoEmbeddable': 'true',
-            'maxResults': 50,  # Get more results to filter
-            'key': YOUTUBE_API_KEY
-        }
-        
-        response = requests.get(YOUTUBE_API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Process the results
-        playlist = []
-        for item in data.get('items', [])[:count]:
-            video_id = item['id']['videoId']
-            title = item['snippet']['title']
-            channel = item['snippet']['channelTitle']
-            thumbnail = item['snippet']['thumbnails']['medium']['url']
-            
-            playlist.append({
-                "title": title,
-                "artist": channel,
-                "videoId": video_id,
-                "thumbnail": thumbnail
-            })
-        
-        return {"playlist": playlist, "message": "Successfully generated playlist"}
+    with deadline(PLAYLIST_DEADLINE):
+        result = await resolve_playlist(theme, count, seed=theme_seed(theme) if seed is None else seed)
+    if seed is not None:
+        playlist = list(result["playlist"])
+        random.Random(seed).shuffle(playlist)
+        result = {**result, "playlist": playlist}
     
+    with span('serialize'):
+        body = fastjson.dumps(result)
+    # Fallback playlists are replaced as soon as YouTube answers again, so the edge keeps them briefly
+    max_age = PLAYLIST_MAX_AGE if result["message"] == "Successfully generated playlist" else FALLBACK_MAX_AGE
+    cache_control = f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+    return cacheable_response(http_request.headers, body, cache_control)
+
+async def stream_playlist(theme: str, count: int) -> AsyncIterator[dict]:
+    # Cached and catalog songs go out first, the upstream top-up follows
+    cached = await cached_playlist(theme, count)
+    if cached is not None:
+        for song in cached:
+            yield {"song": song}
+        yield {"done": True, "message": "Successfully generated playlist"}
+        return
+    
+    local = await song_catalog.search(theme, count)
+    sent = set()
+    for song in local:
+        sent.add(song["videoId"])
+        yield {"song": song}
+    
+    # The build starts from the songs already sent instead of searching the catalog again
+    with deadline(PLAYLIST_DEADLINE):
+        result = await load_playlist(theme, count, local=local)
+    for song in result["playlist"]:
+        if len(sent) >= count:
+            break
+        if song["videoId"] not in sent:
+            sent.add(song["videoId"])
+            yield {"song": song}
+    yield {"done": True, "message": result["message"]}
+
+@router.post("/api/generate-playlist/stream")
+async def generate_playlist_stream(request: PlaylistRequest, http_request: Request):
+    theme = normalize_theme(request.theme)
+    count = request.playlist_count()
+    
+    # Server-Sent Events when the client asks for them, NDJSON otherwise
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        async def events():
+            async for event in stream_playlist(theme, count):
+                yield f"event: {'done' if 'done' in event else 'song'}\ndata: {fastjson.dumps(event).decode()}\n\n"
+        media_type = "text/event-stream"
+        body = events()
+    else:
+        async def lines():
+            async for event in stream_playlist(theme, count):
+                yield fastjson.dumps(event) + b"\n"
+        media_type = "application/x-ndjson"
+        body = lines()
+    
+    return StreamingResponse(body, media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.post("/api/generate-playlists")
+async def generate_playlists(batch: BatchPlaylistRequest):
+    if len(batch.requests) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BATCH_MAX_SIZE} requests)")
+    
+    # Duplicate themes inside one batch are resolved once
+    keys = [(normalize_theme(request.theme), request.playlist_count()) for request in batch.requests]
+    unique_keys = list(dict.fromkeys(keys))
+    await playlist_cache.prefetch([theme for theme, _ in unique_keys])
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def resolve(key):
+        # Each theme's budget starts once it gets a slot, not when the batch arrived
+        async with semaphore:
+            try:
+                with deadline(PLAYLIST_DEADLINE):
+                    return await resolve_playlist(*key)
+            except Exception as e:
+                logger.error(f"Error generating playlist for {key[0]!r}: {str(e)}")
+                return {"error": str(e)}
+    
+    resolved = dict(zip(unique_keys, await asyncio.gather(*(resolve(key) for key in unique_keys))))
+    return {"results": [{"theme": request.theme, **resolved[key]} for request, key in zip(batch.requests, keys)]}
+
+@router.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        **playlist_cache.stats(),
+        "catalog": song_catalog.stats(),
+        "redis": shared_state.stats() if shared_state is not None else None,
+    }
+
+@router.get("/api/quota/stats")
+async def quota_stats():
+    return {**youtube_quota.stats(), "circuit": youtube_breaker.stats()}
+
+@router.get("/metrics")
+async def metrics():
+    body, content_type = render_latest()
+    return Response(body, media_type=content_type)
+
+@router.get("/healthz")
+async def healthz():
+    # Liveness only: answering at all means the worker and its event loop are alive
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(request: Request):
+    checks = {"mongo": await mongo_health(), "redis": await redis_health(), "youtube": youtube_health()}
+    ready = request.app.state.ready and checks["mongo"] != "down"
+    return TimedJSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+async def mongo_health() -> str:
+    if client is None:
+        return "disabled"
+    try:
+        await asyncio.wait_for(client.admin.command('ping'), READINESS_TIMEOUT)
     except Exception as e:
-        logger.error(f"Error in YouTube API: {str(e)}")
-        # Fallback to sample data
-        random.shuffle(SAMPLE_90S_SONGS)
-        return {"playlist": SAMPLE_90S_SONGS[:count], "message": f"Using sample 90s playlist (API error: {str(e)})"}
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+        logger.warning(f"MongoDB readiness ping failed: {str(e)}")
+        return "down"
+    return "ok"
+
+async def redis_health() -> str:
+    # Not fatal for readiness either: every worker keeps its own cache and quota ledger meanwhile
+    if shared_state is None:
+        return "disabled"
+    return "ok" if await shared_state.ping() else "down"
+
+def youtube_health() -> str:
+    # Not fatal for readiness: playlists fall back to the catalog and sample songs
+    if not YOUTUBE_API_KEY:
+        return "no_api_key"
+    if youtube_breaker.state == OPEN:
+        return "circuit_open"
+    if youtube_quota.remaining < SEARCH_COST:
+        return "quota_exhausted"
+    return "ok"
+
+def connect_mongo():
+    global client
+    if client is None and MONGO_URL and DB_NAME:
+        client = AsyncIOMotorClient(MONGO_URL, **MONGO_CLIENT_OPTIONS)
+        db = client[DB_NAME]
+        playlist_cache.collection = db['playlist_cache']
+        song_catalog.collection = db['song_catalog']
+        theme_stats.collection = db['theme_stats']
+
+def connect_redis():
+    global shared_state
+    if shared_state is None and REDIS_URL:
+        shared_state = SharedState.from_url(REDIS_URL, prefix=REDIS_PREFIX)
+        playlist_cache.shared = shared_state
+
+async def close_redis():
+    global shared_state
+    if shared_state is not None:
+        # Hand this worker's last quota spend to the others before leaving
+        await shared_state.sync_quota(youtube_quota)
+        await shared_state.aclose()
+        shared_state = None
+        playlist_cache.shared = None
+
+def close_mongo():
+    global client
+    if client is not None:
+        client.close()
+        client = None
+        playlist_cache.collection = None
+        song_catalog.collection = None
+        theme_stats.collection = None
+
+async def ensure_indexes():
+    for store in (playlist_cache, song_catalog, theme_stats):
+        try:
+            await store.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create {type(store).__name__} indexes: {str(e)}")
+
+def configure_logging():
+    # A no-op when the root logger already has handlers, e.g. set up by an embedding application
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging is configured by the running worker, never as a side effect of importing the app
+    configure_logging()
+    # Nothing here waits on the network, so a worker is serving as soon as it has booted
+    connect_mongo()
+    connect_redis()
+    # Index creation must not hold up startup when MongoDB is slow or missing
+    background = [
+        asyncio.create_task(ensure_indexes()),
+        asyncio.create_task(monitor_event_loop_lag(EVENT_LOOP_LAG_INTERVAL)),
+    ]
+    if shared_state is not None:
+        background.append(asyncio.create_task(shared_state.run_quota_sync(youtube_quota, QUOTA_SYNC_INTERVAL)))
+    background.append(asyncio.create_task(theme_stats.run_flush(THEME_STATS_FLUSH_INTERVAL)))
+    if prewarmer.top_n > 0:
+        background.append(asyncio.create_task(prewarmer.run()))
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        for task in background:
+            task.cancel()
+        await theme_stats.flush()
+        await youtube_client.aclose()
+        await close_redis()
+        close_mongo()
+
+def create_app() -> FastAPI:
+    app = FastAPI(default_response_class=TimedJSONResponse, lifespan=lifespan)
+    app.state.ready = False
+
+    # Per-route latency histograms; PLAYLIST_TRACE_TIMINGS=1 also returns Server-Timing headers
+    app.add_middleware(MetricsMiddleware, trace_timings=os.environ.get('PLAYLIST_TRACE_TIMINGS') == '1')
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    return app
+
+app = create_app()
@@ -1,5 +1,4 @@
 import React, { useState, useEffect, useRef } from "react";
-import axios from "axios";
 import YouTube from "react-youtube";
 import { FaRandom, FaPlus, FaSearch, FaMusic, FaPlay, FaPause, FaStop, FaTv } from "react-icons/fa";
 import "./App.css";
@@ -18,6 +17,11 @@ function App() {
   const [videoError, setVideoError] = useState(false);
   const playerRef = useRef(null);
 
+  useEffect(() => {
+    // Ready signal for automated captures (playwright_test.py --ready-signal __APP_READY__)
+    window.__APP_READY__ = true;
+  }, []);
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     if (!theme.trim()) return;
@@ -28,39 +32,61 @@ function App() {
     setIsTvOn(false);
     setIsStaticEffect(true);
     
-    // Use a timeout promise to handle long-running requests
-    const timeoutPromise = new Promise((_, reject) => 
-      setTimeout(() => reject(new Error('Request timed out')), 20000)
-    );
+    // Abort the stream if the playlist takes too long to finish
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), 20000);
     
     try {
-      // Race between the actual request and the timeout
-      const response = await Promise.race([
-        axios.post(`${BACKEND_URL}/api/generate-playlist`, {
-          theme: theme,
-          count: 10
-        }),
-        timeoutPromise
-      ]);
+      // Songs arrive one per NDJSON line; start playing as soon as the first one lands
+      const response = await fetch(`${BACKEND_URL}/api/generate-playlist/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", Accept: "application/x-ndjson" },
+        body: JSON.stringify({ theme: theme, count: 10 }),
+        signal: controller.signal
+      });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let received = 0;
       
-      setPlaylist(response.data.playlist);
+      setPlaylist([]);
       setCurrentVideoIndex(0);
       
-      // TV turn on effect
-      setTimeout(() => {
-        setIsStaticEffect(false);
-        setIsTvOn(true);
-      }, 1500);
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event = JSON.parse(line);
+          if (!event.song) continue;
+          setPlaylist((songs) => [...songs, event.song]);
+          received += 1;
+          if (received === 1) {
+            // TV turn on effect
+            setTimeout(() => {
+              setIsStaticEffect(false);
+              setIsTvOn(true);
+            }, 300);
+          }
+        }
+      }
+      if (received === 0) throw new Error("Empty playlist");
       
     } catch (err) {
       console.error("Error fetching playlist:", err);
-      if (err.message === 'Request timed out') {
+      if (err.name === 'AbortError') {
         setError("Playlist generation timed out. Please try again or try a different theme.");
       } else {
         setError("Failed to generate playlist. Please try again.");
       }
       setIsStaticEffect(false);
     } finally {
+      clearTimeout(timeoutId);
       setIsLoading(false);
     }
   };
@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend import server
+from backend.benchmarks.memory_store import MemoryCollection, MemorySongCatalog
+from backend.external_integrations.playlist_cache import PlaylistCache
+from backend.external_integrations.resilience import within_deadline
+from backend.external_integrations.youtube import YouTubeClient
+from backend.external_integrations.youtube_stub import make_search_item
+
+
+class FakeYouTubeClient(YouTubeClient):
+    """Counts searches and answers them with stub results, within the request deadline like the real client."""
+
+    def __init__(self, latency: float = 0.0, error: Exception = None, quota=None):
+        super().__init__("test-key")
+        self.latency = latency
+        self.error = error
+        self.quota = quota
+        self.calls = []
+
+    async def search(self, query, max_results=50, priority="normal", page_token=None, fields=None):
+        if self.quota is not None:
+            self.quota.acquire(priority)
+        self.calls.append(query)
+        if self.latency:
+            await within_deadline(asyncio.sleep(self.latency))
+        if self.error is not None:
+            raise self.error
+        offset = int(page_token or 0)
+        items = [make_search_item(query, i) for i in range(offset, offset + max_results)]
+        return {"items": items, "nextPageToken": str(offset + max_results)}
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def fake_youtube(monkeypatch):
+    youtube = FakeYouTubeClient()
+    monkeypatch.setattr(server, "YOUTUBE_API_KEY", "test-key")
+    monkeypatch.setattr(server, "youtube_client", youtube)
+    monkeypatch.setattr(server, "playlist_cache", PlaylistCache(MemoryCollection()))
+    monkeypatch.setattr(server, "song_catalog", MemorySongCatalog())
+    return youtube
+
+
+async def post_playlists(bodies):
+    """POST each body to /api/generate-playlist concurrently and return the responses."""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        return await asyncio.gather(*(api.post("/api/generate-playlist", json=body) for body in bodies))
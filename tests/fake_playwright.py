@@ -0,0 +1,177 @@
+"""In-process stand-ins for the parts of the Playwright async API the .devcontainer scripts use."""
+import asyncio
+import fnmatch
+import io
+import re
+import sys
+from pathlib import Path
+
+DEVCONTAINER = Path(__file__).resolve().parent.parent / ".devcontainer"
+if str(DEVCONTAINER) not in sys.path:
+    sys.path.insert(0, str(DEVCONTAINER))
+
+
+def jpeg(shade: int = 0, size=(40, 60)) -> bytes:
+    """A small solid JPEG, or placeholder bytes without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return bytes([shade]) * 16
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (shade, shade, shade)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class FakeRoute:
+    def __init__(self, playwright, url):
+        self.playwright = playwright
+        self.url = url
+
+    async def abort(self, error_code="failed"):
+        self.playwright.aborted.append(self.url)
+
+
+def route_matches(pattern, url: str) -> bool:
+    if isinstance(pattern, re.Pattern):
+        return pattern.search(url) is not None
+    return fnmatch.fnmatchcase(url, pattern)
+
+
+class FakePage:
+    def __init__(self, playwright, browser, context=None):
+        self.playwright = playwright
+        self.browser = browser
+        self.context = context
+
+    def on(self, event, handler):
+        pass
+
+    async def goto(self, url, **kwargs):
+        """Navigate, sending each of ``playwright.subresources`` through the context's routes."""
+        self.playwright.navigations.append({"url": url, **kwargs})
+        self.playwright.active += 1
+        self.playwright.max_active = max(self.playwright.max_active, self.playwright.active)
+        try:
+            await asyncio.sleep(self.playwright.latency)
+            for resource in self.playwright.subresources:
+                for pattern, handler in self.context.routes if self.context is not None else ():
+                    if route_matches(pattern, resource):
+                        await handler(FakeRoute(self.playwright, resource))
+                        break
+        finally:
+            self.playwright.active -= 1
+
+    async def wait_for_selector(self, selector, **kwargs):
+        await self._wait(("selector", selector))
+
+    async def wait_for_function(self, expression, **kwargs):
+        await self._wait(("function", expression))
+
+    async def _wait(self, condition):
+        # Imported here so the fake loads without Playwright for the tests that skip on it
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        self.playwright.waits.append(condition)
+        if not self.playwright.ready:
+            raise PlaywrightTimeoutError(f"Timeout waiting for {condition[1]}")
+
+    async def wait_for_timeout(self, ms):
+        self.playwright.settled.append(ms)
+
+    async def evaluate(self, expression):
+        return dict(self.playwright.metrics)
+
+    async def screenshot(self, path=None, **kwargs):
+        self.playwright.screenshots += 1
+        image = self.playwright.image
+        if path:
+            Path(path).write_bytes(image)
+        return image
+
+    def crash(self):
+        self.browser.connected = False
+
+
+class FakeContext:
+    def __init__(self, playwright, browser):
+        self.playwright = playwright
+        self.browser = browser
+        self.routes = []
+        self.init_scripts = []
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def new_page(self):
+        return FakePage(self.playwright, self.browser, self)
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, playwright):
+        self.playwright = playwright
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self):
+        context = FakeContext(self.playwright, self)
+        self.playwright.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    """
+    Call it in place of ``async_playwright``; tracks launches and the most pages navigating at once.
+
+    Navigations request each URL in ``subresources`` through the context's
+    routes, readiness waits time out unless ``ready``, and ``evaluate``
+    answers with ``metrics``.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.image = jpeg()
+        self.launched = []
+        self.contexts = []
+        self.screenshots = 0
+        self.active = 0
+        self.max_active = 0
+        self.subresources = []
+        self.aborted = []
+        self.navigations = []
+        self.ready = True
+        self.waits = []
+        self.settled = []
+        self.metrics = {}
+        self.chromium = self
+
+    def __call__(self):
+        return self
+
+    async def launch(self, **kwargs):
+        await asyncio.sleep(0)
+        browser = FakeBrowser(self)
+        self.launched.append(browser)
+        return browser
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
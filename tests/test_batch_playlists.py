@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import httpx
+
+from backend import server
+
+
+async def post_batch(bodies):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        return await api.post("/api/generate-playlists", json={"requests": bodies})
+
+
+def test_batch_shares_duplicate_themes(fake_youtube):
+    """Test that duplicate themes in one batch make one upstream call and keep input order"""
+    bodies = [{"theme": "Rock"}, {"theme": "pop", "count": 3}, {"theme": "rock!"}, {"theme": "POP", "count": 3}]
+
+    response = asyncio.run(post_batch(bodies))
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["theme"] for r in results] == ["Rock", "pop", "rock!", "POP"]
+    assert len(fake_youtube.calls) == 2
+    assert results[0]["playlist"] == results[2]["playlist"]
+    assert [len(r["playlist"]) for r in results] == [10, 3, 10, 3]
+
+
+def test_batch_defaults_null_count_and_rejects_nonpositive(fake_youtube):
+    """Test that a null count means the default and a count below 1 is a validation error, not a 500"""
+    response = asyncio.run(post_batch([{"theme": "rock", "count": None}, {"theme": "pop", "count": 99}]))
+    rejected = asyncio.run(post_batch([{"theme": "rock", "count": 0}]))
+
+    assert response.status_code == 200
+    assert [len(r["playlist"]) for r in response.json()["results"]] == [10, 15]
+    assert rejected.status_code == 422
+
+
+def test_batch_fans_out_concurrently(fake_youtube, monkeypatch):
+    """Test that distinct themes resolve in parallel up to the concurrency bound"""
+    fake_youtube.latency = 0.1
+    monkeypatch.setattr(server, "BATCH_CONCURRENCY", 4)
+
+    started = time.perf_counter()
+    themes = ["rock", "pop", "grunge", "house", "swing", "ska", "trance", "funk"]
+    response = asyncio.run(post_batch([{"theme": theme} for theme in themes]))
+    elapsed = time.perf_counter() - started
+
+    assert len(response.json()["results"]) == 8
+    assert len(fake_youtube.calls) == 8
+    assert 0.2 <= elapsed < 0.6  # two waves of four, not eight sequential calls
+
+
+def test_batch_reports_per_theme_errors(fake_youtube, monkeypatch):
+    """Test that one failing theme does not fail the batch"""
+    resolve_playlist = server.resolve_playlist
+
+    async def flaky(theme, count):
+        if theme == "broken":
+            raise RuntimeError("boom")
+        return await resolve_playlist(theme, count)
+
+    monkeypatch.setattr(server, "resolve_playlist", flaky)
+
+    results = asyncio.run(post_batch([{"theme": "broken"}, {"theme": "jazz"}])).json()["results"]
+
+    assert results[0] == {"theme": "broken", "error": "boom"}
+    assert results[1]["message"] == "Successfully generated playlist"
+
+
+def test_batch_size_limit(fake_youtube, monkeypatch):
+    """Test that oversized batches are rejected"""
+    monkeypatch.setattr(server, "BATCH_MAX_SIZE", 2)
+
+    response = asyncio.run(post_batch([{"theme": "a"}, {"theme": "b"}, {"theme": "c"}]))
+
+    assert response.status_code == 400
+    assert fake_youtube.calls == []
+
+
+def test_batch_deadline_is_per_theme(fake_youtube, monkeypatch):
+    """Test that themes queued behind the concurrency bound get a full deadline of their own"""
+    fake_youtube.latency = 0.1
+    monkeypatch.setattr(server, "BATCH_CONCURRENCY", 1)
+    monkeypatch.setattr(server, "PLAYLIST_DEADLINE", 0.25)
+
+    themes = ["rock", "pop", "grunge", "house", "swing"]
+    results = asyncio.run(post_batch([{"theme": theme} for theme in themes])).json()["results"]
+
+    assert [r["message"] for r in results] == ["Successfully generated playlist"] * 5
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from backend import server
+from backend.external_integrations.fallback_catalog import FallbackCatalog
+from tests.conftest import post_playlists
+
+
+def titles(songs):
+    return {song["title"] for song in songs}
+
+
+def test_theme_relevant_songs_ranked_first():
+    """Test that songs tagged with the theme dominate a short fallback playlist"""
+    catalog = FallbackCatalog(server.SAMPLE_90S_SONGS)
+    for seed in range(20):
+        assert titles(catalog.select("grunge", 2, seed=seed)) == {"Smells Like Teen Spirit", "Black Hole Sun"}
+
+
+def test_seeded_selection_is_deterministic():
+    """Test that the same seed yields the same playlist and different seeds vary"""
+    catalog = FallbackCatalog(server.SAMPLE_90S_SONGS)
+    assert catalog.select("pop", 8, seed=7) == catalog.select("pop", 8, seed=7)
+    assert len({tuple(s["videoId"] for s in catalog.select("", 8, seed=seed)) for seed in range(10)}) > 1
+
+
+def test_selection_returns_copies_without_tags():
+    """Test that callers cannot mutate the shared catalog"""
+    catalog = FallbackCatalog(server.SAMPLE_90S_SONGS)
+    [song] = catalog.select("rap", 1, seed=1)
+    assert set(song) == {"title", "artist", "videoId", "thumbnail"}
+    song["title"] = "changed"
+    assert "changed" not in titles(catalog.songs)
+    with pytest.raises(TypeError):
+        catalog.songs[0]["title"] = "changed"
+    with pytest.raises(ValueError):
+        catalog._postings[0] = 1
+
+
+def test_exclude_and_count_bounds():
+    """Test excluded videoIds are skipped and counts are capped by catalog size"""
+    catalog = FallbackCatalog(server.SAMPLE_90S_SONGS)
+    excluded = [song["videoId"] for song in catalog.select("grunge", 2, seed=0)]
+    playlist = catalog.select("grunge", 5, seed=0, exclude=excluded)
+    assert len(playlist) == 5
+    assert not set(excluded) & {song["videoId"] for song in playlist}
+    assert len(catalog.select("", 100)) == len(server.SAMPLE_90S_SONGS)
+    assert FallbackCatalog([]).select("rock", 5) == []
+
+
+def test_scores_use_idf_weights():
+    """Test that rarer tags outweigh common ones"""
+    catalog = FallbackCatalog(server.SAMPLE_90S_SONGS)
+    scores = catalog.scores("rock funk")
+    ranked = [catalog.songs[i]["title"] for i in np.argsort(-scores)[:3]]
+    assert ranked[0] in {"Californication", "Virtual Insanity"}
+    assert scores.dtype == np.float32
+
+
+def test_large_catalog_selection_is_fast():
+    """Test that a tens-of-thousands song catalog answers in milliseconds"""
+    genres = ["grunge", "pop", "rap", "house", "britpop", "ska", "funk", "punk"]
+    songs = [{"title": f"Track {i}", "artist": f"Band {i % 997}", "videoId": f"v{i}", "thumbnail": "",
+              "tags": [genres[i % len(genres)], genres[(i * 7) % len(genres)]]} for i in range(50000)]
+    catalog = FallbackCatalog(songs)
+
+    started = time.perf_counter()
+    for seed in range(20):
+        playlist = catalog.select("grunge punk", 15, seed=seed)
+    elapsed = (time.perf_counter() - started) / 20
+
+    assert len(playlist) == 15
+    assert all({"grunge", "punk"} & set(songs[int(s["videoId"][1:])]["tags"]) for s in playlist)
+    assert elapsed < 0.05
+
+
+def test_endpoint_fallback_follows_theme(fake_youtube):
+    """Test that the sample fallback is chosen by theme relevance"""
+    fake_youtube.error = RuntimeError("boom")
+
+    [response] = asyncio.run(post_playlists([{"theme": "Grunge!", "count": 2}]))
+
+    assert titles(response.json()["playlist"]) == {"Smells Like Teen Spirit", "Black Hole Sun"}
@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend import server
+from backend.external_integrations.http_cache import negotiate_encoding
+
+
+async def get_playlists(*requests):
+    """GET /api/playlist once per (params, headers) pair, in order."""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        return [await api.get("/api/playlist", params=params, headers=headers) for params, headers in requests]
+
+
+def test_get_is_deterministic_and_cacheable(fake_youtube):
+    """Test that repeat GETs return identical bytes and ETags served from one upstream call"""
+    params = {"theme": "Grunge", "count": 5}
+    first, second = asyncio.run(get_playlists((params, {}), ({"theme": "grunge!", "count": 5}, {})))
+
+    assert first.status_code == 200
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=300, stale-while-revalidate=300"
+    assert len(fake_youtube.calls) == 1
+
+
+def test_seed_selects_a_stable_variant(fake_youtube, monkeypatch):
+    """Test that a seed gives the same fallback playlist every time, and another seed another one"""
+    monkeypatch.setattr(server, "YOUTUBE_API_KEY", "")
+    one, again, other = asyncio.run(get_playlists(
+        ({"theme": "rock", "count": 10, "seed": 1}, {}),
+        ({"theme": "rock", "count": 10, "seed": 1}, {}),
+        ({"theme": "rock", "count": 10, "seed": 2}, {}),
+    ))
+
+    assert one.json() == again.json()
+    assert one.headers["etag"] == again.headers["etag"]
+    assert one.headers["etag"] != other.headers["etag"]
+    assert "max-age=30," in one.headers["cache-control"]
+
+
+def test_if_none_match_returns_304(fake_youtube):
+    """Test revalidation with the ETag of the same representation"""
+    params = {"theme": "house", "count": 10}
+    first, = asyncio.run(get_playlists((params, {"Accept-Encoding": "gzip"})))
+    second, = asyncio.run(get_playlists((params, {"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})))
+
+    assert first.headers["content-encoding"] == "gzip"
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_brotli_preferred_when_accepted(fake_youtube):
+    """Test brotli compression and that each content coding has its own ETag"""
+    pytest.importorskip("brotli")
+    params = {"theme": "ska", "count": 10}
+    br, identity = asyncio.run(get_playlists((params, {"Accept-Encoding": "gzip, br"}),
+                                             (params, {"Accept-Encoding": "identity"})))
+
+    assert br.headers["content-encoding"] == "br"
+    assert br.json() == identity.json()
+    assert "content-encoding" not in identity.headers
+    assert br.headers["etag"] != identity.headers["etag"]
+    assert br.headers["vary"] == "Accept-Encoding"
+
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding parsing with q-values"""
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip;q=0.5, deflate") == "gzip"
+    assert negotiate_encoding("*;q=0.1, gzip;q=0") in (None, "br")
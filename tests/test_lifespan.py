@@ -0,0 +1,67 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+
+from backend import server
+
+
+async def probe(path, lifespan=True):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        if not lifespan:
+            return await api.get(path)
+        async with server.app.router.lifespan_context(server.app):
+            return await api.get(path)
+
+
+def test_healthz_answers_without_startup():
+    """Test that liveness does not depend on startup or upstreams"""
+    response = asyncio.run(probe("/healthz", lifespan=False))
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_waits_for_lifespan(monkeypatch):
+    """Test that a worker only reports ready once its lifespan has started"""
+    monkeypatch.setattr(server, "MONGO_URL", "")
+    monkeypatch.setattr(server, "REDIS_URL", "")
+    monkeypatch.setattr(server, "YOUTUBE_API_KEY", "")
+
+    before = asyncio.run(probe("/readyz", lifespan=False))
+    during = asyncio.run(probe("/readyz"))
+
+    assert before.status_code == 503
+    assert during.status_code == 200
+    assert during.json()["checks"] == {"mongo": "disabled", "redis": "disabled", "youtube": "no_api_key"}
+    assert server.app.state.ready is False
+
+
+def test_readyz_reports_unreachable_mongo(monkeypatch):
+    """Test that an unreachable MongoDB makes the worker unready and the lifespan closes the client"""
+    monkeypatch.setattr(server, "MONGO_URL", "mongodb://127.0.0.1:1")
+    monkeypatch.setattr(server, "DB_NAME", "readiness_test")
+    monkeypatch.setattr(server, "MONGO_CLIENT_OPTIONS", {"serverSelectionTimeoutMS": 100})
+
+    response = asyncio.run(probe("/readyz"))
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["mongo"] == "down"
+    assert server.client is None
+    assert server.playlist_cache.collection is None
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """Test that importing the app neither configures logging nor loads backend/.env"""
+    code = ("import logging; from backend import server; "
+            "print(len(logging.getLogger().handlers), server.MONGO_URL == '', server.DB_NAME == '')")
+    env = {key: value for key, value in os.environ.items() if key not in ("MONGO_URL", "DB_NAME")}
+    root = Path(server.__file__).resolve().parent.parent
+
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+
+    assert output.stdout.split() == ["0", "True", "True"]
@@ -0,0 +1,41 @@
+import asyncio
+
+from backend import server
+from backend.benchmarks import load_test
+
+
+def test_load_test_reports_latency_and_fallback_rate():
+    """Test that the load test drives the app against the stub and leaves the server module as it found it"""
+    playlist_cache, youtube_client = server.playlist_cache, server.youtube_client
+
+    report = asyncio.run(load_test.run(requests=40, concurrency=8, themes=4, latency=0.0, error_rate=1.0))
+
+    assert report["statuses"] == {"200": 40}
+    assert report["latency"]["count"] == 40
+    assert report["fallback_rate"] > 0
+    assert report["upstream_calls"] >= 1
+    assert server.playlist_cache is playlist_cache and server.youtube_client is youtube_client
+    assert load_test.check_thresholds(report, max_fallback_rate=0.0) == [f"fallback_rate {report['fallback_rate']} exceeds 0.0"]
+
+
+def test_load_test_client_uses_server_settings():
+    """Test that the benchmark client differs from production only in its URL, unless limits are bypassed"""
+    with load_test.isolated_server("http://stub.test/search"):
+        client = server.youtube_client
+        assert client.api_url == "http://stub.test/search"
+        assert client.quota is server.youtube_quota and client.breaker is server.youtube_breaker
+        assert client.retries == server.YOUTUBE_CLIENT_OPTIONS["retries"]
+        assert client.hedge_delay == server.YOUTUBE_CLIENT_OPTIONS["hedge_delay"]
+    with load_test.isolated_server("http://stub.test/search", limits=False):
+        assert server.youtube_client.quota is None and server.youtube_client.breaker is None
+
+
+def test_load_test_limits_shed_upstream_calls():
+    """Test that the production rate limit and breaker hold back upstream calls that --no-limits makes"""
+    limited = asyncio.run(load_test.run(requests=40, concurrency=1, themes=40, latency=0.0, error_rate=1.0))
+    unlimited = asyncio.run(load_test.run(requests=40, concurrency=1, themes=40, latency=0.0, error_rate=1.0,
+                                          limits=False))
+
+    assert sum(limited["quota"]["throttled"].values()) + limited["circuit"]["rejected"] >= 1
+    assert limited["upstream_calls"] < unlimited["upstream_calls"]
+    assert unlimited["circuit"] is None
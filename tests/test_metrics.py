@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from backend import server
+from backend.external_integrations.metrics import REGISTRY, MetricsMiddleware, span
+from backend.external_integrations.youtube import YouTubeClient
+from backend.external_integrations.youtube_stub import running_stub
+from tests.conftest import post_playlists
+
+
+def sample_value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def get(app, path):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        return await api.get(path)
+
+
+def test_metrics_endpoint_reports_route_latency(fake_youtube):
+    """Test that /metrics exposes per-route latency and store gauges"""
+    asyncio.run(post_playlists([{"theme": "rock"}]))
+
+    response = asyncio.run(get(server.app, "/metrics"))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/generate-playlist",status="200"}' in response.text
+    assert "playlist_cache_misses" in response.text
+    assert "youtube_quota_remaining" in response.text
+
+
+def test_fallback_counter_by_reason(fake_youtube, monkeypatch):
+    """Test that sample playlists are counted by the reason they were served"""
+    fake_youtube.error = RuntimeError("upstream down")
+    api_errors = sample_value("playlist_fallback_total", reason="api_error")
+    no_key = sample_value("playlist_fallback_total", reason="no_api_key")
+
+    asyncio.run(post_playlists([{"theme": "grunge"}]))
+    monkeypatch.setattr(server, "YOUTUBE_API_KEY", "")
+    asyncio.run(post_playlists([{"theme": "ska"}]))
+
+    assert sample_value("playlist_fallback_total", reason="api_error") == api_errors + 1
+    assert sample_value("playlist_fallback_total", reason="no_api_key") == no_key + 1
+
+
+def test_server_timing_header_when_tracing():
+    """Test that spans are reported in a Server-Timing header only when tracing is on"""
+    def make_app(trace_timings):
+        app = FastAPI()
+
+        @app.get("/work")
+        async def work():
+            with span("upstream"):
+                await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        app.add_middleware(MetricsMiddleware, trace_timings=trace_timings)
+        return app
+
+    traced = asyncio.run(get(make_app(True), "/work"))
+    untraced = asyncio.run(get(make_app(False), "/work"))
+
+    phase, duration = traced.headers["server-timing"].split(";dur=")
+    assert phase == "upstream"
+    assert float(duration) >= 10
+    assert "server-timing" not in untraced.headers
+
+
+def test_upstream_phases_are_counted_once_per_page():
+    """Test that decoding a response and parsing its songs are separate phases, each timed once per page"""
+    def phase_count(phase):
+        return sample_value("playlist_phase_duration_seconds_count", phase=phase)
+
+    async def scenario():
+        async with running_stub() as (_, url):
+            client = YouTubeClient("test-key", api_url=url)
+            try:
+                return await client.search_songs("rock", 5)
+            finally:
+                await client.aclose()
+
+    before = {phase: phase_count(phase) for phase in ("upstream", "decode", "parse")}
+    songs = asyncio.run(scenario())
+
+    assert len(songs) == 5
+    assert {phase: phase_count(phase) - before[phase] for phase in before} == {"upstream": 1, "decode": 1, "parse": 1}
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+from backend import server
+from backend.benchmarks.memory_store import MemoryCollection
+from backend.external_integrations.mongo_backoff import MongoHealth
+from backend.external_integrations.playlist_cache import FRESH, MISS, STALE, LRUCache, PlaylistCache, normalize_theme
+from backend.external_integrations.prewarm import ThemeStats
+from backend.external_integrations.song_catalog import SongCatalog
+from tests.conftest import post_playlists
+
+SONGS = [{"title": f"Song {i}", "artist": "Artist", "videoId": f"vid{i}", "thumbnail": ""} for i in range(10)]
+
+
+class BrokenCollection:
+    async def find_one(self, query):
+        raise ConnectionError("mongo down")
+
+    async def replace_one(self, query, doc, upsert=False):
+        raise ConnectionError("mongo down")
+
+
+class UnreachableCollection:
+    """Waits out server selection like a client whose MongoDB is gone; queries after that are a bug."""
+
+    async def find_one(self, query):
+        await asyncio.sleep(2)
+
+    def find(self, query, projection=None):
+        raise AssertionError("queried while MongoDB is backed off")
+
+    async def bulk_write(self, operations, ordered=True):
+        raise AssertionError("written while MongoDB is backed off")
+
+
+def test_normalize_theme():
+    """Test that case, punctuation and whitespace are folded"""
+    assert normalize_theme("  Rock!! ") == "rock"
+    assert normalize_theme("HIP-hop\tDance") == normalize_theme("hip hop dance")
+    assert normalize_theme("rock!@#$%^&*()") == "rock"
+    assert normalize_theme("") == ""
+
+
+def test_lru_evicts_least_recently_used():
+    """Test LRU eviction order"""
+    lru = LRUCache(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    lru.get("a")
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+
+
+def test_memory_then_mongo_hits():
+    """Test that entries evicted from memory are still served from MongoDB"""
+    async def scenario():
+        cache = PlaylistCache(MemoryCollection(), max_entries=1)
+        assert await cache.get("rock", 5) == (None, MISS)
+        await cache.set("rock", SONGS, 10)
+        assert await cache.get("rock", 5) == (SONGS, FRESH)
+        await cache.set("pop", SONGS, 10)  # evicts "rock" from memory
+        assert await cache.get("rock", 5) == (SONGS, FRESH)
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["mongo_hits"] == 1
+
+
+def test_short_entry_is_a_miss_for_larger_count():
+    """Test that a cached playlist smaller than the requested count is not served"""
+    async def scenario():
+        cache = PlaylistCache()
+        await cache.set("rock", SONGS[:3], 3)
+        return await cache.get("rock", 5)
+
+    assert asyncio.run(scenario()) == (None, MISS)
+
+
+def test_stale_entry_served_with_single_refresh():
+    """Test stale-while-revalidate runs one refresh for concurrent stale hits"""
+    calls = []
+
+    cache = PlaylistCache(ttl=0, stale_ttl=60)
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        await cache.set("rock", SONGS[::-1], 10)
+
+    async def scenario():
+        await cache.set("rock", SONGS, 10)
+        playlist, state = await cache.get("rock", 10)
+        assert (playlist, state) == (SONGS, STALE)
+        first = cache.refresh("rock", load)
+        second = cache.refresh("rock", load)
+        assert first is second
+        await first
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_mongo_errors_degrade_to_memory():
+    """Test that MongoDB failures do not break lookups"""
+    async def scenario():
+        cache = PlaylistCache(BrokenCollection())
+        await cache.set("rock", SONGS, 10)
+        return await cache.get("rock", 10), cache.stats()
+
+    (playlist, state), stats = asyncio.run(scenario())
+    assert state == FRESH
+    assert stats["mongo_errors"] == 1
+
+
+def test_slow_mongo_times_out_and_backs_off_every_store():
+    """Test that a hung read gives up after the op timeout and takes the catalog and theme stats down with it"""
+    health = MongoHealth(op_timeout=0.05)
+    cache = PlaylistCache(UnreachableCollection(), mongo_health=health)
+    catalog = SongCatalog(UnreachableCollection(), mongo_health=health)
+    stats = ThemeStats(UnreachableCollection(), mongo_health=health)
+
+    async def scenario():
+        started = time.monotonic()
+        lookup = await cache.get("rock", 5)
+        elapsed = time.monotonic() - started
+        stats.record("rock")
+        return lookup, elapsed, await catalog.search("rock", 5), await stats.top(1)
+
+    lookup, elapsed, matches, top = asyncio.run(scenario())
+    assert lookup == (None, MISS)
+    assert elapsed < 1
+    assert matches == [] and top == ["rock"]
+    assert health.failures == 1
+    assert cache.stats()["mongo_errors"] == 1 and catalog.stats()["mongo_errors"] == 0
+
+
+def test_endpoint_serves_equivalent_themes_from_cache(fake_youtube):
+    """Test that themes differing only in case and punctuation share one upstream call"""
+    async def scenario():
+        first = await post_playlists([{"theme": "Rock!", "count": 5}])
+        rest = await post_playlists([{"theme": " rock ", "count": 5}, {"theme": "ROCK", "count": 3}])
+        return first + rest
+
+    responses = asyncio.run(scenario())
+    assert len(fake_youtube.calls) == 1
+    assert all(r.json()["message"] == "Successfully generated playlist" for r in responses)
+    assert responses[0].json()["playlist"][:3] == responses[2].json()["playlist"]
+    assert server.playlist_cache.stats()["memory_hits"] == 2
@@ -0,0 +1,274 @@
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import stat
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from tests.fake_playwright import FakePlaywright  # noqa: E402  (puts .devcontainer on sys.path)
+
+import playwright_executor  # noqa: E402
+from screenshots import FrameStore  # noqa: E402
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch, tmp_path):
+    playwright = FakePlaywright()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(playwright_executor, "async_playwright", playwright)
+    monkeypatch.setattr(playwright_executor, "frame_store", FrameStore(tmp_path / "automation_output"))
+    return playwright
+
+
+def job(script="return 1", **fields):
+    return {"url": "http://app.test", "script": script, **fields}
+
+
+async def settle(pool):
+    while pool._recycling:
+        await asyncio.sleep(0.001)
+
+
+def test_pool_relaunches_crashed_browser(fake_playwright):
+    """Test that a browser that crashed between or during jobs is replaced"""
+    async def scenario():
+        pool = playwright_executor.BrowserPool(1, recycle_after=50)
+        await pool.start()
+        try:
+            first = await playwright_executor.run_job(pool, job())
+            fake_playwright.launched[-1].connected = False  # dies while idle
+            second = await playwright_executor.run_job(pool, job())
+            third = await playwright_executor.run_job(pool, job("page.crash()\nreturn 3"))  # dies mid-job
+            await settle(pool)
+            fourth = await playwright_executor.run_job(pool, job())
+        finally:
+            await pool.stop()
+        return pool, [first, second, third, fourth]
+
+    pool, results = asyncio.run(scenario())
+
+    assert [r["status"] for r in results] == ["success"] * 4
+    assert results[2]["data"]["output"] == 3
+    assert pool.stats == {"jobs": 4, "launches": 3, "crashes": 2, "recycled": 0}
+
+
+def test_pool_recycles_after_job_limit(fake_playwright):
+    """Test that a browser is relaunched after serving recycle_after jobs"""
+    async def scenario():
+        pool = playwright_executor.BrowserPool(1, recycle_after=2)
+        await pool.start()
+        try:
+            for _ in range(5):
+                assert (await playwright_executor.run_job(pool, job()))["status"] == "success"
+            await settle(pool)
+        finally:
+            await pool.stop()
+        return pool
+
+    pool = asyncio.run(scenario())
+
+    assert pool.stats == {"jobs": 5, "launches": 3, "crashes": 0, "recycled": 2}
+    assert not fake_playwright.launched[0].is_connected()
+
+
+def test_pool_returns_every_lease_under_crashes(fake_playwright):
+    """Test that concurrent jobs with random crashes and recycling leave every lease back in the pool"""
+    fake_playwright.latency = 0.001
+    rng = random.Random(7)
+    scripts = ["page.crash()\nreturn 1" if rng.random() < 0.2 else "return 1" for _ in range(120)]
+
+    async def scenario():
+        pool = playwright_executor.BrowserPool(3, recycle_after=5, contexts_per_browser=2)
+        await pool.start()
+        try:
+            results = await asyncio.gather(*(playwright_executor.run_job(pool, job(s)) for s in scripts))
+            await settle(pool)
+            return pool, results, pool._idle.qsize(), [slot["parked"] for slot in pool._slots]
+        finally:
+            await pool.stop()
+
+    pool, results, idle, parked = asyncio.run(scenario())
+
+    assert all(r["status"] == "success" for r in results)
+    assert idle == 3 * 2
+    assert parked == [0, 0, 0]
+    assert pool.stats["jobs"] == 120
+    assert fake_playwright.max_active <= 3 * 2
+    assert pool.stats["crashes"] >= 1
+
+
+async def answer(lines, token=None):
+    """Feed ``lines`` to answer_lines and return the decoded answers and the pool stats afterwards."""
+    pool = playwright_executor.BrowserPool(1, recycle_after=50)
+    await pool.start()
+    answers = []
+    try:
+        remaining = iter(lines)
+
+        async def read_line():
+            return next(remaining, "")
+
+        await playwright_executor.answer_lines(pool, read_line, answers.append, token)
+        stats = await playwright_executor.run_job(pool, {"command": "stats", "id": "s"})
+    finally:
+        await pool.stop()
+    return [json.loads(answer) for answer in answers], stats
+
+
+def test_daemon_answers_jobs_and_stats(fake_playwright):
+    """Test that each job gets one result line with its id, and pool stats on request"""
+    lines = [json.dumps(job(id=1)), json.dumps({"id": 2, "url": "http://app.test"}), "\n", json.dumps(job(id=3))]
+
+    answers, stats = asyncio.run(answer(lines))
+
+    by_id = {answer.get("id"): answer for answer in answers}
+    assert sorted(by_id) == [1, 2, 3]
+    assert by_id[1]["status"] == by_id[3]["status"] == "success"
+    assert by_id[2]["data"]["error"].startswith("Invalid job")
+    assert stats["id"] == "s"
+    assert stats["data"]["pool"] == {"jobs": 2, "launches": 1, "crashes": 0, "recycled": 0}
+
+
+def test_daemon_closes_on_a_line_that_is_not_a_job(fake_playwright):
+    """Test that an HTTP request (say, a web page POSTing to the port) ends the session before its body runs"""
+    lines = ["POST / HTTP/1.1\r\n", "Host: 127.0.0.1:9000\r\n", "Content-Type: text/plain\r\n", "\r\n",
+             json.dumps(job("open('pwned', 'w')\nreturn 1")) + "\n"]
+
+    answers, stats = asyncio.run(answer(lines))
+
+    assert [a["data"]["error"] for a in answers] == ["Invalid job: expected a JSON object, closing"]
+    assert stats["data"]["pool"]["jobs"] == 0
+
+
+def test_daemon_requires_the_token(fake_playwright):
+    """Test that with a token set, a job without it or with another one ends the session unrun"""
+    for sent in [{}, {"token": "guess"}, {"token": 123}]:
+        answers, stats = asyncio.run(answer([json.dumps(job(**sent)), json.dumps(job(token="secret"))], "secret"))
+        assert [a["data"]["error"] for a in answers] == ["Invalid token, closing"]
+        assert stats["data"]["pool"]["jobs"] == 0
+
+    answers, stats = asyncio.run(answer([json.dumps(job(id=1, token="secret"))], "secret"))
+    assert answers[0]["status"] == "success" and answers[0]["id"] == 1
+
+
+def test_daemon_socket_is_private_and_token_checked(fake_playwright, tmp_path):
+    """Test that the Unix socket is created 0600 and serves jobs carrying the token"""
+    socket_path = str(tmp_path / "executor.sock")
+
+    async def scenario():
+        daemon = asyncio.create_task(playwright_executor.serve_daemon(1, 50, socket_path=socket_path, token="secret"))
+        try:
+            while not os.path.exists(socket_path):
+                await asyncio.sleep(0.01)
+            mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write((json.dumps(job(id=7, token="secret")) + "\n").encode())
+            writer.write_eof()
+            answers = [json.loads(line) async for line in reader]
+            writer.close()
+        finally:
+            daemon.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await daemon
+        return mode, answers
+
+    mode, answers = asyncio.run(scenario())
+
+    assert mode == 0o600
+    assert [(a["id"], a["status"]) for a in answers] == [(7, "success")]
+
+
+def test_token_file_is_owner_only(tmp_path):
+    """Test that a generated token is written readable by the owner only, replacing a looser file"""
+    path = tmp_path / "token"
+    path.write_text("old")
+    path.chmod(0o644)
+
+    token = playwright_executor.write_token_file(str(path))
+
+    assert path.read_text().strip() == token and len(token) >= 32
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_manifest_accepts_json_array_and_lines(tmp_path, monkeypatch):
+    """Test that manifests load from a JSON array, JSON lines or stdin"""
+    jobs = [job(id="a"), job("return 2")]
+    array = tmp_path / "jobs.json"
+    array.write_text(json.dumps(jobs, indent=2))
+    lines = tmp_path / "jobs.jsonl"
+    lines.write_text("\n".join(json.dumps(j) for j in jobs) + "\n\n")
+    monkeypatch.setattr("sys.stdin", io.StringIO(lines.read_text()))
+
+    assert playwright_executor.read_manifest(str(array)) == jobs
+    assert playwright_executor.read_manifest(str(lines)) == jobs
+    assert playwright_executor.read_manifest("-") == jobs
+
+
+def test_batch_bounds_concurrency_and_summarizes(fake_playwright):
+    """Test that a batch runs at most `concurrency` jobs at once, ids default to the index and the summary adds up"""
+    fake_playwright.latency = 0.01
+    jobs = [job(f"return {i}") for i in range(10)] + [job(id="named"), {"url": "http://app.test"}]
+    lines = []
+
+    summary = asyncio.run(playwright_executor.run_batch(jobs, concurrency=3, pool_size=2, recycle_after=50,
+                                                        write_line=lines.append))
+
+    results = {result["id"]: result for result in map(json.loads, lines)}
+    assert sorted(results, key=str) == sorted([*range(10), "named", 11], key=str)
+    assert results[4]["data"]["output"] == 4
+    assert results[11]["status"] == "error"
+    assert all(result["duration_ms"] >= 0 for result in results.values())
+    assert fake_playwright.max_active == 3
+    assert summary["jobs"] == 12
+    assert (summary["succeeded"], summary["failed"]) == (11, 1)
+    assert set(summary["job_ms"]) == {"p50", "p95", "max"}
+    assert summary["job_ms"]["p50"] <= summary["job_ms"]["p95"] <= summary["job_ms"]["max"]
+    assert summary["jobs_per_s"] > 0
+    assert summary["pool"]["jobs"] == 11
+    assert summary["pool"]["launches"] == 2
+
+
+def test_percentile_is_nearest_rank():
+    """Test the nearest-rank percentile used in batch summaries"""
+    assert playwright_executor.percentile([], 0.5) == 0.0
+    assert playwright_executor.percentile([5.0], 0.95) == 5.0
+    assert playwright_executor.percentile(list(range(1, 21)), 0.5) == 10
+    assert playwright_executor.percentile(list(range(1, 21)), 0.95) == 19
+
+
+def test_compiled_scripts_are_cached_by_decoded_content(monkeypatch):
+    """Test that plain and base64 forms of one script compile once"""
+    monkeypatch.setattr(playwright_executor, "_compiled_scripts", {})
+    compiled = []
+    real_compile = compile
+
+    def counting_compile(source, filename, mode):
+        compiled.append(filename)
+        return real_compile(source, filename, mode)
+
+    monkeypatch.setattr(playwright_executor, "compile", counting_compile, raising=False)
+    script = "return 41 + 1"
+    encoded = "base64:" + base64.b64encode(script.encode()).decode()
+
+    for form in [script, encoded, script]:
+        run_test = playwright_executor.compile_script(playwright_executor.decode_script(form))
+        assert asyncio.run(run_test(None, ".")) == 42
+
+    assert len(compiled) == 1
+
+
+def test_cached_script_runs_get_fresh_globals(monkeypatch):
+    """Test that runs of one cached script never share module state"""
+    monkeypatch.setattr(playwright_executor, "_compiled_scripts", {})
+    script = "global runs\nruns = globals().get('runs', 0) + 1\nreturn runs"
+
+    outputs = [asyncio.run(playwright_executor.compile_script(script)(None, ".")) for _ in range(3)]
+
+    assert outputs == [1, 1, 1]
+    assert len(playwright_executor._compiled_scripts) == 1
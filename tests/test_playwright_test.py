@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from tests.fake_playwright import FakePlaywright  # noqa: E402  (puts .devcontainer on sys.path)
+
+import playwright_test  # noqa: E402
+
+METRICS = {
+    "navigation": {"ttfb_ms": 12.5, "dom_content_loaded_ms": 80.0, "load_ms": 140.0, "transfer_bytes": 2048},
+    "vitals": {"fcp_ms": 90.0, "lcp_ms": 120.0, "cls": 0.01, "tbt_ms": 0.0, "long_tasks": 0},
+}
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    playwright = FakePlaywright()
+    monkeypatch.setattr(playwright_test, "async_playwright", playwright)
+    return playwright
+
+
+def capture(tmp_path, **kwargs):
+    return asyncio.run(playwright_test.capture_page("http://app.test", str(tmp_path), **kwargs))
+
+
+def test_waits_for_networkidle_and_settles_without_readiness(fake_playwright, tmp_path):
+    """Test the defaults: networkidle, no readiness wait, a 2 s settle, vitals observer installed"""
+    result = capture(tmp_path)
+
+    assert fake_playwright.navigations[0]["wait_until"] == "networkidle"
+    assert fake_playwright.waits == []
+    assert fake_playwright.settled == [2000]
+    assert fake_playwright.contexts[0].init_scripts == [playwright_test.VITALS_SCRIPT]
+    assert result["ready"] is True
+    assert set(result["timings_ms"]) == {"navigation", "ready", "settle", "screenshot"}
+    assert (tmp_path / "screenshot.jpeg").read_bytes() == fake_playwright.image
+
+
+def test_readiness_condition_skips_networkidle_and_settle(fake_playwright, tmp_path):
+    """Test that wait_for and ready_signal navigate to domcontentloaded and need no settle unless asked"""
+    result = capture(tmp_path, wait_for="#player", ready_signal="__APP_READY__")
+    settled = capture(tmp_path, ready_signal="__APP_READY__", settle_ms=250)
+
+    assert [n["wait_until"] for n in fake_playwright.navigations] == ["domcontentloaded"] * 2
+    assert fake_playwright.waits[:2] == [("selector", "#player"),
+                                         ("function", '() => Boolean(window["__APP_READY__"])')]
+    assert fake_playwright.settled == [250]
+    assert result["ready"] is True and "settle" not in result["timings_ms"]
+    assert "settle" in settled["timings_ms"]
+
+
+def test_ready_timeout_still_captures(fake_playwright, tmp_path, capsys):
+    """Test that a page that never becomes ready is captured anyway and reported as not ready"""
+    fake_playwright.ready = False
+
+    result = capture(tmp_path, ready_signal="__APP_READY__", timeout_ms=500)
+
+    assert result["ready"] is False
+    assert fake_playwright.screenshots == 1
+    assert (tmp_path / "screenshot.jpeg").exists()
+    assert "Page not ready after 500 ms, capturing anyway" in capsys.readouterr().out
+
+
+def test_block_heavy_aborts_youtube_resources(fake_playwright, tmp_path):
+    """Test that --block-heavy and --block abort matching requests and count them"""
+    fake_playwright.subresources = [
+        "https://www.youtube.com/embed/abc",
+        "https://i.ytimg.com/vi/abc/mqdefault.jpg",
+        "https://rr1---sn.googlevideo.com/videoplayback",
+        "https://cdn.example.com/ads/banner.js",
+        "http://app.test/static/app.js",
+        "https://notyoutube.com/page",
+    ]
+
+    plain = capture(tmp_path)
+    blocked = capture(tmp_path, block_heavy=True, block=["**/ads/**"])
+
+    assert plain["blocked_requests"] == 0
+    assert blocked["blocked_requests"] == 4
+    assert fake_playwright.aborted == fake_playwright.subresources[:4]
+
+
+def test_report_is_written_with_metrics(fake_playwright, tmp_path):
+    """Test that --report saves the result with navigation timing and vitals, and returns the same data"""
+    fake_playwright.metrics = METRICS
+
+    result = capture(tmp_path, report=True)
+
+    [report_path] = tmp_path.glob("report_*.json")
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report == result
+    assert report_path.name == f"report_{result['timestamp']}.json"
+    assert report["navigation"] == METRICS["navigation"] and report["vitals"] == METRICS["vitals"]
+    assert report["url"] == "http://app.test" and report["ready"] is True
+
+
+def test_no_report_without_flag(fake_playwright, tmp_path):
+    """Test that metrics are neither collected nor saved unless a report is asked for"""
+    fake_playwright.metrics = METRICS
+
+    result = capture(tmp_path)
+
+    assert "navigation" not in result and "vitals" not in result
+    assert list(tmp_path.glob("report_*.json")) == []
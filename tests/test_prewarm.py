@@ -0,0 +1,62 @@
+import asyncio
+
+from backend import server
+from backend.benchmarks.memory_store import MemoryCollection
+from backend.external_integrations.playlist_cache import PlaylistCache
+from backend.external_integrations.prewarm import ALREADY_WARM, FAILED, WARMED, Prewarmer, ThemeStats
+from tests.conftest import post_playlists
+
+
+def test_theme_stats_ranks_by_requests():
+    """Test that the most requested themes come first without MongoDB"""
+    stats = ThemeStats()
+    for theme in ["ska", "grunge", "grunge", "house", "grunge", "house"]:
+        stats.record(theme)
+
+    assert asyncio.run(stats.top(2)) == ["grunge", "house"]
+
+
+def test_prewarm_run_respects_budget_and_stops_on_failure():
+    """Test that a run builds at most the budget and gives up when the upstream fails"""
+    stats = ThemeStats()
+    for i, theme in enumerate(["a1", "b2", "c3", "d4", "e5"]):
+        for _ in range(10 - i):
+            stats.record(theme)
+    outcomes = {"a1": ALREADY_WARM, "b2": WARMED, "c3": WARMED, "d4": WARMED, "e5": WARMED}
+    warmed = []
+
+    async def warm(theme):
+        warmed.append(theme)
+        return outcomes[theme]
+
+    prewarmer = Prewarmer(stats, warm, top_n=5, budget=2)
+    assert asyncio.run(prewarmer.run_once()) == 2
+    assert warmed == ["a1", "b2", "c3"]
+    assert prewarmer.is_warm("a1") and not prewarmer.is_warm("d4")
+
+    outcomes["a1"] = FAILED
+    assert asyncio.run(prewarmer.run_once()) == 0
+    assert prewarmer.counters["failures"] == 1
+
+
+def test_prewarmed_themes_are_served_from_cache(fake_youtube, monkeypatch):
+    """Test that popular themes are rebuilt after a cache flush and count towards warm coverage"""
+    stats = ThemeStats()
+    monkeypatch.setattr(server, "theme_stats", stats)
+    monkeypatch.setattr(server, "prewarmer", Prewarmer(stats, server.warm_theme, top_n=2))
+
+    asyncio.run(post_playlists([{"theme": "grunge"}, {"theme": "ska", "count": 3}]))
+    asyncio.run(post_playlists([{"theme": "Grunge!"}, {"theme": "house"}]))
+    monkeypatch.setattr(server, "playlist_cache", PlaylistCache(MemoryCollection()))
+    calls = len(fake_youtube.calls)
+
+    assert asyncio.run(server.prewarmer.run_once()) == 2
+    assert len(fake_youtube.calls) == calls + 2
+
+    response, = asyncio.run(post_playlists([{"theme": "ska", "count": 15}]))
+
+    assert len(response.json()["playlist"]) == 15
+    assert len(fake_youtube.calls) == calls + 2
+    stats = server.prewarmer.stats()
+    assert stats["served"] == 5
+    assert stats["warm_coverage"] == 0.2
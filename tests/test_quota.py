@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from backend.external_integrations.quota import HIGH, LOW, NORMAL, QUOTA_TIMEZONE, QuotaExhausted, QuotaScheduler, TokenBucket
+from tests.conftest import post_playlists
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def noon():
+    return datetime(2024, 3, 5, 12, 0, tzinfo=QUOTA_TIMEZONE).timestamp()
+
+
+def test_token_bucket_refills_at_rate():
+    """Test token bucket burst and refill"""
+    clock = FakeClock(0.0)
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now = 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_lower_priorities_stop_before_budget_runs_out():
+    """Test that normal and low priority calls leave the reserve for high priority"""
+    quota = QuotaScheduler(daily_budget=1000, rate=1000, reserve=0.2, clock=FakeClock(noon()))
+    for _ in range(6):
+        quota.acquire(LOW)
+    with pytest.raises(QuotaExhausted) as denied:
+        quota.acquire(LOW)
+    assert denied.value.reason == "budget"
+    quota.acquire(NORMAL)
+    quota.acquire(NORMAL)
+    with pytest.raises(QuotaExhausted):
+        quota.acquire(NORMAL)
+    quota.acquire(HIGH)
+    quota.acquire(HIGH)
+    with pytest.raises(QuotaExhausted):
+        quota.acquire(HIGH)
+    stats = quota.stats()
+    assert stats["remaining"] == 0
+    assert stats["calls"] == {"high": 2, "normal": 2, "low": 6}
+    assert stats["throttled"] == {"rate": 0, "budget": 3}
+
+
+def test_rate_limit_counts_throttled_calls():
+    """Test that the per-second limit is enforced"""
+    quota = QuotaScheduler(daily_budget=10000, rate=1, burst=2, monotonic=FakeClock(0.0))
+    quota.acquire()
+    quota.acquire()
+    with pytest.raises(QuotaExhausted) as denied:
+        quota.acquire()
+    assert denied.value.reason == "rate"
+    assert quota.stats()["throttled"]["rate"] == 1
+    assert quota.spent == 200
+
+
+def test_budget_resets_at_pacific_midnight():
+    """Test that spending resets when the quota day rolls over"""
+    clock = FakeClock(noon())
+    quota = QuotaScheduler(daily_budget=1000, rate=1000, clock=clock)
+    quota.acquire()
+    assert quota.remaining == 900
+    assert quota.stats()["resets_at"] == datetime(2024, 3, 6, 8, 0, tzinfo=timezone.utc).isoformat()
+    clock.now += 12 * 3600
+    assert quota.remaining == 1000
+
+
+def test_projected_exhaustion():
+    """Test exhaustion projection from the burn rate since midnight"""
+    clock = FakeClock(noon())
+    quota = QuotaScheduler(daily_budget=1000, rate=1000, reserve=0, clock=clock)
+    assert quota.projected_exhaustion() is None
+    quota.acquire()
+    assert quota.projected_exhaustion() is None  # 100 units in 12h will not run out today
+    for _ in range(5):
+        quota.acquire()
+    # 600 units in 12h burns the remaining 400 in 8h
+    assert quota.projected_exhaustion().timestamp() == pytest.approx(noon() + 8 * 3600)
+
+
+def test_endpoint_degrades_when_budget_reserved(fake_youtube):
+    """Test that denied searches fall back without calling upstream"""
+    fake_youtube.quota = QuotaScheduler(daily_budget=100, rate=1000, reserve=0.5)
+
+    [response] = asyncio.run(post_playlists([{"theme": "rock", "count": 5}]))
+
+    data = response.json()
+    assert fake_youtube.calls == []
+    assert data["message"].startswith("Using sample 90s playlist (API error: YouTube quota budget reserved")
+    assert len(data["playlist"]) == 5
+    assert fake_youtube.quota.stats()["throttled"]["budget"] == 1
@@ -0,0 +1,244 @@
+import asyncio
+import time
+
+import httpx
+import orjson
+import pytest
+
+from backend import server
+from backend.external_integrations.playlist_cache import PlaylistCache
+from backend.external_integrations.quota import QuotaExhausted, QuotaScheduler
+from backend.external_integrations.resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, DeadlineExceeded, deadline,
+)
+from backend.external_integrations.youtube import YouTubeClient
+from backend.external_integrations.youtube_stub import make_search_item
+from backend.benchmarks.memory_store import MemorySongCatalog
+
+
+def scripted_client(responses, **kwargs):
+    """A client whose transport plays ``responses`` in order: (delay, status) pairs."""
+    requests = []
+
+    async def handler(request):
+        delay, status = responses[min(len(requests), len(responses) - 1)]
+        requests.append(request)
+        await asyncio.sleep(delay)
+        body = {"items": [make_search_item(request.url.params["q"], 0)]} if status == 200 else {}
+        return httpx.Response(status, content=orjson.dumps(body))
+
+    client = YouTubeClient("test-key", **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def test_breaker_opens_and_recovers_through_half_open():
+    """Test the closed, open, half-open cycle"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=10, clock=lambda: now[0])
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    now[0] = 10
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.counters["opened"] == 2
+
+
+def test_open_circuit_skips_upstream():
+    """Test that once open, searches fail fast without calling YouTube"""
+    client, requests = scripted_client([(0, 503)], breaker=CircuitBreaker(failure_threshold=2))
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.search("rock")
+        with pytest.raises(CircuitOpen):
+            await client.search("rock")
+
+    asyncio.run(scenario())
+    assert len(requests) == 2
+
+
+def test_transient_errors_are_retried():
+    """Test that a 503 is retried and the retry's answer returned"""
+    client, requests = scripted_client([(0, 503), (0, 200)], retries=1)
+
+    data = asyncio.run(client.search("rock"))
+
+    assert len(data["items"]) == 1
+    assert len(requests) == 2
+
+
+def test_slow_call_is_hedged():
+    """Test that a second attempt races a slow first one"""
+    client, requests = scripted_client([(1.0, 200), (0, 200)], hedge_delay=0.05)
+
+    started = time.perf_counter()
+    data = asyncio.run(client.search("rock"))
+
+    assert time.perf_counter() - started < 0.5
+    assert len(data["items"]) == 1
+    assert len(requests) == 2
+
+
+def test_deadline_bounds_retries():
+    """Test that the request deadline cuts off a slow upstream whatever the retry policy"""
+    client, requests = scripted_client([(1.0, 200)], retries=3, hedge_delay=0.05, hedges=2)
+
+    async def scenario():
+        with deadline(0.2):
+            await client.search("rock")
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+    assert time.perf_counter() - started < 0.5
+
+
+def test_endpoint_falls_back_within_deadline(monkeypatch):
+    """Test that a browned-out upstream is answered from the fallback within the deadline, then fails fast"""
+    client, requests = scripted_client([(2.0, 200)], breaker=CircuitBreaker(failure_threshold=1))
+    monkeypatch.setattr(server, "YOUTUBE_API_KEY", "test-key")
+    monkeypatch.setattr(server, "youtube_client", client)
+    monkeypatch.setattr(server, "PLAYLIST_DEADLINE", 0.2)
+    monkeypatch.setattr(server, "playlist_cache", PlaylistCache())
+    monkeypatch.setattr(server, "song_catalog", MemorySongCatalog())
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+            started = time.perf_counter()
+            first = await api.post("/api/generate-playlist", json={"theme": "grunge", "count": 3})
+            second = await api.post("/api/generate-playlist", json={"theme": "britpop", "count": 3})
+            return first.json(), second.json(), time.perf_counter() - started
+
+    first, second, elapsed = asyncio.run(scenario())
+
+    assert first["message"].startswith("Using sample 90s playlist")
+    assert "circuit breaker is open" in second["message"]
+    assert len(second["playlist"]) == 3
+    assert len(requests) == 1
+    assert elapsed < 1.0
+
+
+def test_throttled_probe_does_not_wedge_half_open_breaker():
+    """Test that a half-open probe stopped by the local quota frees its slot for the next call"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=10, clock=lambda: now[0])
+    quota = QuotaScheduler(rate=1.0, burst=1.0, clock=lambda: now[0], monotonic=lambda: now[0])
+    client, requests = scripted_client([(0, 503), (0, 200)], breaker=breaker, quota=quota)
+
+    async def scenario():
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.search("rock")
+        now[0] = 10
+        assert quota.bucket.try_acquire()  # another caller drains the bucket
+        with pytest.raises(QuotaExhausted):
+            await client.search("rock")  # the probe is rate limited before reaching YouTube
+        now[0] = 12
+        return await client.search("rock")
+
+    data = asyncio.run(scenario())
+
+    assert len(data["items"]) == 1
+    assert breaker.state == CLOSED
+    assert len(requests) == 2
+
+
+def test_expired_deadline_is_not_a_breaker_failure():
+    """Test that searches made after the caller's deadline passed neither reach YouTube nor open the breaker"""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=10)
+    client, requests = scripted_client([(0, 200)], breaker=breaker)
+
+    async def scenario():
+        with deadline(0):
+            for _ in range(2):
+                with pytest.raises(DeadlineExceeded):
+                    await client.search("rock")
+        return await client.search("rock")
+
+    data = asyncio.run(scenario())
+
+    assert len(data["items"]) == 1
+    assert breaker.state == CLOSED
+    assert breaker.stats()["failures"] == 0
+    assert len(requests) == 1
+
+
+def test_cancelled_probe_frees_its_slot():
+    """Test that cancelling a half-open probe lets the next call probe"""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=10, clock=lambda: now[0])
+    client, requests = scripted_client([(0, 503), (5.0, 200), (0, 200)], breaker=breaker)
+
+    async def scenario():
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.search("rock")
+        now[0] = 10
+        probe = asyncio.create_task(client.search("rock"))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await client.search("rock")
+
+    data = asyncio.run(scenario())
+
+    assert len(data["items"]) == 1
+    assert breaker.state == CLOSED
+
+
+def test_joined_flight_respects_callers_deadline(fake_youtube, monkeypatch):
+    """Test that a request sharing a slow build without a deadline still answers within its own"""
+    fake_youtube.latency = 1.0
+    monkeypatch.setattr(server, "PLAYLIST_DEADLINE", 0.2)
+
+    async def scenario():
+        warming = asyncio.create_task(server.load_playlist("grunge", 10, server.LOW))
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        with deadline(0.2):
+            result = await server.load_playlist("grunge", 10)
+        elapsed = time.perf_counter() - started
+        warming.cancel()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(scenario())
+
+    assert "Request deadline exceeded" in result["message"]
+    assert len(result["playlist"]) == 10
+    assert elapsed < 0.5
+
+
+def test_flight_runs_on_its_own_deadline(fake_youtube, monkeypatch):
+    """Test that a build started by a nearly expired caller keeps going for callers that join it"""
+    fake_youtube.latency = 0.1
+    monkeypatch.setattr(server, "PLAYLIST_DEADLINE", 0.5)
+
+    async def scenario():
+        with deadline(0.05):
+            first = asyncio.create_task(server.load_playlist("grunge", 10))
+            await asyncio.sleep(0)
+        with deadline(0.5):
+            second = await server.load_playlist("grunge", 10)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert "Request deadline exceeded" in first["message"]
+    assert second["message"] == "Successfully generated playlist"
@@ -0,0 +1,99 @@
+import asyncio
+import io
+
+import pytest
+
+from tests.fake_playwright import FakeBrowser, FakePage, FakePlaywright, jpeg  # puts .devcontainer on sys.path
+
+from screenshots import FrameStore, capture, frame_hash, hash_distance, image_files  # noqa: E402
+
+
+def report_page(text: str, **save_options) -> bytes:
+    """A tall white page with one line of text, like a full-page capture of a test report."""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    image = Image.new("RGB", (1280, 2400), "white")
+    ImageDraw.Draw(image).text((40, 40), text, fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=50, **save_options)
+    return buffer.getvalue()
+
+
+def test_image_files_matches_each_suffix(tmp_path):
+    """Test that screenshots are found by suffix, which a '*.{png,jpg,jpeg}' glob never did"""
+    for name in ["a.png", "b.JPG", "c.jpeg", "notes.txt", "d.webp"]:
+        (tmp_path / name).write_bytes(b"x")
+
+    assert [path.name for path in image_files(tmp_path)] == ["a.png", "b.JPG", "c.jpeg"]
+    assert list(tmp_path.glob("*.{png,jpg,jpeg}")) == []
+
+
+def test_frame_hash_barely_sees_small_text_changes():
+    """Test why hash matches need confirming: one changed line on a full page is within a bit or two"""
+    failed = report_page("Test FAILED: 0 songs, error 500")
+    passed = report_page("Test PASSED")
+
+    assert hash_distance(frame_hash(failed), frame_hash(passed)) <= 2
+    assert hash_distance(frame_hash(failed), frame_hash(jpeg(0))) is None
+
+
+def test_store_keeps_frames_that_differ(tmp_path):
+    """Test that frames differing only in a line of text are both stored, with or without perceptual matching"""
+    failed = report_page("Test FAILED: 0 songs, error 500")
+    passed = report_page("Test PASSED")
+    ten, eighteen = report_page("Songs: 10"), report_page("Songs: 18")
+
+    for store in [FrameStore(tmp_path / "exact"), FrameStore(tmp_path / "perceptual", max_distance=4)]:
+        store.root.mkdir()
+        first = asyncio.run(store.save(failed, store.root / "failed.jpeg"))
+        second = asyncio.run(store.save(passed, store.root / "passed.jpeg"))
+        asyncio.run(store.save(ten, store.root / "ten.jpeg"))
+        asyncio.run(store.save(eighteen, store.root / "eighteen.jpeg"))
+
+        assert (first, second) == (str(store.root / "failed.jpeg"), str(store.root / "passed.jpeg"))
+        assert store.stats == {"stored": 4, "deduplicated": 0}
+
+
+def test_store_reuses_identical_frames_across_runs(tmp_path):
+    """Test that a byte-identical frame saved by a later run points at the first copy"""
+    image = jpeg(128)
+    (tmp_path / "run1").mkdir()
+    (tmp_path / "run2").mkdir()
+    first = asyncio.run(FrameStore(tmp_path).save(image, tmp_path / "run1" / "final.png"))
+
+    store = FrameStore(tmp_path)  # a new process reads the index back
+    second = asyncio.run(store.save(image, tmp_path / "run2" / "final.png"))
+
+    assert second == first
+    assert not (tmp_path / "run2" / "final.png").exists()
+    assert store.stats == {"stored": 0, "deduplicated": 1}
+
+
+def test_perceptual_matching_is_opt_in(tmp_path):
+    """Test that the same picture encoded differently merges only when perceptual matching is enabled"""
+    original = report_page("Now playing: Smells Like Teen Spirit")
+    noisy = report_page("Now playing: Smells Like Teen Spirit", optimize=True)
+    assert original != noisy
+
+    exact = FrameStore(tmp_path / "exact")
+    perceptual = FrameStore(tmp_path / "perceptual", max_distance=2)
+    for store in [exact, perceptual]:
+        store.root.mkdir()
+        asyncio.run(store.save(original, store.root / "one.jpeg"))
+        asyncio.run(store.save(noisy, store.root / "two.jpeg"))
+
+    assert exact.stats == {"stored": 2, "deduplicated": 0}
+    assert perceptual.stats == {"stored": 1, "deduplicated": 1}
+
+
+def test_capture_renders_once_for_every_destination(tmp_path):
+    """Test that one screenshot is written to each copy and the archive"""
+    playwright = FakePlaywright()
+    page = FakePage(playwright, FakeBrowser(playwright))
+    store = FrameStore(tmp_path)
+
+    archived = asyncio.run(capture(page, [tmp_path / "latest.jpeg"], tmp_path / "final.png", store))
+
+    assert playwright.screenshots == 1
+    assert archived == str(tmp_path / "final.png")
+    assert (tmp_path / "latest.jpeg").read_bytes() == (tmp_path / "final.png").read_bytes() == playwright.image
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from backend.external_integrations.playlist_cache import FRESH, PlaylistCache
+from backend.external_integrations.quota import QuotaScheduler
+from backend.external_integrations.shared_state import SharedState
+
+fakeredis = pytest.importorskip("fakeredis")
+
+SONGS = [{"title": "Zombie", "artist": "The Cranberries", "videoId": "6Ejga4kJUts", "thumbnail": "t"}]
+
+
+def shared(server):
+    return SharedState(fakeredis.FakeAsyncRedis(server=server))
+
+
+def test_workers_share_playlist_entries():
+    """Test that an entry stored by one worker's cache is a hit for another's"""
+    server = fakeredis.FakeServer()
+    first, second = PlaylistCache(shared=shared(server)), PlaylistCache(shared=shared(server))
+
+    async def scenario():
+        await first.set("grunge", SONGS, 1)
+        return await second.get("grunge", 1)
+
+    playlist, state = asyncio.run(scenario())
+
+    assert (playlist, state) == (SONGS, FRESH)
+    assert second.counters["shared_hits"] == 1
+
+
+def test_prefetch_reads_many_entries_in_one_round_trip():
+    """Test that prefetch fills the local tier with one MGET"""
+    server = fakeredis.FakeServer()
+    writer, reader = PlaylistCache(shared=shared(server)), PlaylistCache(shared=shared(server))
+
+    async def scenario():
+        for theme in ("ska", "funk"):
+            await writer.set(theme, SONGS, 1)
+        await reader.prefetch(["ska", "funk", "swing", "ska"])
+        return [await reader.get(theme, 1) for theme in ("ska", "funk")]
+
+    results = asyncio.run(scenario())
+
+    assert [state for _, state in results] == [FRESH, FRESH]
+    assert reader.shared.counters["reads"] == 3
+    assert reader.counters["memory_hits"] == 2
+
+
+def test_quota_spend_is_shared_between_workers():
+    """Test that each worker sees the spend of every worker after a sync"""
+    server = fakeredis.FakeServer()
+    workers = [QuotaScheduler(daily_budget=10000, rate=100), QuotaScheduler(daily_budget=10000, rate=100)]
+    states = [shared(server), shared(server)]
+
+    async def scenario():
+        for _ in range(3):
+            workers[0].acquire()
+        for _ in range(2):
+            workers[1].acquire()
+        for state, quota in zip(states, workers):
+            await state.sync_quota(quota)
+        await states[0].sync_quota(workers[0])
+
+    asyncio.run(scenario())
+
+    assert [quota.spent for quota in workers] == [500, 500]
+    assert workers[0].remaining == 9500
+
+
+def test_redis_outage_falls_back_to_memory():
+    """Test that Redis errors keep the cache working in-process and keep unsynced quota"""
+    server = fakeredis.FakeServer()
+    server.connected = False
+    state = shared(server)
+    cache = PlaylistCache(shared=state)
+    quota = QuotaScheduler(rate=100)
+    quota.acquire()
+
+    async def scenario():
+        await cache.set("house", SONGS, 1)
+        synced = await state.sync_quota(quota)
+        return await cache.get("house", 1), synced
+
+    (playlist, state_name), synced = asyncio.run(scenario())
+
+    assert (playlist, state_name) == (SONGS, FRESH)
+    assert synced is False
+    assert state.counters["errors"] == 1
+    assert not state.available()
+    assert quota.take_unsynced() == 100
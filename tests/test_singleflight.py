@@ -0,0 +1,141 @@
+import asyncio
+
+import httpx
+
+from backend import server
+from backend.external_integrations.singleflight import SingleFlight
+from tests.conftest import post_playlists
+
+
+def test_concurrent_requests_share_one_upstream_call(fake_youtube):
+    """Test that N concurrent requests for one theme make exactly one upstream call"""
+    fake_youtube.latency = 0.05
+    themes = ["Grunge", "grunge", " GRUNGE! ", "grunge."] * 25
+
+    responses = asyncio.run(post_playlists([{"theme": t, "count": 5} for t in themes]))
+
+    assert len(fake_youtube.calls) == 1
+    playlists = [r.json()["playlist"] for r in responses]
+    assert all(len(p) == 5 for p in playlists)
+    assert all(p == playlists[0] for p in playlists)
+
+
+def test_distinct_counts_are_separate_flights(fake_youtube):
+    """Test that the flight key includes the requested count"""
+    fake_youtube.latency = 0.05
+    bodies = [{"theme": "pop", "count": 3}, {"theme": "pop", "count": 8}] * 10
+
+    asyncio.run(post_playlists(bodies))
+
+    assert len(fake_youtube.calls) == 2
+
+
+def test_shared_failure_falls_back_for_all_waiters(fake_youtube):
+    """Test that one failed upstream call sends every waiter to the fallback"""
+    fake_youtube.latency = 0.05
+    fake_youtube.error = RuntimeError("quota exceeded")
+
+    responses = asyncio.run(post_playlists([{"theme": "rock", "count": 5}] * 20))
+
+    assert len(fake_youtube.calls) == 1
+    for response in responses:
+        data = response.json()
+        assert data["message"] == "Using sample 90s playlist (API error: quota exceeded)"
+        assert len(data["playlist"]) == 5
+
+
+async def post_and_get(theme, count, seeds):
+    """One POST and one GET per seed (None for a plain GET) for the same playlist, all at once."""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        gets = [api.get("/api/playlist", params={"theme": theme, "count": count,
+                                                 **({} if seed is None else {"seed": seed})}) for seed in seeds]
+        return await asyncio.gather(api.post("/api/generate-playlist", json={"theme": theme, "count": count}), *gets)
+
+
+def test_posts_and_seeded_gets_share_one_flight(fake_youtube):
+    """Test that the seed does not split the flight between POST, plain GET and seeded GET"""
+    fake_youtube.latency = 0.05
+
+    responses = asyncio.run(post_and_get("rock", 5, [None, 3]))
+
+    assert len(fake_youtube.calls) == 1
+    assert all(r.json()["message"] == "Successfully generated playlist" for r in responses)
+
+
+def test_shared_failure_falls_back_with_each_callers_seed(fake_youtube):
+    """Test that waiters on one failed build each get the sample playlist their own seed picks"""
+    fake_youtube.latency = 0.05
+    fake_youtube.error = RuntimeError("boom")
+
+    _, first, again, other = asyncio.run(post_and_get("rock", 10, [1, 1, 2]))
+    expected = [s["videoId"] for s in server.sample_playlist("rock", 10, seed=1)]
+
+    assert len(fake_youtube.calls) == 1
+    assert first.json() == again.json()
+    assert sorted(s["videoId"] for s in first.json()["playlist"]) == sorted(expected)
+    assert first.json()["playlist"] != other.json()["playlist"]
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    """Test cancellation safety for waiters"""
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight()
+        waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return flights, results
+
+    flights, results = asyncio.run(scenario())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["result"] * 4
+    assert len(calls) == 1
+    assert flights.inflight() == 0
+    assert flights.counters == {"calls": 1, "shared": 4}
+
+
+def test_shared_call_survives_all_waiters_cancelling():
+    """Test that the shared work completes even if every waiter goes away"""
+    done = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        done.append(1)
+
+    async def scenario():
+        flights = SingleFlight()
+        waiter = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert done == [1]
+
+
+def test_new_flight_after_completion():
+    """Test that a key is released once its call finishes"""
+    calls = []
+
+    async def work():
+        calls.append(1)
+        raise ValueError("boom")
+
+    async def scenario():
+        flights = SingleFlight()
+        for _ in range(2):
+            try:
+                await flights.do("key", work)
+            except ValueError:
+                pass
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
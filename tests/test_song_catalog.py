@@ -0,0 +1,137 @@
+import asyncio
+import json
+import sys
+
+from backend import server
+from backend.external_integrations import song_catalog
+from backend.external_integrations.song_catalog import SongCatalog, derive_tags
+from tests.conftest import post_playlists
+
+
+class RecordingCollection:
+    """Records bulk writes and answers finds from a canned list of documents."""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.writes = []
+        self.queries = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return FakeCursor(self.docs)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+def song(i, **extra):
+    return {"title": f"Song {i}", "artist": "Artist", "videoId": f"vid{i}", "thumbnail": "", **extra}
+
+
+def test_derive_tags():
+    """Test that tags drop filler words and duplicates"""
+    tags = derive_tags({"title": "Nirvana - Smells Like Teen Spirit (Official Music Video)", "artist": "NirvanaVEVO"},
+                       theme="grunge rock")
+    assert tags == ["nirvana", "smells", "like", "teen", "spirit", "nirvanavevo", "grunge", "rock"]
+
+
+def test_search_filters_weak_matches():
+    """Test that matches below min_score are not served"""
+    docs = [dict(song(1), score=2.5), dict(song(2), score=0.5)]
+    collection = RecordingCollection(docs)
+    catalog = SongCatalog(collection, min_score=1.0)
+
+    results = asyncio.run(catalog.search("grunge", 5))
+
+    assert results == [song(1)]
+    assert collection.queries == [{"$text": {"$search": "grunge"}}]
+
+
+def test_search_skips_empty_theme():
+    """Test that an empty theme never queries MongoDB"""
+    collection = RecordingCollection()
+    assert asyncio.run(SongCatalog(collection).search("", 5)) == []
+    assert collection.queries == []
+
+
+def test_harvest_upserts_with_tags():
+    """Test that harvested songs are upserted by videoId with merged tags"""
+    collection = RecordingCollection()
+    asyncio.run(SongCatalog(collection).harvest([song(1)], theme="grunge"))
+
+    [operations] = collection.writes
+    [operation] = operations
+    assert operation._filter == {"videoId": "vid1"}
+    assert operation._doc["$addToSet"] == {"tags": {"$each": ["song", "artist", "grunge"]}}
+    assert operation._upsert is True
+
+
+def test_import_export_round_trip():
+    """Test bulk import batching and export"""
+    collection = RecordingCollection([song(1, tags=["rock"])])
+    catalog = SongCatalog(collection)
+
+    imported = asyncio.run(catalog.import_songs((song(i, tags=["pop"]) for i in range(5)), batch_size=2))
+
+    async def export():
+        return [doc async for doc in catalog.export_songs()]
+
+    assert imported == 5
+    assert [len(batch) for batch in collection.writes] == [2, 2, 1]
+    assert asyncio.run(export()) == [song(1, tags=["rock"])]
+
+
+def test_export_to_stdout_leaves_it_open(monkeypatch, capsys):
+    """Test that exporting to '-' writes JSON lines to stdout without closing it"""
+    monkeypatch.setattr(song_catalog, "_open_catalog", lambda: SongCatalog(RecordingCollection([song(1), song(2)])))
+
+    exported = asyncio.run(song_catalog._export("-"))
+
+    assert exported == 2
+    assert not sys.stdout.closed
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == [song(1), song(2)]
+
+
+def test_catalog_answers_hot_theme_without_youtube(fake_youtube):
+    """Test that harvested songs serve a related theme without another upstream call"""
+    asyncio.run(post_playlists([{"theme": "grunge", "count": 5}]))
+    [response] = asyncio.run(post_playlists([{"theme": "grunge anthems", "count": 5}]))
+
+    assert len(fake_youtube.calls) == 1
+    assert response.json()["message"] == "Successfully generated playlist"
+    assert len(response.json()["playlist"]) == 5
+
+
+def test_catalog_is_topped_up_from_youtube(fake_youtube):
+    """Test that a short local result is completed by one upstream call"""
+    server.song_catalog.songs = {}
+    asyncio.run(server.song_catalog.harvest([song(1), song(2)], theme="britpop"))
+
+    [response] = asyncio.run(post_playlists([{"theme": "britpop", "count": 5}]))
+
+    playlist = response.json()["playlist"]
+    assert len(fake_youtube.calls) == 1
+    assert [s["videoId"] for s in playlist[:2]] == ["vid1", "vid2"]
+    assert len({s["videoId"] for s in playlist}) == 5
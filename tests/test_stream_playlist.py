@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import httpx
+
+from backend import server
+
+
+async def post_stream(body, accept="application/x-ndjson"):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        return await api.post("/api/generate-playlist/stream", json=body, headers={"Accept": accept})
+
+
+def local_song(i):
+    return {"title": f"Local {i}", "artist": "Catalog", "videoId": f"local{i}", "thumbnail": "", "tags": ["shoegaze"]}
+
+
+def test_ndjson_stream_sends_catalog_songs_first(fake_youtube):
+    """Test that catalog matches lead the stream and upstream songs top it up"""
+    server.song_catalog.songs = {s["videoId"]: s for s in map(local_song, range(2))}
+
+    response = asyncio.run(post_stream({"theme": "Shoegaze", "count": 5}))
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    songs = [event["song"] for event in events if "song" in event]
+    assert [s["videoId"] for s in songs[:2]] == ["local0", "local1"]
+    assert len(songs) == 5
+    assert len({s["videoId"] for s in songs}) == 5
+    assert events[-1] == {"done": True, "message": "Successfully generated playlist"}
+    assert len(fake_youtube.calls) == 1
+    assert server.song_catalog.stats()["searches"] == 1
+
+
+def test_sse_stream_matches_buffered_playlist(fake_youtube):
+    """Test the Server-Sent Events variant against the buffered endpoint"""
+    response = asyncio.run(post_stream({"theme": "rock", "count": 4}, accept="text/event-stream"))
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert [frame.split("\n")[0] for frame in frames] == ["event: song"] * 4 + ["event: done"]
+    songs = [json.loads(frame.split("data: ", 1)[1])["song"] for frame in frames[:-1]]
+
+    transport = httpx.ASGITransport(app=server.app)
+
+    async def buffered():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+            return await api.post("/api/generate-playlist", json={"theme": "rock", "count": 4})
+
+    assert asyncio.run(buffered()).json()["playlist"] == songs
+    assert len(fake_youtube.calls) == 1
+
+
+def test_stream_falls_back_on_upstream_error(fake_youtube):
+    """Test that the stream still completes with sample songs when YouTube fails"""
+    fake_youtube.error = RuntimeError("boom")
+
+    response = asyncio.run(post_stream({"theme": "rock", "count": 3}))
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert len([e for e in events if "song" in e]) == 3
+    assert events[-1]["message"] == "Using sample 90s playlist (API error: boom)"
@@ -0,0 +1,159 @@
+import asyncio
+import time
+
+import httpx
+import orjson
+import pytest
+
+from backend import server
+from backend.external_integrations.playlist_cache import PlaylistCache
+from backend.external_integrations.song_catalog import SongCatalog
+from backend.external_integrations.youtube import SEARCH_FIELDS, YouTubeClient, parse_songs
+from backend.external_integrations.youtube_stub import make_search_item, running_stub
+
+
+def test_parse_songs():
+    """Test converting a search response into songs"""
+    songs = parse_songs({"items": [make_search_item("rock", 0)]})
+    assert len(songs) == 1
+    assert set(songs[0]) == {"title", "artist", "videoId", "thumbnail"}
+    assert songs[0]["thumbnail"].endswith("/mqdefault.jpg")
+
+
+def test_search_runs_concurrently():
+    """Test that concurrent searches overlap instead of serializing"""
+    async def scenario():
+        async with running_stub(latency=0.2) as (stub, url):
+            client = YouTubeClient("test-key", api_url=url, max_concurrency=10)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(client.search(f"theme {i}", max_results=5) for i in range(10)))
+            elapsed = time.perf_counter() - started
+            await client.aclose()
+            return stub.state.calls, results, elapsed
+
+    calls, results, elapsed = asyncio.run(scenario())
+    assert calls == 10
+    assert all(len(r["items"]) == 5 for r in results)
+    assert elapsed < 1.0  # ten serialized calls would take at least 2s
+
+
+def test_search_concurrency_cap():
+    """Test that the client never has more than max_concurrency calls in flight"""
+    async def scenario():
+        async with running_stub(latency=0.2) as (stub, url):
+            client = YouTubeClient("test-key", api_url=url, max_concurrency=2)
+            started = time.perf_counter()
+            await asyncio.gather(*(client.search("rock", max_results=1) for _ in range(4)))
+            elapsed = time.perf_counter() - started
+            await client.aclose()
+            return elapsed
+
+    assert asyncio.run(scenario()) >= 0.4
+
+
+def test_search_read_deadline():
+    """Test that a slow upstream is cut off by the read timeout"""
+    async def scenario():
+        async with running_stub(latency=1.0) as (stub, url):
+            client = YouTubeClient("test-key", api_url=url, read_timeout=0.1)
+            try:
+                await client.search("rock")
+            finally:
+                await client.aclose()
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(scenario())
+
+
+def test_generate_playlist_uses_async_client(monkeypatch):
+    """Test the endpoint against the local stub"""
+    async def scenario():
+        async with running_stub() as (stub, url):
+            monkeypatch.setattr(server, "YOUTUBE_API_KEY", "test-key")
+            monkeypatch.setattr(server, "youtube_client", YouTubeClient("test-key", api_url=url))
+            monkeypatch.setattr(server, "playlist_cache", PlaylistCache())
+            monkeypatch.setattr(server, "song_catalog", SongCatalog())
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+                response = await api.post("/api/generate-playlist", json={"theme": "rock", "count": 5})
+            await server.youtube_client.aclose()
+            return response
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == "Successfully generated playlist"
+    assert len(data["playlist"]) == 5
+
+
+def client_with_pages(pages):
+    """A client whose transport answers successive searches with ``pages`` and records the params."""
+    requests = []
+
+    def handler(request):
+        requests.append(dict(request.url.params))
+        return httpx.Response(200, content=orjson.dumps(pages[len(requests) - 1]))
+
+    client = YouTubeClient("test-key")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def test_search_songs_requests_lean_page():
+    """Test that one lean page is requested when it yields enough songs"""
+    items = [make_search_item("rock", i) for i in range(8)]
+    client, requests = client_with_pages([{"items": items, "nextPageToken": "next"}])
+
+    songs = asyncio.run(client.search_songs("rock", 5))
+
+    assert len(songs) == 5
+    assert len(requests) == 1
+    assert requests[0]["maxResults"] == "10"
+    assert requests[0]["fields"] == SEARCH_FIELDS
+    assert "pageToken" not in requests[0]
+
+
+def test_search_songs_paginates_when_filtering_leaves_too_few():
+    """Test that duplicates and incomplete items trigger a follow-up page"""
+    duplicate = make_search_item("rock", 0)
+    incomplete = {"id": {"kind": "youtube#channel"}, "snippet": {"title": "A channel"}}
+    first = {"items": [duplicate, duplicate, incomplete, make_search_item("rock", 1)], "nextPageToken": "p2"}
+    second = {"items": [make_search_item("rock", i) for i in range(1, 6)]}
+    client, requests = client_with_pages([first, second])
+
+    songs = asyncio.run(client.search_songs("rock", 4, margin=0))
+
+    assert len(requests) == 2
+    assert requests[1]["pageToken"] == "p2"
+    assert requests[1]["maxResults"] == "2"
+    assert len({s["videoId"] for s in songs}) == 4
+
+
+def test_search_songs_stops_without_next_page():
+    """Test that a short result without a cursor is returned as is"""
+    client, requests = client_with_pages([{"items": [make_search_item("rock", 0)]}])
+
+    assert len(asyncio.run(client.search_songs("rock", 5))) == 1
+    assert len(requests) == 1
+
+
+def test_stub_honours_fields_projection():
+    """Test the stub's partial responses and paging"""
+    async def scenario():
+        async with running_stub() as (stub, url):
+            client = YouTubeClient("test-key", api_url=url)
+            full = await client.search("rock", max_results=3, fields=None)
+            lean = await client.search("rock", max_results=3)
+            page_two = await client.search("rock", max_results=3, page_token=lean["nextPageToken"])
+            await client.aclose()
+            return full, lean, page_two
+
+    full, lean, page_two = asyncio.run(scenario())
+    assert set(lean) == {"nextPageToken", "items"}
+    assert lean["items"][0] == {
+        "id": {"videoId": full["items"][0]["id"]["videoId"]},
+        "snippet": {"title": "Rock #1", "channelTitle": "Artist 0",
+                    "thumbnails": {"medium": {"url": full["items"][0]["snippet"]["thumbnails"]["medium"]["url"]}}},
+    }
+    assert parse_songs(lean) == parse_songs(full)
+    assert page_two["items"][0]["snippet"]["title"] == "Rock #4"